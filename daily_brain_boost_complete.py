@@ -1,16 +1,19 @@
 #!/usr/bin/env python3
 """
-Daily Brain Boost - Complete Version with Auto HA Restart
----------------------------------------------------------
-• Unique image filenames with timestamps (guaranteed cache bust)
+Daily Brain Boost - Complete Version with HA Cache Refresh
+----------------------------------------------------------
+• Builds each day's cards in a versioned release and publishes it atomically
 • Writes timestamp file for dashboard
 • Artistic images with LLM-chosen artists
 • UK-focused content with REAL facts
 • Joke images based on actual joke content
-• Auto-restarts Home Assistant to clear cache
+• Generates all cards concurrently with a capped number of API calls
+• Refreshes Home Assistant entities over the REST API (restart is opt-in)
 """
 
-import os, sys, json, random, shutil, logging, requests, time, subprocess
+import os, sys, json, random, shutil, logging, requests, time, subprocess, threading, argparse
+import hashlib, struct, tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -21,18 +24,42 @@ except ImportError:
     print("Run: pip install openai python-dotenv requests pillow")
     sys.exit(1)
 
+from dedup_index import DedupIndex
+from history_store import HistoryStore
+from image_store import ImageStore
+from image_variants import FORMATS, WIDTHS, render_variants, variant_name
+from kiwix_grounding import Grounding, extract_headword
+from kiwix_index import DEFAULT_INDEX as DEFAULT_KIWIX_INDEX
+from response_cache import CacheMiss, ResponseCache
+from run_manifest import RunManifest
+
 # --- CONFIGURATION ---
 TEXT_MODEL = "gpt-4o"
 IMAGE_MODEL = "dall-e-3"
 OUTDIR = Path("/srv/homeassistant/ai")
 WWW_DIR = Path("/srv/homeassistant/www/daily_images")
 LOGFILE = Path("/media/pi/data/assistant/brain_boost.log")
-HISTORY_FILE = Path("/media/pi/data/assistant/brain_boost_history.json")
+HISTORY_DB = Path("/media/pi/data/assistant/brain_boost_history.db")
+HISTORY_FILE = Path("/media/pi/data/assistant/brain_boost_history.json")  # Legacy, imported once
 HISTORY_DAYS_TO_KEEP = 14
 WORD_RETRY_LIMIT = 3
+DEDUP_RETRY_LIMIT = 2  # Regenerations allowed when text repeats earlier content
+DEDUP_THRESHOLD = 0.5  # Estimated word-set similarity that counts as a repeat
+GROUNDING_RETRY_LIMIT = 2  # Regenerations allowed when a word/author/subject can't be found offline
+KIWIX_INDEX = Path(os.getenv("KIWIX_INDEX", str(DEFAULT_KIWIX_INDEX)))  # Built by kiwix_index.py
+RELEASES_TO_KEEP = 3  # Published daily sets kept under WWW_DIR/releases
+MAX_IMAGE_BYTES = 8 * 1024 * 1024  # DALL·E PNGs are ~1.5-3 MB
+MAX_IMAGE_DIMENSION = 4096
 ENABLE_IMAGES = True
+RUNS_TO_KEEP = 7  # Daily run manifests kept for --resume and debugging
+DASHBOARD_VARIANT = (128, "jpeg")  # The variant dashboard.yaml loads; every Pillow can write JPEG
+MAX_CONCURRENT_REQUESTS = int(os.getenv("BRAIN_BOOST_CONCURRENCY", "4"))  # In-flight API calls
 TODAY_STR = datetime.now().strftime("%Y%m%d")
 TIMESTAMP = str(int(time.time()))  # Unique timestamp for this run
+ARTISTS_FALLBACK = [
+    "Monet", "Van Gogh", "Hokusai", "Picasso", "Dalí", "Warhol",
+    "Banksy", "Kahlo", "Basquiat", "Hockney", "Klimt", "Munch"
+]
 
 # --- LOGGING ---
 LOGFILE.parent.mkdir(parents=True, exist_ok=True)
@@ -62,52 +89,246 @@ if not OPENAI_API_KEY:
 
 openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
 
+# Home Assistant REST API, used to refresh the dashboard after a run
+HA_URL = os.getenv("HA_URL", "http://localhost:8123").rstrip("/")
+HA_TOKEN = os.getenv("HA_TOKEN")
+HA_TIMESTAMP_SENSOR = os.getenv("HA_TIMESTAMP_SENSOR", "sensor.brain_boost_timestamp")
+HA_REFRESH_ENTITIES = [
+    entity.strip() for entity in os.getenv(
+        "HA_REFRESH_ENTITIES",
+        "sensor.daily_fact,sensor.daily_on_this_day,sensor.daily_quote,sensor.daily_poem,"
+        "sensor.daily_history,sensor.daily_word,sensor.daily_riddle,sensor.daily_joke"
+    ).split(",") if entity.strip()
+]
+
+# Every outbound request takes a slot, so the pipeline can fan out freely
+# without exceeding MAX_CONCURRENT_REQUESTS calls in flight.
+request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+# Shared OpenAI response cache (OPENAI_CACHE_MODE=on|off|replay). Keys include
+# TODAY_STR, so a rerun after a partial failure reuses today's answers but
+# tomorrow's run always asks again.
+response_cache = ResponseCache()
+
+# One pooled HTTP session for every download in a run
+http_session = requests.Session()
+http_session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=MAX_CONCURRENT_REQUESTS))
+
 # --- CREATE DIRECTORIES ---
 OUTDIR.mkdir(parents=True, exist_ok=True)
 WWW_DIR.mkdir(parents=True, exist_ok=True)
 (OUTDIR / "images").mkdir(exist_ok=True)
 
+# --- IMAGE STORE ---
+def get_image_store(suffix=".png"):
+    """Return the content-addressed store that backs every published image"""
+    return ImageStore(OUTDIR / "images" / "store", suffix)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+class ImageDownloadError(Exception):
+    """Raised when a downloaded image is missing, too large or not a valid PNG"""
+
+def check_png_header(head):
+    """Validate the PNG signature and IHDR dimensions in the first 24 bytes"""
+    if head[:8] != PNG_SIGNATURE or head[12:16] != b"IHDR":
+        raise ImageDownloadError("not a PNG file")
+    width, height = struct.unpack(">II", head[16:24])
+    if not (0 < width <= MAX_IMAGE_DIMENSION and 0 < height <= MAX_IMAGE_DIMENSION):
+        raise ImageDownloadError(f"unexpected image size {width}x{height}")
+    return width, height
+
+def download_image(url, store):
+    """Stream an image into ``store``, verifying it on the way, and return its blob.
+
+    Chunks go straight to a temp file next to the store, so memory use stays
+    flat. The PNG header is checked as soon as it arrives, the size is capped
+    at MAX_IMAGE_BYTES and the file must end with an IEND chunk before it is
+    renamed into place, so a truncated download is never published.
+    """
+    with http_session.get(url, stream=True, timeout=30) as r:
+        if r.status_code != 200:
+            raise ImageDownloadError(f"HTTP {r.status_code}")
+        length = r.headers.get("Content-Length")
+        if length and int(length) > MAX_IMAGE_BYTES:
+            raise ImageDownloadError(f"image too large ({length} bytes)")
+
+        digest = hashlib.sha256()
+        head = b""
+        tail = b""
+        size = 0
+        fd, tmp = tempfile.mkstemp(dir=store.tmp_dir(), suffix=".png")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in r.iter_content(chunk_size=64 * 1024):
+                    if not chunk:
+                        continue
+                    size += len(chunk)
+                    if size > MAX_IMAGE_BYTES:
+                        raise ImageDownloadError(f"image larger than {MAX_IMAGE_BYTES} bytes")
+                    if len(head) < 24:
+                        head += chunk[:24 - len(head)]
+                        if len(head) == 24:
+                            check_png_header(head)
+                    tail = (tail + chunk)[-12:]
+                    digest.update(chunk)
+                    f.write(chunk)
+
+            if len(head) < 24 or tail[4:8] != b"IEND":
+                raise ImageDownloadError(f"truncated PNG ({size} bytes)")
+            return store.put_file(tmp, digest.hexdigest())
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
 # --- CLEANUP OLD IMAGES ---
-def cleanup_old_images():
-    """Remove old timestamped images, keeping only the most recent set"""
+def cleanup_old_images(manifest=None):
+    """Drop old releases and free image blobs nothing references any more
+
+    Images ``manifest`` (a run being resumed) has stored are kept even if
+    the crash came before they were linked anywhere.
+    """
     try:
-        # Find all timestamped images
-        for pattern in ['fact_*.png', 'on_this_day_*.png', 'quote_*.png', 
-                       'poem_*.png', 'history_*.png', 'word_*.png', 
-                       'riddle_*.png', 'joke_*.png']:
-            files = sorted(WWW_DIR.glob(pattern))
-            # Keep only the 3 most recent of each type
-            for old_file in files[:-3]:
-                old_file.unlink()
-                log.info(f"Cleaned up old image: {old_file.name}")
+        releases_dir = WWW_DIR / "releases"
+        if releases_dir.exists():
+            live = (WWW_DIR / "current").resolve()
+            releases = sorted(
+                (d for d in releases_dir.iterdir() if d.is_dir() and d.name.isdigit()),
+                key=lambda d: int(d.name)
+            )
+            for old_release in releases[:-RELEASES_TO_KEEP]:
+                if old_release.resolve() != live:
+                    shutil.rmtree(old_release)
+                    log.info(f"Cleaned up old release: {old_release.name}")
+
+        # Timestamped images from before releases existed: <card>_<unix timestamp>.png.
+        # Until the first release replaces them, <card>.png still links to these
+        in_use = {path.resolve() for path in WWW_DIR.glob("*.png") if path.is_symlink()}
+        for path in WWW_DIR.glob("*_*.png"):
+            if (path.stem.rpartition("_")[2].isdigit() and not path.is_symlink()
+                    and path.resolve() not in in_use):
+                path.unlink()
+                log.info(f"Cleaned up old image: {path.name}")
+
+        pending = {card.get("sha256") for card in manifest.cards.values()} if manifest else set()
+        for suffix in [".png"] + [ext for _, ext, _ in FORMATS.values()]:
+            for blob in get_image_store(suffix).gc(keep=pending - {None}):
+                log.info(f"Freed unreferenced image blob: {blob.name}")
+
+        for old_manifest in sorted((OUTDIR / "runs").glob("*.json"))[:-RUNS_TO_KEEP]:
+            old_manifest.unlink()
     except Exception as e:
         log.warning(f"Cleanup error: {e}")
 
+# --- RELEASES ---
+def get_release_dir():
+    """Return the versioned directory this run's cards are built in"""
+    return WWW_DIR / "releases" / TIMESTAMP
+
+def write_card_text(filename, content):
+    """Write a card's text into this run's (unpublished) release"""
+    release = get_release_dir()
+    release.mkdir(parents=True, exist_ok=True)
+    (release / filename).write_text(content + "\n", encoding='utf-8')
+
+def replace_symlink(link, target):
+    """Point ``link`` at ``target`` with an atomic rename (no-op if it already does)"""
+    if link.is_symlink() and os.readlink(link) == str(target):
+        return
+    tmp_link = link.with_name(f".{link.name}.tmp")
+    tmp_link.unlink(missing_ok=True)
+    tmp_link.symlink_to(target)
+    os.replace(tmp_link, link)
+
+def publish_release(card_files):
+    """Make this run's release the one the dashboard sees, in a single swap.
+
+    Cards in ``card_files`` that are missing from the release (failed this
+    run) are carried over from the previous one. An image without the
+    variant dashboard.yaml loads (e.g. carried over from before variants
+    existed) has it rendered here. The stable names
+    (WWW_DIR/<card>.png, OUTDIR/<card>.txt) are relative symlinks through
+    WWW_DIR/current, so flipping ``current`` switches every card at once.
+    current_timestamp.txt is written last.
+    """
+    release = get_release_dir()
+    release.mkdir(parents=True, exist_ok=True)
+    current = WWW_DIR / "current"
+    store = get_image_store()
+
+    def carry_over(name, legacy=None):
+        # Before the first release the dashboard read loose files instead
+        previous = current / name if current.is_dir() else legacy
+        if previous and previous.is_file():
+            store.link(previous.resolve(), release / name)
+            log.info(f"Carried over {name} from the previous release")
+
+    for filename in card_files:
+        stem = filename.replace('.txt', '')
+        image_name = f"{stem}.png"
+        if not (release / filename).exists():
+            carry_over(filename, OUTDIR / filename)
+        if not (release / image_name).exists():
+            # Keep the old image's variants with it; never mix them with a new image
+            carry_over(image_name, WWW_DIR / image_name)
+            for width in WIDTHS:
+                for fmt in FORMATS:
+                    carry_over(variant_name(stem, width, fmt))
+        dashboard_image = variant_name(stem, *DASHBOARD_VARIANT)
+        if (release / image_name).exists() and not (release / dashboard_image).exists():
+            publish_dashboard_variant(release / image_name, release / dashboard_image)
+
+    for path in release.iterdir():
+        if path.suffix == ".txt":
+            text_target = os.path.relpath(current / path.name, OUTDIR)
+            replace_symlink(OUTDIR / path.name, Path(text_target))
+        else:
+            replace_symlink(WWW_DIR / path.name, Path("current") / path.name)
+
+    replace_symlink(current, Path("releases") / TIMESTAMP)
+    log.info(f"✓ Published release {TIMESTAMP}")
+
+    # Write timestamp file for dashboard to read
+    timestamp_file = WWW_DIR / "current_timestamp.txt"
+    tmp_file = WWW_DIR / ".current_timestamp.txt.tmp"
+    tmp_file.write_text(TIMESTAMP)
+    os.replace(tmp_file, timestamp_file)
+    log.info(f"Timestamp file written: {TIMESTAMP}")
+
 # --- HISTORY FUNCTIONS ---
 def load_history():
+    """Open the history database, importing the legacy JSON file on first use"""
+    history = HistoryStore(HISTORY_DB)
     if HISTORY_FILE.exists():
-        try:
-            with open(HISTORY_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
+        imported = history.import_json(HISTORY_FILE)
+        log.info(f"Imported {imported} history entries from {HISTORY_FILE.name}")
+    return history
+
+def save_history(history, generated_content):
+    """Append this run's content and drop entries outside the retention window"""
+    history.add_many(generated_content.items())
+    removed = history.compact(HISTORY_DAYS_TO_KEEP)
+    if removed:
+        log.info(f"Compacted {removed} history entries older than {HISTORY_DAYS_TO_KEEP} days")
+
+def load_dedup_index(history):
+    """Open the near-duplicate index, seeding it from history on first use"""
+    index = DedupIndex(HISTORY_DB, threshold=DEDUP_THRESHOLD)
+    if len(index) == 0:
+        for category, content, date in history.entries():
+            index.add(category, content, date)
+    return index
 
-def save_history(history):
-    with open(HISTORY_FILE, 'w') as f:
-        json.dump(history, f, indent=4)
+def load_grounding():
+    """Open the Kiwix title index used to check text, or None if it isn't built"""
+    grounding = Grounding.open(KIWIX_INDEX)
+    if grounding is None:
+        log.warning(f"No Kiwix title index at {KIWIX_INDEX} (run kiwix_index.py build), text is not grounded")
+    return grounding
 
 def get_recent_examples(history, filename, days):
-    recent = []
-    if filename in history:
-        for entry in history[filename]:
-            try:
-                entry_date = datetime.fromisoformat(entry['date'])
-                if datetime.now() - entry_date < timedelta(days=days):
-                    recent.append(entry['content'])
-            except:
-                continue
-    return recent[-5:] if recent else []
+    since = datetime.now() - timedelta(days=days)
+    return history.recent(filename, since=since, limit=5)
 
 # --- PROMPTS ---
 def get_prompts(history):
@@ -161,55 +382,150 @@ def get_prompts(history):
     }
 
 # --- CONTENT GENERATION ---
-def gpt_text(prompt, max_tokens=80):
-    try:
-        response = openai_client.chat.completions.create(
-            model=TEXT_MODEL,
-            messages=[
-                {"role": "system", "content": "You are a factual assistant. Only provide real, verifiable information. Never make up facts, events, quotes, or historical information. If you're not certain something is true, don't include it."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=max_tokens,
-            temperature=0.7
-        )
+def gpt_text(prompt, max_tokens=80, fresh=False):
+    """Return GPT's reply to ``prompt``, or None on error
+
+    Replies are cached per day; ``fresh`` asks for a new reply instead of the
+    cached one (and caches that in its place).
+    """
+    request = dict(
+        model=TEXT_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a factual assistant. Only provide real, verifiable information. Never make up facts, events, quotes, or historical information. If you're not certain something is true, don't include it."},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=max_tokens,
+        temperature=0.7
+    )
+
+    def create():
+        with request_slots:
+            response = openai_client.chat.completions.create(**request)
         return response.choices[0].message.content.strip()
+
+    try:
+        return response_cache.call("chat.completions", {**request, "day": TODAY_STR}, create, fresh=fresh)
     except Exception as e:
         log.error(f"GPT text error: {e}")
         return None
 
-def gpt_image(prompt, filename):
-    """Generate artistic image with unique filename"""
-    # Let GPT choose an artist based on the content
+def choose_artists(items):
+    """Pick an artist for every image in a single chat call.
+
+    ``items`` maps image filename to the content it illustrates. Returns
+    ``{filename: artist}``; missing or unusable picks fall back to a random
+    entry from ARTISTS_FALLBACK.
+    """
+    if not items:
+        return {}
+
+    listing = "\n".join(f"- {name}: {content[:100]}" for name, content in items.items())
     artist_prompt = (
-        f"Based on this content: '{prompt[:100]}...', "
-        f"choose ONE famous artist (painter, illustrator, or visual artist from any era or culture) "
-        f"whose style would best suit illustrating this concept. "
+        f"For each item below, choose ONE famous artist (painter, illustrator, or visual artist from any era or culture) "
+        f"whose style would best suit illustrating it. "
         f"Consider artists from all movements: Renaissance, Impressionism, Surrealism, Pop Art, "
         f"Japanese Ukiyo-e, Abstract Expressionism, Art Nouveau, Bauhaus, Street Art, Digital Art, etc. "
-        f"Reply with ONLY the artist's name, nothing else."
+        f"Use a different artist for each item. "
+        f"Reply with ONLY a JSON object mapping each item name to the artist's name, "
+        f"e.g. {{\"fact.png\": \"Hokusai\"}}.\n\n{listing}"
     )
+
+    request = dict(
+        model=TEXT_MODEL,
+        messages=[
+            {"role": "system", "content": "You are an art expert. Reply with only JSON."},
+            {"role": "user", "content": artist_prompt}
+        ],
+        max_tokens=20 * len(items) + 20,
+        temperature=0.9,  # Higher temperature for more variety
+        response_format={"type": "json_object"}
+    )
+
+    def create():
+        with request_slots:
+            artist_response = openai_client.chat.completions.create(**request)
+        return artist_response.choices[0].message.content
+
+    picks = {}
+    try:
+        picks = json.loads(response_cache.call("chat.completions", {**request, "day": TODAY_STR}, create))
+        if not isinstance(picks, dict):
+            picks = {}
+    except Exception as e:
+        log.warning(f"Artist selection failed, using fallback artists: {e}")
+
+    artists = {}
+    for name in items:
+        artist = picks.get(name)
+        # Fallback if response is missing, too long or weird
+        if not isinstance(artist, str) or not artist.strip() or len(artist.strip()) > 40:
+            artist = random.choice(ARTISTS_FALLBACK)
+        artists[name] = artist.strip()
+    return artists
+
+def publish_image(store, blob, filename):
+    """Link a stored image and its variants into the dated archive and this run's release"""
+    # Dated archive copy
+    base_name = filename.replace('.png', '')
+    dated_filename = f"{base_name}_{TODAY_STR}.png"
+    store.link(blob, OUTDIR / "images" / dated_filename)
     
+    # Release copy, published with the rest of the set by publish_release()
+    release_path = store.link(blob, get_release_dir() / filename)
+    publish_variants(blob, base_name)
+    return f"releases/{TIMESTAMP}/{release_path.name}"
+
+def publish_variants(blob, base_name):
+    """Store downscaled WebP/JPEG copies of an image next to the original.
+
+    Dashboards draw the cards at a fraction of the 1024px original, so
+    they load e.g. ``fact_128.webp`` instead of the full PNG.
+    """
     try:
-        # Get artist recommendation
-        artist_response = openai_client.chat.completions.create(
-            model=TEXT_MODEL,
-            messages=[
-                {"role": "system", "content": "You are an art expert. Reply with only an artist name."},
-                {"role": "user", "content": artist_prompt}
-            ],
-            max_tokens=20,
-            temperature=0.9  # Higher temperature for more variety
-        )
-        
-        artist = artist_response.choices[0].message.content.strip()
+        variants = render_variants(blob)
+    except OSError as e:
+        log.warning(f"Could not create image variants for {base_name}: {e}")
+        return
+    for variant in variants:
+        variant_store = get_image_store(variant.suffix)
+        variant_blob = variant_store.put(variant.data)
+        variant_store.link(variant_blob, OUTDIR / "images" / variant.name(f"{base_name}_{TODAY_STR}"))
+        variant_store.link(variant_blob, get_release_dir() / variant.name(base_name))
+
+def publish_dashboard_variant(image, dest):
+    """Render just the DASHBOARD_VARIANT of ``image`` and publish it as ``dest``"""
+    width, fmt = DASHBOARD_VARIANT
+    try:
+        variants = render_variants(image, widths=(width,), formats=[fmt])
+    except OSError as e:
+        variants = []
+        log.error(f"Could not render {dest.name} for the dashboard: {e}")
+    for variant in variants:
+        variant_store = get_image_store(variant.suffix)
+        variant_store.link(variant_store.put(variant.data), dest)
+
+def gpt_image(prompt, filename, artist=None, manifest=None):
+    """Generate artistic image with unique filename
+
+    ``artist`` normally comes from the run's batch choose_artists() call;
+    without one, an artist is picked for this image alone. With a
+    ``manifest``, progress is recorded so a resumed run only redoes what is
+    missing.
+    """
+    card = filename.replace('.png', '')
+    try:
+        store = get_image_store()
+        if manifest and manifest.reached(card, "image"):
+            blob = store.blob_path(manifest.get(card, "sha256"))
+            if blob.exists():
+                if not manifest.reached(card, "linked"):
+                    publish_image(store, blob, filename)
+                    manifest.record(card, "linked")
+                log.info(f"✓ Image already done for {filename}")
+                return True
         
-        # Fallback if response is too long or weird
-        if len(artist) > 40 or not artist:
-            artists_fallback = [
-                "Monet", "Van Gogh", "Hokusai", "Picasso", "Dalí", "Warhol",
-                "Banksy", "Kahlo", "Basquiat", "Hockney", "Klimt", "Munch"
-            ]
-            artist = random.choice(artists_fallback)
+        if not artist:
+            artist = choose_artists({filename: prompt})[filename]
         
         log.info(f"Creating image in style of {artist}")
         
@@ -222,7 +538,7 @@ def gpt_image(prompt, filename):
             f"No text or words in the image. Family-friendly content."
         )
         
-        response = openai_client.images.generate(
+        image_request = dict(
             model=IMAGE_MODEL,
             prompt=image_prompt,
             size="1024x1024",
@@ -231,43 +547,36 @@ def gpt_image(prompt, filename):
             style="vivid"  # Use vivid for more artistic interpretation
         )
         
-        image_url = response.data[0].url
-        response_get = requests.get(image_url, timeout=30)
-        if response_get.status_code != 200:
-            log.error(
-                f"Image download failed for {filename} with status {response_get.status_code}"
-            )
-            return False
-        image_data = response_get.content
-        
-        # Save with timestamp in filename
-        base_name = filename.replace('.png', '')
-        timestamped_filename = f"{base_name}_{TIMESTAMP}.png"
-        
-        # Save dated archive copy
-        dated_filename = f"{base_name}_{TODAY_STR}.png"
-        dated_path = OUTDIR / "images" / dated_filename
-        with open(dated_path, 'wb') as f:
-            f.write(image_data)
-        
-        # Save timestamped version
-        timestamped_path = WWW_DIR / timestamped_filename
-        with open(timestamped_path, 'wb') as f:
-            f.write(image_data)
+        # The cache records the digest of the stored image, so a rerun reuses
+        # the blob instead of paying for the same image again
+        cache_key = response_cache.key("images.generate", {**image_request, "day": TODAY_STR})
+        cached = response_cache.get(cache_key)
+        blob = store.blob_path(cached["sha256"]) if cached else None
+        if blob is not None and blob.exists():
+            log.info(f"Reusing cached image for {filename}")
+        elif response_cache.mode == "replay":
+            raise CacheMiss(f"No recorded image for {filename}")
+        else:
+            with request_slots:
+                response = openai_client.images.generate(**image_request)
+            
+                # Stream the bytes straight into the store; each published name links to this blob
+                image_url = response.data[0].url
+                try:
+                    blob = download_image(image_url, store)
+                except ImageDownloadError as e:
+                    log.error(f"Image download failed for {filename}: {e}")
+                    return False
+            response_cache.put(cache_key, {"sha256": blob.stem})
         
-        # Update symlink
-        symlink_path = WWW_DIR / filename
-        if symlink_path.exists() or symlink_path.is_symlink():
-            symlink_path.unlink()
+        if manifest:
+            manifest.record(card, "image", sha256=blob.stem)
         
-        # Create relative symlink
-        try:
-            symlink_path.symlink_to(timestamped_filename)
-        except:
-            # If symlink fails, just copy the file
-            shutil.copy(timestamped_path, symlink_path)
+        release_name = publish_image(store, blob, filename)
+        if manifest:
+            manifest.record(card, "linked")
         
-        log.info(f"✓ Image saved: {filename} -> {timestamped_filename} (style: {artist})")
+        log.info(f"✓ Image saved: {filename} -> {release_name} (style: {artist})")
         return True
         
     except Exception as e:
@@ -279,9 +588,10 @@ def gpt_image(prompt, filename):
 def fetch_joke():
     """Get joke from API or generate one"""
     try:
-        r = requests.get("https://icanhazdadjoke.com/", 
-                        headers={"Accept": "application/json"}, 
-                        timeout=5)
+        with request_slots:
+            r = http_session.get("https://icanhazdadjoke.com/", 
+                            headers={"Accept": "application/json"}, 
+                            timeout=5)
         if r.status_code == 200:
             return r.json().get("joke", "Why don't scientists trust atoms? Because they make up everything!")
     except:
@@ -292,126 +602,358 @@ def fetch_joke():
     joke = gpt_text(prompt, max_tokens=60)
     return joke or "What do you call a bear with no teeth? A gummy bear!"
 
-def generate_word_with_retry(prompt):
-    """Try to generate a word that will pass image generation"""
+def generate_word_with_retry(prompt, text=None, artist=None, manifest=None, grounding=None):
+    """Try to generate a word that will pass image generation
+
+    ``text`` is an already generated first attempt, and ``artist`` is reused
+    for every retry so retries need no extra artist call. Regenerated words
+    go through :func:`generate_unique`, so one ``grounding`` can't find is
+    replaced by a text-only retry and doesn't use up an image attempt.
+    """
     for attempt in range(WORD_RETRY_LIMIT + 1):
-        text = gpt_text(prompt, max_tokens=40)
+        if attempt or not text:
+            # The cached reply is the word that just failed, so ask again
+            fresh = bool(attempt)
+            text = generate_unique(
+                "word.txt", lambda avoid: gpt_text(prompt + avoid, max_tokens=40, fresh=fresh),
+                grounding=grounding,
+            )
         if not text:
             continue
-            
+
         # Extract just the word
-        try:
-            word = text.split()[1]  # Get word after "Word:"
-        except:
-            word = "Serendipity"
-            
-        if gpt_image(word, "word.png"):
+        word = extract_headword(text) or "Serendipity"
+
+        if gpt_image(word, "word.png", artist, manifest):
             return text
             
         log.warning(f"Word '{word}' image failed, attempt {attempt + 1}")
     
     # If all attempts failed, use a safe fallback
     fallback_text = "Word: Serendipity - A happy accident or pleasant surprise"
-    gpt_image("Abstract concept of serendipity", "word.png")
+    gpt_image("Abstract concept of serendipity", "word.png", artist, manifest)
     return fallback_text
 
+# --- PIPELINE ---
+def text_token_limit(filename):
+    """Return the max_tokens budget for a content file"""
+    if filename == "poem.txt":
+        return 100
+    if filename in ["fact.txt", "history.txt", "on_this_day.txt"]:
+        return 70
+    if filename == "word.txt":
+        return 40
+    return 80
+
+def generate_unique(filename, generate, dedup=None, grounding=None):
+    """Call ``generate(avoid)`` until it returns grounded text that isn't a near-duplicate.
+
+    ``avoid`` is extra prompt text naming what was wrong: a word, author or
+    subject ``grounding`` couldn't find in the Kiwix titles, or repeated
+    content. At most GROUNDING_RETRY_LIMIT and DEDUP_RETRY_LIMIT
+    regenerations are made; after that the last text is kept so the card is
+    never left empty.
+    """
+    avoid = ""
+    ungrounded = repeats = 0
+    while True:
+        content = generate(avoid)
+        if not content:
+            return content
+        if grounding is not None:
+            check = grounding.check(filename, content)
+            if not check.ok:
+                if ungrounded >= GROUNDING_RETRY_LIMIT:
+                    log.warning(f"Keeping unverified {filename}: {check.reason}")
+                else:
+                    ungrounded += 1
+                    log.warning(f"{filename} failed grounding ({check.reason}), attempt {ungrounded}")
+                    avoid = check.hint
+                    continue
+        match = dedup.find_duplicate(content) if dedup is not None else None
+        if not match or repeats >= DEDUP_RETRY_LIMIT:
+            return content
+        repeats += 1
+        log.warning(
+            f"{filename} repeats earlier {match.category} content "
+            f"({match.similarity:.0%} similar), attempt {repeats}"
+        )
+        avoid = f"\n\nDo NOT repeat or rephrase this: {match.content[:80]}..."
+
+def resumed_text(filename, manifest):
+    """Return text a resumed run already generated for ``filename``, if any"""
+    card = filename.replace('.txt', '')
+    if manifest and manifest.reached(card, "text"):
+        log.info(f"✓ {filename} already generated")
+        content = manifest.get(card, "content")
+        if not (get_release_dir() / filename).exists():
+            write_card_text(filename, content)
+        return content
+    return None
+
+def generate_text_card(filename, prompt, dedup=None, manifest=None, grounding=None):
+    """Generate and write one card's text"""
+    content = resumed_text(filename, manifest)
+    if content:
+        return content
+
+    log.info(f"Generating {filename}")
+    max_tokens = text_token_limit(filename)
+    content = generate_unique(
+        filename, lambda avoid: gpt_text(prompt + avoid, max_tokens), dedup, grounding
+    )
+    if not content:
+        log.error(f"✗ Failed to generate {filename}")
+        return None
+
+    write_card_text(filename, content)
+    if manifest:
+        manifest.record(filename.replace('.txt', ''), "text", content=content)
+    log.info(f"✓ Generated {filename}")
+    return content
+
+def generate_joke_card(dedup=None, manifest=None):
+    """Fetch and write the joke"""
+    joke = resumed_text("joke.txt", manifest)
+    if joke:
+        return joke
+
+    log.info("Generating joke.txt")
+    joke = generate_unique("joke.txt", lambda avoid: fetch_joke(), dedup)
+    write_card_text("joke.txt", joke)
+    if manifest:
+        manifest.record("joke", "text", content=joke)
+    return joke
+
+def generate_image_card(filename, content, artist, manifest=None):
+    """Illustrate one card and return its text"""
+    image_name = filename.replace('.txt', '.png')
+    if gpt_image(content, image_name, artist, manifest) is False:
+        log.warning(f"Image generation failed for {image_name}")
+    return content
+
+def generate_word_image_card(prompt, text, artist, manifest=None, grounding=None):
+    """Illustrate the word of the day, regenerating the word if its image fails"""
+    word_text = generate_word_with_retry(prompt, text, artist, manifest, grounding)
+    if word_text != text:
+        write_card_text("word.txt", word_text)
+        if manifest:
+            manifest.record("word", "text", content=word_text)
+    return word_text
+
+def choose_run_artists(items, manifest=None):
+    """Batch-pick artists, reusing any a resumed run already chose
+
+    Picks are stored in the manifest without advancing the card's stage;
+    the "artist" stage is recorded once the card's text exists.
+    """
+    artists = {}
+    if manifest:
+        for name in items:
+            artist = manifest.get(name.replace('.png', ''), "artist")
+            if artist:
+                artists[name] = artist
+    missing = {name: content for name, content in items.items() if name not in artists}
+    for name, artist in choose_artists(missing).items():
+        artists[name] = artist
+        if manifest:
+            manifest.record(name.replace('.png', ''), artist=artist)
+    return artists
+
+def collect_results(tasks):
+    """Wait for ``{filename: future}`` tasks and return the non-empty results"""
+    results = {}
+    for filename, task in tasks.items():
+        try:
+            content = task.result()
+        except Exception:
+            log.exception("✗ Pipeline task failed for %s", filename)
+            continue
+        if content:
+            results[filename] = content
+    return results
+
+def run_pipeline(prompts, dedup=None, manifest=None, grounding=None):
+    """Generate every card concurrently and return {filename: content}.
+
+    All text requests go out at once, each checked against ``grounding``
+    (the offline Kiwix titles) and ``dedup`` so invented words, authors and
+    subjects, and repeats, are regenerated before any image is paid for.
+    Meanwhile one batch call picks an artist for every card from its
+    prompt, and each card's image is started as soon as its own text is
+    in, so the slowest text only delays its own image. The number of
+    requests actually in flight is capped by ``request_slots``. Work already
+    recorded in ``manifest`` (when resuming) is skipped.
+    """
+    # Texts, their images and the artist call can all be waiting at once
+    with ThreadPoolExecutor(max_workers=2 * len(prompts) + 3) as pool:
+        artists_task = None
+        if ENABLE_IMAGES:
+            items = {filename.replace('.txt', '.png'): prompt for filename, prompt in prompts.items()}
+            items["joke.png"] = "A clever, family-friendly joke"
+            artists_task = pool.submit(choose_run_artists, items, manifest)
+
+        def illustrate(filename, content):
+            image_name = filename.replace('.txt', '.png')
+            artist = artists_task.result().get(image_name)
+            if manifest and content and artist:
+                manifest.record(filename.replace('.txt', ''), "artist", artist=artist)
+            if filename == "word.txt":
+                return generate_word_image_card(prompts[filename], content, artist, manifest, grounding)
+            return generate_image_card(filename, content, artist, manifest)
+
+        text_tasks = {
+            pool.submit(generate_text_card, filename, prompt, dedup, manifest, grounding): filename
+            for filename, prompt in prompts.items()
+        }
+        text_tasks[pool.submit(generate_joke_card, dedup, manifest)] = "joke.txt"
+
+        generated_content = {}
+        image_tasks = {}
+        for task in as_completed(text_tasks):
+            filename = text_tasks[task]
+            content = collect_results({filename: task}).get(filename)
+            if content:
+                generated_content[filename] = content
+            if not ENABLE_IMAGES:
+                continue
+            # A failed word is regenerated by its image job
+            if filename == "word.txt" or (content and "[GENERATION FAILED]" not in content):
+                image_tasks[filename] = pool.submit(illustrate, filename, content)
+
+        generated_content.update(collect_results(image_tasks))
+    return generated_content
+
+# --- HOME ASSISTANT REFRESH ---
+def refresh_home_assistant(timestamp):
+    """Push the new timestamp to HA and re-read only the card sensors.
+
+    Setting the timestamp sensor changes every image's ``cachebust`` URL, and
+    ``homeassistant.update_entity`` makes the text sensors re-read their files
+    now instead of on their next scan. Returns True if HA accepted both calls.
+    """
+    if not HA_TOKEN:
+        log.warning("HA_TOKEN not set, cannot refresh Home Assistant over the API")
+        return False
+
+    headers = {"Authorization": f"Bearer {HA_TOKEN}", "Content-Type": "application/json"}
+    try:
+        r = requests.post(
+            f"{HA_URL}/api/states/{HA_TIMESTAMP_SENSOR}",
+            headers=headers,
+            json={"state": timestamp, "attributes": {"friendly_name": "Brain Boost Timestamp"}},
+            timeout=10
+        )
+        if r.status_code not in (200, 201):
+            log.error(f"Failed to update {HA_TIMESTAMP_SENSOR}: HTTP {r.status_code}")
+            return False
+        log.info(f"✓ {HA_TIMESTAMP_SENSOR} set to {timestamp}")
+
+        if HA_REFRESH_ENTITIES:
+            r = requests.post(
+                f"{HA_URL}/api/services/homeassistant/update_entity",
+                headers=headers,
+                json={"entity_id": HA_REFRESH_ENTITIES},
+                timeout=10
+            )
+            if r.status_code != 200:
+                log.error(f"Failed to refresh card sensors: HTTP {r.status_code}")
+                return False
+            log.info(f"✓ Refreshed {len(HA_REFRESH_ENTITIES)} card sensors")
+        return True
+    except Exception as e:
+        log.error(f"Error refreshing Home Assistant: {e}")
+        return False
+
+def restart_home_assistant():
+    """Restart the Home Assistant container (slow, takes the dashboard down)"""
+    log.info("Restarting Home Assistant to clear cache...")
+    try:
+        result = subprocess.run(['docker', 'restart', 'homeassistant'], 
+                              capture_output=True, text=True)
+        if result.returncode == 0:
+            log.info("Home Assistant restart initiated successfully")
+            log.info("Wait 30-60 seconds for Home Assistant to fully restart")
+            return True
+        log.error(f"Failed to restart Home Assistant: {result.stderr}")
+    except Exception as e:
+        log.error(f"Error restarting Home Assistant: {e}")
+    return False
+
+def invalidate_ha_cache(timestamp, restart_fallback=False):
+    """Refresh the dashboard via the API, restarting HA only if asked to"""
+    if refresh_home_assistant(timestamp):
+        return True
+    if restart_fallback:
+        return restart_home_assistant()
+    log.warning("Dashboard will pick up the new timestamp on its next sensor scan")
+    return False
+
 # --- MAIN ---
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the Daily Brain Boost cards")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Finish today's interrupted run instead of starting a new one"
+    )
+    parser.add_argument(
+        "--restart-ha",
+        action="store_true",
+        help="Restart the Home Assistant container if the API refresh fails"
+    )
+    args = parser.parse_args(argv if argv is not None else sys.argv[1:])
+    global TIMESTAMP
+
     log.info("=== Daily Brain Boost Generator Starting ===")
+    
+    # One manifest per day records each card's progress for --resume
+    manifest_path = OUTDIR / "runs" / f"{TODAY_STR}.json"
+    manifest = RunManifest.load(manifest_path) if args.resume else None
+    if manifest and manifest.finished:
+        log.info(f"Run {manifest.timestamp} already completed, nothing to resume")
+        return
+    if manifest:
+        TIMESTAMP = manifest.timestamp
+        log.info(f"Resuming run {TIMESTAMP}")
+    else:
+        if args.resume:
+            log.warning("No interrupted run found for today, starting a new one")
+        manifest = RunManifest(manifest_path, TIMESTAMP, TODAY_STR)
     log.info(f"Timestamp for this run: {TIMESTAMP}")
     
     # Clean up old images first
-    cleanup_old_images()
+    cleanup_old_images(manifest)
     
     history = load_history()
+    dedup = load_dedup_index(history)
     prompts = get_prompts(history)
+    grounding = load_grounding()
     
-    generated_content = {}
-    
-    # Generate text content
-    for filename, prompt in prompts.items():
-        if filename == "word.txt":
-            continue  # Handle separately
-            
-        log.info(f"Generating {filename}")
-        
-        # Adjust tokens for different content
-        if filename == "poem.txt":
-            max_tokens = 100
-        elif filename in ["fact.txt", "history.txt", "on_this_day.txt"]:
-            max_tokens = 70
-        else:
-            max_tokens = 80
-            
-        content = gpt_text(prompt, max_tokens)
-        
-        if content:
-            generated_content[filename] = content
-            filepath = OUTDIR / filename
-            filepath.write_text(content + "\n", encoding='utf-8')
-            log.info(f"✓ Generated {filename}")
-        else:
-            log.error(f"✗ Failed to generate {filename}")
-    
-    # Handle joke separately
-    log.info("Generating joke.txt")
-    joke = fetch_joke()
-    generated_content["joke.txt"] = joke
-    (OUTDIR / "joke.txt").write_text(joke + "\n", encoding='utf-8')
-    
-    # Handle word with retry logic
-    log.info("Generating word.txt")
-    word_text = generate_word_with_retry(prompts["word.txt"])
-    generated_content["word.txt"] = word_text
-    (OUTDIR / "word.txt").write_text(word_text + "\n", encoding='utf-8')
-    
-    # Generate images
-    if ENABLE_IMAGES:
-        log.info("Generating artistic images...")
-        
-        # Generate images for text content
-        for filename, content in generated_content.items():
-            if content and "[GENERATION FAILED]" not in content:
-                image_name = filename.replace('.txt', '.png')
-                if filename != "word.txt":  # Word already handled
-                    success = gpt_image(content, image_name)
-                    if success is False:
-                        log.warning(
-                            f"Image generation failed for {image_name}" 
-                        )
-    
-    # Update history
-    for filename, content in generated_content.items():
-        if content:
-            if filename not in history:
-                history[filename] = []
-            history[filename].append({
-                'date': datetime.now().isoformat(),
-                'content': content
-            })
+    log.info(f"Generating content with up to {MAX_CONCURRENT_REQUESTS} concurrent requests...")
+    generated_content = run_pipeline(prompts, dedup, manifest, grounding)
+    if grounding:
+        grounding.close()
     
-    save_history(history)
+    # Update history, once: a resumed run may have got this far before
+    if not manifest.done("history"):
+        save_history(history, generated_content)
+        manifest.mark_done("history")
+    if not manifest.done("dedup"):
+        dedup.add_many(generated_content.items())
+        manifest.mark_done("dedup")
+    history.close()
+    dedup.close()
     
-    # Write timestamp file for dashboard to read
-    timestamp_file = WWW_DIR / "current_timestamp.txt"
-    timestamp_file.write_text(TIMESTAMP)
-    log.info(f"Timestamp file written: {TIMESTAMP}")
+    # Swap the whole set in at once, then update the timestamp
+    publish_release(list(prompts) + ["joke.txt"])
     
+    manifest.mark_finished()
     log.info("=== Generation Complete ===")
     log.info(f"Images saved with timestamp: {TIMESTAMP}")
     
-    # Restart Home Assistant to clear cache
-    log.info("Restarting Home Assistant to clear cache...")
-    try:
-        result = subprocess.run(['docker', 'restart', 'homeassistant'], 
-                              capture_output=True, text=True)
-        if result.returncode == 0:
-            log.info("Home Assistant restart initiated successfully")
-            log.info("Wait 30-60 seconds for Home Assistant to fully restart")
-        else:
-            log.error(f"Failed to restart Home Assistant: {result.stderr}")
-    except Exception as e:
-        log.error(f"Error restarting Home Assistant: {e}")
+    # Point the dashboard at the new images without restarting HA
+    invalidate_ha_cache(TIMESTAMP, restart_fallback=args.restart_ha)
     
     log.info("=== Brain Boost Complete ===")
 
@@ -0,0 +1,159 @@
+"""Local near-duplicate detection for generated content.
+
+Each text is normalised to its set of content words (lower-cased, stop words
+and card labels removed, plurals folded) and reduced to a MinHash signature.
+The signature is split into bands for locality-sensitive hashing. Candidates
+are the stored texts sharing at least one band bucket, found with an indexed
+SQLite lookup rather than by comparing against every text. Their Jaccard
+similarity is then estimated from the signatures. Everything runs locally.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import random
+import re
+import sqlite3
+import struct
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs above ~50% similarity almost always collide
+ROWS = NUM_PERM // BANDS
+DEFAULT_THRESHOLD = 0.5
+
+_MERSENNE = (1 << 61) - 1
+_rng = random.Random(20250609)  # Fixed seed: signatures must be stable across runs
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)]
+
+STOP_WORDS = frozenset("""
+a about after all also an and any are as at be been but by can could did do does
+for from had has have he her his how i if in into is it its just me more most my
+no not of on one or our out over she so some than that the their them then there
+these they this those to up was we were what when where which who why will with
+would you your answer riddle word
+""".split())
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dedup_docs (
+    id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL,
+    date TEXT NOT NULL,
+    content TEXT NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dedup_bands (
+    band INTEGER NOT NULL,
+    bucket BLOB NOT NULL,
+    doc_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dedup_bands_bucket ON dedup_bands (band, bucket);
+"""
+
+
+@dataclass
+class Match:
+    """A stored text that is similar to the one being checked."""
+    similarity: float
+    category: str
+    content: str
+
+
+def shingles(text: str) -> set:
+    """Return the normalised content words of ``text``."""
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    result = set()
+    for w in words:
+        if w in STOP_WORDS or len(w) < 2:
+            continue
+        if len(w) > 3 and w.endswith("s") and not w.endswith("ss"):
+            w = w[:-1]
+        result.add(w)
+    return result
+
+
+def signature(text: str) -> Tuple[int, ...]:
+    """Return the MinHash signature of ``text``."""
+    tokens = [
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+        for s in shingles(text) or {text.strip().lower()}
+    ]
+    return tuple(
+        min((a * t + b) % _MERSENNE for t in tokens)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def _buckets(sig: Tuple[int, ...]) -> List[bytes]:
+    return [
+        hashlib.blake2b(struct.pack(f">{ROWS}Q", *sig[i * ROWS:(i + 1) * ROWS]), digest_size=8).digest()
+        for i in range(BANDS)
+    ]
+
+
+def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    """Estimate the Jaccard similarity of two signatures."""
+    return sum(a == b for a, b in zip(sig_a, sig_b)) / NUM_PERM
+
+
+class DedupIndex:
+    """Persistent MinHash/LSH index over every piece of content ever published."""
+
+    def __init__(self, path: Path, threshold: float = DEFAULT_THRESHOLD) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM dedup_docs").fetchone()[0]
+
+    def add(self, category: str, content: str, date: Optional[datetime] = None) -> None:
+        """Index one published text."""
+        self.add_many([(category, content)], date)
+
+    def add_many(self, entries: Iterable[Tuple[str, str]], date: Optional[datetime] = None) -> None:
+        """Index ``(category, content)`` pairs in one transaction."""
+        stamp = (date or datetime.now()).isoformat()
+        with self._lock, self.conn:
+            for category, content in entries:
+                if not content:
+                    continue
+                sig = signature(content)
+                doc_id = self.conn.execute(
+                    "INSERT INTO dedup_docs (category, date, content, signature) VALUES (?, ?, ?, ?)",
+                    (category, stamp, content, struct.pack(f">{NUM_PERM}Q", *sig)),
+                ).lastrowid
+                self.conn.executemany(
+                    "INSERT INTO dedup_bands (band, bucket, doc_id) VALUES (?, ?, ?)",
+                    [(band, bucket, doc_id) for band, bucket in enumerate(_buckets(sig))],
+                )
+
+    def find_duplicate(self, content: str, threshold: Optional[float] = None) -> Optional[Match]:
+        """Return the most similar stored text if it reaches ``threshold``."""
+        threshold = self.threshold if threshold is None else threshold
+        sig = signature(content)
+        query = " UNION ".join(["SELECT doc_id FROM dedup_bands WHERE band = ? AND bucket = ?"] * BANDS)
+        params = [value for pair in enumerate(_buckets(sig)) for value in pair]
+
+        best = None
+        with self._lock:
+            candidates = [doc_id for (doc_id,) in self.conn.execute(query, params)]
+            for doc_id in candidates:
+                category, stored, blob = self.conn.execute(
+                    "SELECT category, content, signature FROM dedup_docs WHERE id = ?", (doc_id,)
+                ).fetchone()
+                score = similarity(sig, struct.unpack(f">{NUM_PERM}Q", blob))
+                if score >= threshold and (best is None or score > best.similarity):
+                    best = Match(score, category, stored)
+        return best
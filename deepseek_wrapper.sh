@@ -3,6 +3,8 @@
 
 LLAMA_CLI="/media/pi/data/llama.cpp/build/bin/llama-cli"
 MODEL_PATH="/media/pi/data/llama.cpp/models/deepseek/deepseek-coder.Q4_K_M.gguf"
+PYTHON="/media/pi/data/assistant/venv/bin/python"
+LLM_CLIENT="/media/pi/data/assistant/llm/llm_server.py"
 
 # Accept prompt as first argument
 PROMPT="$1"
@@ -13,5 +15,12 @@ MAX_TOKENS="${2:-50}"
 # Optional: temperature, default 0.7
 TEMP="${3:-0.7}"
 
-# Run llama-cli with DeepSeek model and arguments
-"$LLAMA_CLI" -m "$MODEL_PATH" -p "$PROMPT" -n "$MAX_TOKENS" --temp "$TEMP"
+# Ask the persistent LLM service (model already loaded); only if it isn't
+# running (exit 2) fall back to a one-off llama-cli run
+"$PYTHON" "$LLM_CLIENT" ask --backend deepseek -n "$MAX_TOKENS" --temp "$TEMP" "$PROMPT"
+STATUS=$?
+if [[ $STATUS -eq 2 ]]; then
+    "$LLAMA_CLI" -m "$MODEL_PATH" -p "$PROMPT" -n "$MAX_TOKENS" --temp "$TEMP"
+else
+    exit "$STATUS"
+fi
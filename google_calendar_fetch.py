@@ -1,15 +1,219 @@
+"""Incremental Google Calendar sync into a local event store.
+
+The first run does a full sync of the primary calendar and keeps the
+``nextSyncToken`` the API hands back. Later runs send that token and only
+receive what changed since, which is applied to a local SQLite store
+(cancelled events are deleted). If Google expires the token (HTTP 410) the
+store is cleared and a full sync runs instead.
+
+Everything else - Home Assistant scripts, ``modules/calendar_summary.sh`` -
+reads upcoming events from the store without touching the network:
+
+    python google_calendar_fetch.py                    # sync, then list the next 7 days
+    python google_calendar_fetch.py --full             # force a full resync
+    python google_calendar_fetch.py --upcoming --json  # local query only
+
+``--upcoming`` exits non-zero if the store has never been synced, so callers
+can fall back to another source rather than report an empty week.
+"""
+
+import argparse
 import datetime
+import json
+import os
 import os.path
 import pickle
-
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+import sqlite3
+import sys
+import threading
+from dataclasses import dataclass
+from pathlib import Path
 
 # Scope: read-only access to Google Calendar
 SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']
+CREDENTIALS_FILE = '/media/pi/data/assistant/google/credentials.json'
+CALENDAR_DB = Path(os.getenv("CALENDAR_DB", "/media/pi/data/assistant/calendar/events.db"))
+SYNC_PAST_DAYS = 30  # How far back a full sync starts
+PAGE_SIZE = 250
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    calendar_id TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    start_ts REAL NOT NULL,
+    end_ts REAL NOT NULL,
+    all_day INTEGER NOT NULL,
+    summary TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (calendar_id, event_id)
+);
+CREATE INDEX IF NOT EXISTS events_start ON events (start_ts);
+CREATE TABLE IF NOT EXISTS sync_state (
+    calendar_id TEXT PRIMARY KEY,
+    sync_token TEXT,
+    synced_at TEXT NOT NULL
+);
+"""
+
+
+def _timestamp(when):
+    """Return (epoch seconds, all_day) for an event ``start``/``end`` object.
+
+    All-day dates are taken as local midnight.
+    """
+    if when.get('dateTime'):
+        value = when['dateTime'].replace('Z', '+00:00')
+        return datetime.datetime.fromisoformat(value).timestamp(), False
+    return datetime.datetime.fromisoformat(when['date']).timestamp(), True
+
+
+class EventStore:
+    """SQLite copy of a calendar, indexed by start time."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def sync_token(self, calendar_id):
+        """Return the stored sync token for ``calendar_id``, if any."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT sync_token FROM sync_state WHERE calendar_id = ?", (calendar_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def synced_at(self, calendar_id):
+        """Return when ``calendar_id`` was last synced, or ``None`` if it never was.
+
+        Set by every successful sync, even one Google sent no sync token for.
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT synced_at FROM sync_state WHERE calendar_id = ?", (calendar_id,)
+            ).fetchone()
+        return datetime.datetime.fromisoformat(row[0]) if row else None
+
+    def forget_sync_token(self, calendar_id):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM sync_state WHERE calendar_id = ?", (calendar_id,))
+
+    def apply(self, calendar_id, items, sync_token, full=False):
+        """Apply a sync result in one transaction.
+
+        A ``full`` result replaces every stored event of the calendar;
+        otherwise ``items`` are deltas. Cancelled events are deleted.
+        Returns ``(updated, deleted)``.
+        """
+        updated = deleted = 0
+        with self._lock, self.conn:
+            if full:
+                self.conn.execute("DELETE FROM events WHERE calendar_id = ?", (calendar_id,))
+            for event in items:
+                if event.get('status') == 'cancelled' or 'start' not in event:
+                    deleted += self.conn.execute(
+                        "DELETE FROM events WHERE calendar_id = ? AND event_id = ?",
+                        (calendar_id, event['id']),
+                    ).rowcount
+                    continue
+                start_ts, all_day = _timestamp(event['start'])
+                end_ts, _ = _timestamp(event.get('end', event['start']))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO events "
+                    "(calendar_id, event_id, start_ts, end_ts, all_day, summary, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (calendar_id, event['id'], start_ts, end_ts, int(all_day),
+                     event.get('summary', 'No Title'), json.dumps(event)),
+                )
+                updated += 1
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sync_state (calendar_id, sync_token, synced_at) VALUES (?, ?, ?)",
+                (calendar_id, sync_token, datetime.datetime.now().isoformat()),
+            )
+        return updated, deleted
+
+    def upcoming(self, days=7, now=None, limit=None):
+        """Return events overlapping the next ``days`` days, soonest first."""
+        now = now or datetime.datetime.now()
+        start = now.timestamp()
+        end = (now + datetime.timedelta(days=days)).timestamp()
+        query = (
+            "SELECT data FROM events WHERE start_ts < ? AND end_ts > ? "
+            "ORDER BY start_ts, summary"
+        )
+        params = [end, start]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+
+@dataclass
+class SyncResult:
+    """What a sync run did."""
+    full: bool
+    updated: int
+    deleted: int
+
+
+def _http_status(exc):
+    """Return the HTTP status of a googleapiclient ``HttpError`` (or ``None``)."""
+    return getattr(getattr(exc, 'resp', None), 'status', None)
+
+
+def sync_events(service, store, calendar_id='primary', full=False, now=None):
+    """Bring ``store`` up to date with ``calendar_id`` and return a :class:`SyncResult`.
+
+    Uses the stored sync token for an incremental sync; without one (or
+    with ``full``, or when Google answers 410 Gone) does a full sync from
+    ``SYNC_PAST_DAYS`` ago. Every page is fetched before anything is
+    written, so an interrupted sync leaves the store unchanged.
+    """
+    token = None if full else store.sync_token(calendar_id)
+    params = {'calendarId': calendar_id, 'singleEvents': True, 'maxResults': PAGE_SIZE}
+    if token:
+        params['syncToken'] = token
+    else:
+        since = (now or datetime.datetime.utcnow()) - datetime.timedelta(days=SYNC_PAST_DAYS)
+        params['timeMin'] = since.replace(microsecond=0).isoformat() + 'Z'
+
+    items = []
+    page_token = None
+    while True:
+        request = dict(params, pageToken=page_token) if page_token else params
+        try:
+            response = service.events().list(**request).execute()
+        except Exception as exc:
+            if token and _http_status(exc) == 410:
+                # Sync token expired: start again from scratch
+                store.forget_sync_token(calendar_id)
+                return sync_events(service, store, calendar_id, full=True, now=now)
+            raise
+        items.extend(response.get('items', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            break
+
+    updated, deleted = store.apply(
+        calendar_id, items, response.get('nextSyncToken'), full=not token
+    )
+    return SyncResult(full=not token, updated=updated, deleted=deleted)
+
+
+def get_service():
+    """Authorise and return a Calendar API service (Google libraries load lazily)."""
+    from google.auth.transport.requests import Request
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
 
-def main():
     creds = None
     # Load existing token if available
     if os.path.exists('token.pickle'):
@@ -20,43 +224,66 @@ def main():
         if creds and creds.expired and creds.refresh_token:
             creds.refresh(Request())
         else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                '/media/pi/data/assistant/google/credentials.json', SCOPES)
+            flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
 
             authorization_url, state = flow.authorization_url(prompt='consent')
             print(f'Please go to this URL: {authorization_url}')
             code = input('Enter the authorization code: ')
             flow.fetch_token(code=code)
             creds = flow.credentials
-            
+
         # Save credentials for next run
         with open('token.pickle', 'wb') as token:
             pickle.dump(creds, token)
 
     # Build Calendar API service
-    service = build('calendar', 'v3', credentials=creds)
+    return build('calendar', 'v3', credentials=creds)
 
-    now = datetime.datetime.utcnow().isoformat() + 'Z'  # 'Z' means UTC time
-    week_later = (datetime.datetime.utcnow() + datetime.timedelta(days=7)).isoformat() + 'Z'
 
-    # Fetch events in next 7 days, ordered by start time
-    events_result = service.events().list(
-        calendarId='primary',
-        timeMin=now,
-        timeMax=week_later,
-        singleEvents=True,
-        orderBy='startTime').execute()
-    events = events_result.get('items', [])
+def format_event(event):
+    start = event['start'].get('dateTime', event['start'].get('date'))
+    end = event['end'].get('dateTime', event['end'].get('date'))
+    summary = event.get('summary', 'No Title')
+    return f"- {start} to {end}: {summary}"
 
-    if not events:
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync Google Calendar and list upcoming events")
+    parser.add_argument('--upcoming', action='store_true', help="only query the local store (no network)")
+    parser.add_argument('--full', action='store_true', help="ignore the sync token and resync everything")
+    parser.add_argument('--days', type=int, default=7, help="how many days ahead to list (default 7)")
+    parser.add_argument('--json', action='store_true', help="print events as a JSON array")
+    parser.add_argument('--db', type=Path, default=CALENDAR_DB, help="event store path")
+    args = parser.parse_args(argv)
+
+    store = EventStore(args.db)
+    try:
+        if args.upcoming and store.synced_at('primary') is None:
+            sys.exit(f"{args.db} has never been synced; run without --upcoming first")
+        if not args.upcoming:
+            result = sync_events(get_service(), store, full=args.full)
+            kind = 'Full' if result.full else 'Incremental'
+            if not args.json:
+                print(f"{kind} sync: {result.updated} updated, {result.deleted} removed")
+        events = store.upcoming(args.days)
+    finally:
+        store.close()
+
+    if args.json:
+        print(json.dumps([
+            {
+                'summary': event.get('summary', 'No Title'),
+                'start': event['start'].get('dateTime', event['start'].get('date')),
+                'end': event['end'].get('dateTime', event['end'].get('date')),
+                'location': event.get('location', ''),
+            }
+            for event in events
+        ]))
+    elif not events:
         print('No upcoming events found.')
     else:
         for event in events:
-            start = event['start'].get('dateTime', event['start'].get('date'))
-            end = event['end'].get('dateTime', event['end'].get('date'))
-            summary = event.get('summary', 'No Title')
-            print(f"- {start} to {end}: {summary}")
+            print(format_event(event))
 
 if __name__ == '__main__':
     main()
-
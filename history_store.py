@@ -0,0 +1,116 @@
+"""SQLite history backend for the Daily Brain Boost.
+
+Replaces the ever-growing ``brain_boost_history.json``. Entries are appended
+with a single INSERT, an index on ``(category, date)`` turns "the last N items
+of a card" into a range scan instead of a parse of the whole file, and
+:meth:`HistoryStore.compact` drops entries older than the retention window.
+SQLite reuses the freed pages, so the file stops growing once the window is
+full.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL,
+    date TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_category_date ON history (category, date);
+"""
+
+
+class HistoryStore:
+    """Append-only content history indexed by (category, date)."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def add(self, category: str, content: str, date: Optional[datetime] = None) -> None:
+        """Append one entry."""
+        self.add_many([(category, content)], date)
+
+    def add_many(self, entries: Iterable[Tuple[str, str]], date: Optional[datetime] = None) -> None:
+        """Append ``(category, content)`` pairs in one transaction."""
+        stamp = (date or datetime.now()).isoformat()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO history (category, date, content) VALUES (?, ?, ?)",
+                [(category, stamp, content) for category, content in entries if content],
+            )
+
+    def recent(self, category: str, since: Optional[datetime] = None, limit: int = 5) -> List[str]:
+        """Return up to ``limit`` newest entries for ``category``, oldest first."""
+        since_str = since.isoformat() if since else ""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT content FROM history WHERE category = ? AND date >= ? "
+                "ORDER BY date DESC, id DESC LIMIT ?",
+                (category, since_str, limit),
+            ).fetchall()
+        return [content for (content,) in reversed(rows)]
+
+    def latest_per_category(self, limit: int = 5, since: Optional[datetime] = None) -> Dict[str, List[str]]:
+        """Return the last ``limit`` entries of every category, oldest first."""
+        with self._lock:
+            categories = [c for (c,) in self.conn.execute("SELECT DISTINCT category FROM history")]
+        return {category: self.recent(category, since, limit) for category in categories}
+
+    def entries(self) -> List[Tuple[str, str, datetime]]:
+        """Return every stored ``(category, content, date)``, oldest first."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT category, content, date FROM history ORDER BY date, id"
+            ).fetchall()
+        return [(category, content, datetime.fromisoformat(date)) for category, content, date in rows]
+
+    def compact(self, keep_days: int, now: Optional[datetime] = None) -> int:
+        """Delete entries older than ``keep_days`` and return how many were removed."""
+        cutoff = ((now or datetime.now()) - timedelta(days=keep_days)).isoformat()
+        with self._lock, self.conn:
+            cursor = self.conn.execute("DELETE FROM history WHERE date < ?", (cutoff,))
+        return cursor.rowcount
+
+    def import_json(self, json_path: Path) -> int:
+        """Import a legacy ``{category: [{date, content}]}`` file once.
+
+        The file is renamed to ``*.migrated`` afterwards so it is never
+        imported twice. Returns the number of entries imported.
+        """
+        json_path = Path(json_path)
+        try:
+            legacy = json.loads(json_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            legacy = {}
+
+        rows = []
+        for category, entries in legacy.items() if isinstance(legacy, dict) else []:
+            for entry in entries:
+                try:
+                    date = datetime.fromisoformat(entry["date"]).isoformat()
+                    rows.append((category, date, entry["content"]))
+                except (KeyError, TypeError, ValueError):
+                    continue
+
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO history (category, date, content) VALUES (?, ?, ?)", rows
+            )
+        json_path.rename(json_path.with_name(json_path.name + ".migrated"))
+        return len(rows)
@@ -0,0 +1,106 @@
+"""Content-addressed image store for the Daily Brain Boost.
+
+Every image is written exactly once, as ``blobs/<sha256[:2]>/<sha256>.png``
+under the store root. The dated archive copy and the web-served timestamped
+name are hard links to that blob, so generating an image costs one write no
+matter how many names it is published under.
+
+Hard links double as the reference count: a blob's ``st_nlink`` minus one is
+the number of names still pointing at it. Callers just unlink the names they
+no longer want and :meth:`ImageStore.gc` removes blobs nobody references.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterable
+
+
+class ImageStore:
+    """Write-once blob store keyed by SHA-256."""
+
+    def __init__(self, root: Path, suffix: str = ".png") -> None:
+        self.root = Path(root)
+        self.blobs = self.root / "blobs"
+        self.suffix = suffix
+
+    def blob_path(self, digest: str) -> Path:
+        """Return where the blob with ``digest`` lives (whether or not it exists)."""
+        return self.blobs / digest[:2] / f"{digest}{self.suffix}"
+
+    def put(self, data: bytes) -> Path:
+        """Store ``data`` and return its blob path, skipping the write if already stored."""
+        blob = self.blob_path(hashlib.sha256(data).hexdigest())
+        if blob.exists():
+            return blob
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=blob.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, blob)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return blob
+
+    def put_file(self, path: Path, digest: str) -> Path:
+        """Move an already written file with a known ``digest`` into the store.
+
+        ``path`` must be on the same filesystem as the store (e.g. created in
+        :meth:`tmp_dir`). If the blob already exists the file is discarded.
+        """
+        blob = self.blob_path(digest)
+        if blob.exists():
+            Path(path).unlink(missing_ok=True)
+            return blob
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, blob)
+        return blob
+
+    def tmp_dir(self) -> Path:
+        """Return a scratch directory on the store's filesystem."""
+        tmp = self.root / "tmp"
+        tmp.mkdir(parents=True, exist_ok=True)
+        return tmp
+
+    def link(self, blob: Path, dest: Path) -> Path:
+        """Publish ``blob`` as ``dest``, atomically replacing any existing file.
+
+        Uses a hard link; if ``dest`` is on another filesystem the blob is
+        copied instead (and that copy does not count as a reference).
+        """
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.{os.getpid()}.tmp")
+        tmp.unlink(missing_ok=True)
+        try:
+            os.link(blob, tmp)
+        except OSError:
+            shutil.copyfile(blob, tmp)
+        os.replace(tmp, dest)
+        return dest
+
+    def references(self, blob: Path) -> int:
+        """Return how many published names point at ``blob``."""
+        return Path(blob).stat().st_nlink - 1
+
+    def gc(self, keep: Iterable[str] = ()) -> list[Path]:
+        """Delete blobs with no remaining references and return them.
+
+        Blobs whose digest is in ``keep`` survive even when unreferenced
+        (e.g. stored by an interrupted run that will still publish them).
+        """
+        keep = set(keep)
+        removed = []
+        if not self.blobs.exists():
+            return removed
+        for blob in self.blobs.glob(f"*/*{self.suffix}"):
+            if blob.stem not in keep and self.references(blob) <= 0:
+                blob.unlink()
+                removed.append(blob)
+        return removed
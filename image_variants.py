@@ -0,0 +1,101 @@
+"""Downscaled image derivatives for dashboards and the web hub.
+
+Generated images are 1024x1024 PNGs of 1-2 MB, but dashboard cards draw
+them at a few dozen to a few hundred pixels. :func:`render_variants`
+decodes the original once and produces WebP and JPEG (plus AVIF when the
+installed Pillow can write it) at each of :data:`WIDTHS`, so clients can
+fetch the smallest adequate size. Variants are named
+``<stem>_<width>.<ext>`` next to the original.
+"""
+
+from __future__ import annotations
+
+import io
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from PIL import Image
+
+# 128 covers the dashboard's 35px icons on 3x screens; 256/512 the web hub
+WIDTHS = (128, 256, 512)
+
+# Pillow format name, file extension and save options, smallest first
+FORMATS = {
+    "avif": ("AVIF", ".avif", {"quality": 60}),
+    "webp": ("WEBP", ".webp", {"quality": 80, "method": 6}),
+    "jpeg": ("JPEG", ".jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+@dataclass
+class Variant:
+    """One encoded derivative of an image."""
+
+    width: int
+    fmt: str
+    data: bytes
+
+    @property
+    def suffix(self) -> str:
+        return FORMATS[self.fmt][1]
+
+    def name(self, stem: str) -> str:
+        """Return the file name of this variant for an original named ``stem``."""
+        return variant_name(stem, self.width, self.fmt)
+
+
+def variant_name(stem: str, width: int, fmt: str) -> str:
+    """Return ``<stem>_<width>.<ext>``."""
+    return f"{stem}_{width}{FORMATS[fmt][1]}"
+
+
+def available_formats() -> List[str]:
+    """Return the variant formats this Pillow build can encode."""
+    Image.init()
+    return [fmt for fmt, (pil_format, _, _) in FORMATS.items() if pil_format in Image.SAVE]
+
+
+def render_variants(
+    source: Path,
+    widths: Sequence[int] = WIDTHS,
+    formats: Optional[Sequence[str]] = None,
+) -> List[Variant]:
+    """Encode ``source`` at every width in every format.
+
+    Widths at or above the original's are skipped; the original already
+    serves those sizes.
+    """
+    formats = available_formats() if formats is None else formats
+    variants = []
+    with Image.open(source) as original:
+        original.load()
+        for width in sorted(widths):
+            if width >= original.width:
+                continue
+            height = max(1, round(original.height * width / original.width))
+            resized = original.resize((width, height), Image.LANCZOS)
+            for fmt in formats:
+                pil_format, _, options = FORMATS[fmt]
+                image = resized
+                if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+                    image = image.convert("RGB")
+                buffer = io.BytesIO()
+                image.save(buffer, pil_format, **options)
+                variants.append(Variant(width, fmt, buffer.getvalue()))
+    return variants
+
+
+def write_variants(source: Path, dest_dir: Optional[Path] = None, **kwargs) -> List[Path]:
+    """Write the variants of ``source`` as files and return their paths."""
+    source = Path(source)
+    dest_dir = Path(dest_dir or source.parent)
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for variant in render_variants(source, **kwargs):
+        path = dest_dir / variant.name(source.stem)
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_bytes(variant.data)
+        tmp.replace(path)
+        paths.append(path)
+    return paths
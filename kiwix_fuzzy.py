@@ -0,0 +1,409 @@
+"""Typo-tolerant search over the Kiwix titles, for misspelled voice queries.
+
+whisper.cpp transcripts get case, punctuation and spelling wrong ("converse
+logik"), so exact lookups in :mod:`kiwix_index` miss them. This module adds
+a trigram index on top of the title index and ranks titles by edit distance
+to the query.
+
+A search for ``q`` allowing ``k`` edits works in stages, each cheaper than
+the next but applied to fewer titles:
+
+1. Length filter. A match is at most ``k`` characters longer or shorter.
+   Posting lists are sorted by title length, so that is one slice of each.
+2. Rarest grams first. Shared trigrams are counted from the shortest
+   slices until :data:`GRAM_BUDGET` entries have been read; the common
+   grams ("lan", "the") left over say little about which title is meant.
+3. Count filter. One edit destroys at most three trigrams, so a match
+   shares all but ``3k`` of the counted grams. Of those, the
+   :data:`CANDIDATES` titles sharing the most go on.
+4. Banded Levenshtein with early exit, then the top ``limit`` by distance.
+
+Stopping at the budget makes this approximate: a very common title can in
+principle be crowded out. The ``bench`` command measures how often.
+
+Titles are compared in a normal form: case-folded, with punctuation replaced
+by spaces and runs of whitespace collapsed. The index maps trigram ids to
+title positions in ``titles.idx``. It is written next to that file, and is
+memory-mapped the same way, so opening it is instant and only touched pages
+are resident::
+
+    python kiwix_fuzzy.py build
+    python kiwix_fuzzy.py search "converse logik"
+    python kiwix_fuzzy.py bench
+
+File layout (little-endian)::
+
+    header    b"KIWXFUZ1", version, title count, gram count
+    keys      gram count uint64 trigram keys, sorted
+    offsets   gram count + 1 uint32 offsets into postings
+    postings  uint32 title positions per gram, ordered by (length, position)
+    lengths   title count uint16 normalised title lengths
+"""
+
+from __future__ import annotations
+
+import argparse
+import mmap
+import random
+import re
+import resource
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from kiwix_index import DEFAULT_INDEX, TitleIndex
+
+DEFAULT_FUZZY_INDEX = DEFAULT_INDEX.with_suffix(".fuzzy")
+
+MAGIC = b"KIWXFUZ1"
+VERSION = 1
+HEADER = struct.Struct("<8sIII")
+MAX_LENGTH = 0xFFFF
+GRAM_BUDGET = 12000  # Posting entries counted per query; rare grams are read first
+CANDIDATES = 64  # Titles sharing the most grams that get a full edit-distance check
+
+
+def normalize(text: str) -> str:
+    """Return the comparison form of a title or query."""
+    return " ".join(re.sub(r"[\W_]+", " ", text.casefold()).split())
+
+
+def trigrams(norm: str) -> set:
+    """Return the trigram keys of a normalised string, padded so short words have some."""
+    padded = f"  {norm} "
+    return {
+        ord(padded[i]) << 42 | ord(padded[i + 1]) << 21 | ord(padded[i + 2])
+        for i in range(len(padded) - 2)
+    }
+
+
+def default_max_distance(norm: str) -> int:
+    """Return how many edits a query of this length may be away from a title."""
+    if len(norm) <= 4:
+        return 1
+    if len(norm) <= 12:
+        return 2
+    return 3
+
+
+def levenshtein(a: str, b: str, limit: int) -> int:
+    """Return the edit distance of ``a`` and ``b``, or ``limit + 1`` if it exceeds ``limit``.
+
+    Only the diagonal band of width ``2 * limit + 1`` is computed, and the
+    computation stops as soon as a whole row is over the limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) > len(b):
+        a, b = b, a
+    over = limit + 1
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        lo = max(1, i - limit)
+        hi = min(len(b), i + limit)
+        current = [over] * (len(b) + 1)
+        current[0] = i if i <= limit else over
+        ca = a[i - 1]
+        best = current[0]
+        for j in range(lo, hi + 1):
+            cost = previous[j - 1] + (ca != b[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost
+            if cost < best:
+                best = cost
+        if best > limit:
+            return over
+        previous = current
+    return min(previous[len(b)], over)
+
+
+def build_fuzzy_index(titles: TitleIndex, out: Path = DEFAULT_FUZZY_INDEX) -> int:
+    """Build the trigram index for ``titles`` and return the number of distinct grams."""
+    postings: Dict[int, array] = {}
+    norms = [normalize(titles.title(i)) for i in range(len(titles))]
+    lengths = array("H", (min(len(norm), MAX_LENGTH) for norm in norms))
+    # Shortest titles first, so every posting list ends up sorted by length
+    for i in sorted(range(len(norms)), key=lengths.__getitem__):
+        for gram in trigrams(norms[i]):
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array("I")
+            posting.append(i)
+
+    keys = array("Q", sorted(postings))
+    offsets = array("I", [0])
+    for key in keys:
+        offsets.append(offsets[-1] + len(postings[key]))
+
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(titles), len(keys)))
+        keys.tofile(f)
+        offsets.tofile(f)
+        for key in keys:
+            postings[key].tofile(f)
+        lengths.tofile(f)
+    tmp.replace(out)
+    return len(keys)
+
+
+@dataclass(frozen=True)
+class FuzzyMatch:
+    """A title close to the query."""
+
+    title: str
+    sources: tuple
+    distance: int
+
+
+class FuzzyIndex:
+    """Read-only, memory-mapped trigram index over a :class:`~kiwix_index.TitleIndex`."""
+
+    def __init__(self, path: Path = DEFAULT_FUZZY_INDEX, titles: Optional[TitleIndex] = None) -> None:
+        self.path = Path(path)
+        self.titles = titles if titles is not None else TitleIndex(DEFAULT_INDEX)
+        self._owns_titles = titles is None
+        with self.path.open("rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, grams = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION or count != len(self.titles):
+            self.close()
+            raise ValueError(f"{self.path} does not match {self.titles.path}; rebuild it")
+        view = memoryview(self._mm)
+        at = HEADER.size
+        self._keys = view[at:at + 8 * grams].cast("Q")
+        at += 8 * grams
+        self._offsets = view[at:at + 4 * (grams + 1)].cast("I")
+        at += 4 * (grams + 1)
+        total = self._offsets[grams]
+        self._postings = view[at:at + 4 * total].cast("I")
+        at += 4 * total
+        self._lengths = view[at:at + 2 * count].cast("H")
+
+    def close(self) -> None:
+        for name in ("_keys", "_offsets", "_postings", "_lengths"):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        self._mm.close()
+        if self._owns_titles:
+            self.titles.close()
+
+    def __enter__(self) -> "FuzzyIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _posting(self, gram: int) -> memoryview:
+        i = bisect_left(self._keys, gram)
+        if i == len(self._keys) or self._keys[i] != gram:
+            return self._postings[0:0]
+        return self._postings[self._offsets[i]:self._offsets[i + 1]]
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        max_distance: Optional[int] = None,
+        sources: Optional[Sequence[str]] = None,
+    ) -> List[FuzzyMatch]:
+        """Return up to ``limit`` titles within ``max_distance`` edits of ``query``, closest first.
+
+        Titles that only differ in case or punctuation are returned once,
+        with the sources of all of them.
+        """
+        norm = normalize(query)
+        if not norm:
+            return []
+        k = default_max_distance(norm) if max_distance is None else max_distance
+        size = len(norm)
+
+        # 1. Length filter: each posting is sorted by title length, so the
+        #    titles within k characters of the query are one slice of it
+        by_length = self._lengths.__getitem__
+        windows = []
+        for gram in trigrams(norm):
+            posting = self._posting(gram)
+            lo = bisect_left(posting, size - k, key=by_length)
+            hi = bisect_right(posting, size + k, lo=lo, key=by_length)
+            windows.append(posting[lo:hi])
+        windows.sort(key=len)
+
+        # 2. Count shared grams, rarest first, within the posting budget
+        shared: Counter = Counter()
+        budget = GRAM_BUDGET
+        counted = 0
+        for window in windows:
+            if budget <= 0:
+                break
+            shared.update(window)
+            budget -= len(window)
+            counted += 1
+
+        # 3. Count filter: k edits destroy at most 3k of the counted grams,
+        #    then keep the titles sharing the most
+        needed = counted - 3 * k
+        if needed > 1:
+            shared = Counter({i: n for i, n in shared.items() if n >= needed})
+        mask = self.titles.source_mask(sources)
+        candidates = []
+        for i, _ in shared.most_common(CANDIDATES):
+            if self.titles.mask(i) & mask:
+                candidates.append(i)
+
+        # 4. Verify with the real edit distance, tightening the bound once
+        #    ``limit`` titles are in hand
+        best: Dict[str, Tuple[int, int, List[int]]] = {}
+        bound = k
+        for i in candidates:
+            title_norm = normalize(self.titles.title(i))
+            if title_norm in best:
+                best[title_norm][2].append(i)
+                continue
+            distance = levenshtein(norm, title_norm, bound)
+            if distance > bound:
+                continue
+            best[title_norm] = (distance, i, [i])
+            if len(best) >= limit:
+                bound = min(bound, sorted(d for d, _, _ in best.values())[limit - 1])
+        ranked = sorted(best.items(), key=lambda item: (item[1][0], abs(len(item[0]) - size), item[1][1]))
+
+        matches = []
+        for _, (distance, first, positions) in ranked[:limit]:
+            combined = 0
+            for i in positions:
+                combined |= self.titles.mask(i) & mask
+            entry = self.titles.entry(first)
+            sources_found = tuple(s for bit, s in enumerate(self.titles.sources) if combined >> bit & 1)
+            matches.append(FuzzyMatch(entry.title, sources_found, distance))
+        return matches
+
+
+def misspell(title: str, edits: int, rng: random.Random) -> str:
+    """Return ``title`` with ``edits`` random substitutions, deletions or insertions."""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    text = list(title)
+    for _ in range(edits):
+        op = rng.choice("sdi")
+        pos = rng.randrange(len(text)) if text else 0
+        if op == "s" and text:
+            text[pos] = rng.choice(letters.replace(text[pos].lower(), ""))
+        elif op == "d" and len(text) > 1:
+            del text[pos]
+        else:
+            text.insert(pos, rng.choice(letters))
+    return "".join(text)
+
+
+def _memory_mb() -> Tuple[float, float]:
+    """Return (private, file-backed) resident memory in MB.
+
+    Touched pages of the mmapped index files count as file-backed: they
+    live in the page cache and are shared with every other reader.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident, shared = (int(n) for n in f.read().split()[1:3])
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 0.0
+    page = mmap.PAGESIZE / 2**20
+    return (resident - shared) * page, shared * page
+
+
+def bench(index: FuzzyIndex, queries: int = 1000, limit: int = 10, seed: int = 1) -> Dict[str, float]:
+    """Search ``queries`` misspelled random titles and return latency and recall figures."""
+    rng = random.Random(seed)
+    latencies = []
+    found = 0
+    for entry in index.titles.sample(queries, rng=rng):
+        norm = normalize(entry.title)
+        # A deletion can shorten the query into a stricter distance bracket
+        edits = rng.randint(1, min(2, default_max_distance(norm[:-2])))
+        query = misspell(entry.title, edits, rng)
+        if rng.random() < 0.5:
+            query = query.lower()
+        start = time.perf_counter()
+        matches = index.search(query, limit)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found += any(normalize(m.title) == norm for m in matches)
+    latencies.sort()
+
+    def pct(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+
+    return {
+        "queries": len(latencies),
+        "mean_ms": sum(latencies) / len(latencies),
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "max_ms": latencies[-1],
+        "recall": found / len(latencies),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Typo-tolerant search over the Kiwix titles")
+    parser.add_argument("--index", type=Path, default=DEFAULT_INDEX, help="title index (kiwix_index.py)")
+    parser.add_argument("--fuzzy-index", type=Path, default=DEFAULT_FUZZY_INDEX, help="trigram index file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="build the trigram index from the title index")
+    search = sub.add_parser("search", help="titles closest to a (misspelled) query")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=10)
+    search.add_argument("--max-distance", type=int, help="edits allowed (default by query length)")
+    search.add_argument("--source", action="append", help="source file or corpus to restrict to")
+    bench_cmd = sub.add_parser("bench", help="measure latency, recall and memory on misspelled titles")
+    bench_cmd.add_argument("-n", "--queries", type=int, default=1000)
+    bench_cmd.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        with TitleIndex(args.index) as titles:
+            start = time.perf_counter()
+            grams = build_fuzzy_index(titles, args.fuzzy_index)
+            print(
+                f"Indexed {len(titles)} titles ({grams} trigrams) into {args.fuzzy_index} "
+                f"in {time.perf_counter() - start:.1f}s"
+            )
+        return
+
+    private_before, _ = _memory_mb()
+    start = time.perf_counter()
+    titles = TitleIndex(args.index)
+    with FuzzyIndex(args.fuzzy_index, titles) as index:
+        opened_ms = (time.perf_counter() - start) * 1000
+        if args.command == "search":
+            for match in index.search(args.query, args.limit, args.max_distance, args.source):
+                print(f"{match.distance}\t{match.title}\t{','.join(match.sources)}")
+        else:
+            results = bench(index, args.queries, args.limit)
+            size_mb = (args.index.stat().st_size + args.fuzzy_index.stat().st_size) / 2**20
+            print(f"titles           {len(titles)}")
+            print(f"index files      {size_mb:.1f} MB (mmapped)")
+            print(f"open             {opened_ms:.2f} ms")
+            for key in ("mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"):
+                print(f"{key:<16} {results[key]:.2f}")
+            print(f"recall@{args.limit:<9} {results['recall']:.1%}")
+            private, mapped = _memory_mb()
+            print(f"private memory   +{private - private_before:.1f} MB")
+            print(f"page cache       {mapped:.1f} MB of index and code pages touched")
+    titles.close()
+    if args.command == "bench" and results["p95_ms"] > 10:
+        sys.exit("p95 latency is over the 10 ms target")
+
+
+if __name__ == "__main__":
+    main()
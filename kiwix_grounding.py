@@ -0,0 +1,221 @@
+"""Offline sanity checks for Brain Boost text against the Kiwix title index.
+
+The prompts ask GPT not to invent words, quotes or facts, but nothing used to
+check. :class:`Grounding` looks the claimed subject of a card up in the
+title index built by ``kiwix_index.py``:
+
+``word.txt``                  the headword must be a title anywhere in the library
+``quote.txt``, ``poem.txt``   the author must have a Wikiquote/Wikipedia page
+``fact.txt`` and friends      at least one named subject must have a page
+
+The Wiktionary dump only lists some 55k headwords, so words are also looked
+up in Wikipedia and Wikiquote, which have pages (or redirects) for most real
+words it misses. It is a title check, not fact checking: it catches invented words and
+people, which are the failures that used to cost a paid image. Cards
+without a checker, and facts that name nothing, pass.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from kiwix_index import DEFAULT_INDEX, TitleIndex
+
+ENCYCLOPEDIA = ("wikipedia", "wikiquote")
+
+# Card -> (kind of check, corpora to look in; None for all of them)
+CHECKS = {
+    "word.txt": ("headword", None),
+    "quote.txt": ("author", ENCYCLOPEDIA),
+    "poem.txt": ("author", ENCYCLOPEDIA),
+    "fact.txt": ("subject", ENCYCLOPEDIA),
+    "history.txt": ("subject", ENCYCLOPEDIA),
+    "on_this_day.txt": ("subject", ENCYCLOPEDIA),
+}
+
+# Capitalised words that name nothing specific (or everything, for UK prompts)
+GENERIC_WORDS = frozenset("""
+The A An In On At By Of For From This That These It Its He She They His Her Their
+During After Before When While Today Answer Word Riddle Quote
+British Britain UK United Kingdom England English Scotland Scottish Wales Welsh
+Ireland Irish London Sir Dame Lord Lady
+Great Company King Queen Prince Princess Battle War Church Empire Royal National
+""".split())
+# Dates end a name: "14 October the Battle of Hastings" is two things
+DATE_WORDS = frozenset("""
+January February March April May June July August September October November December
+Monday Tuesday Wednesday Thursday Friday Saturday Sunday
+""".split())
+# "and" is left out: "Andre Geim and Konstantin Novoselov" is two names
+CONNECTORS = frozenset({"of", "the", "de", "von", "van", "du", "la", "le"})
+HONORIFICS = ("Sir ", "Dame ", "Lord ", "Lady ", "Dr ", "Dr. ", "Saint ", "St ")
+MAX_SUBJECT_WORDS = 6
+
+_HEADWORD = re.compile(
+    r"word[*_]*\s*:[*_]*\s*[*_\"']*([A-Za-z][A-Za-z' -]*?)[*_\"']*\s*(?:\(|[-–—:]\s|$)", re.I
+)
+_ATTRIBUTION_DASH = re.compile(r"(?:^|(?<=[\s\"'”’.!?]))[-–—~]+\s*")
+_TOKEN = re.compile(r"[A-Za-z][A-Za-z'’-]*|[.!?]")
+
+
+def extract_headword(text: str) -> Optional[str]:
+    """Return the word of a ``Word: <word> - <definition>`` card."""
+    match = _HEADWORD.search(text)
+    return match.group(1).strip() if match else None
+
+
+def extract_author(text: str) -> Optional[str]:
+    """Return the author after the final dash of a quote or poem.
+
+    ``'"..." — Samuel Johnson, 1775'`` -> ``"Samuel Johnson"``.
+    """
+    dashes = list(_ATTRIBUTION_DASH.finditer(text.strip()))
+    if not dashes:
+        return None
+    author = re.sub(r"\([^)]*\)", " ", text.strip()[dashes[-1].end():]).split(",")[0]
+    author = author.strip(" \t*_\"'“”‘’.")
+    return author or None
+
+
+def candidate_subjects(text: str) -> List[str]:
+    """Return the capitalised names in ``text``, longest first.
+
+    Runs of capitalised words (allowing "of", "the", ... inside) are taken
+    whole and as shorter multi-word sub-spans, so "the Great Fire of London"
+    gives "Great Fire of London", "Great Fire", "Fire of London". A single
+    word only counts when it is a run on its own that doesn't start a
+    sentence and isn't in :data:`GENERIC_WORDS`: "Octopuses have three
+    hearts" names nothing, and "Great" alone proves nothing about the fire.
+    """
+    runs = []
+    run: List[str] = []
+    initial = sentence_start = True
+    for token in _TOKEN.findall(text):
+        if token in ".!?" or token in DATE_WORDS:
+            runs.append((run, initial))
+            run, sentence_start = [], token in ".!?"
+            continue
+        word = token.strip("'’")
+        if word[:1].isupper():
+            if not (sentence_start and word in GENERIC_WORDS):
+                if not run:
+                    initial = sentence_start
+                run.append(word)
+        elif run and word in CONNECTORS:
+            run.append(word)
+        else:
+            runs.append((run, initial))
+            run = []
+        sentence_start = False
+    runs.append((run, initial))
+
+    found = {}
+    for run, initial in runs:
+        while run and run[-1] in CONNECTORS:
+            run = run[:-1]
+        for size in range(min(len(run), MAX_SUBJECT_WORDS), 0, -1):
+            for start in range(len(run) - size + 1):
+                span = run[start:start + size]
+                if span[0] in CONNECTORS or span[-1] in CONNECTORS:
+                    continue
+                if size == 1 and (len(run) > 1 or initial or span[0] in GENERIC_WORDS):
+                    continue
+                found.setdefault(" ".join(span), len(found))
+    return sorted(found, key=lambda s: (-len(s.split()), found[s]))
+
+
+def _title_forms(title: str) -> List[str]:
+    """Return ``title`` and the forms its page may be under: no possessive, singular."""
+    forms = [title]
+    if title.endswith(("'s", "’s")):
+        forms.append(title[:-2])
+    base = forms[-1]
+    if base.endswith("ies") and len(base) > 4:
+        forms.append(base[:-3] + "y")
+    elif base.endswith("es") and len(base) > 3:
+        forms += [base[:-2], base[:-1]]
+    elif base.endswith("s") and not base.endswith("ss") and len(base) > 3:
+        forms.append(base[:-1])
+    return forms
+
+
+@dataclass
+class GroundingResult:
+    """Outcome of checking one card."""
+
+    ok: bool
+    subject: Optional[str] = None
+    reason: str = ""
+
+    @property
+    def hint(self) -> str:
+        """Prompt text asking the model to double-check what couldn't be verified.
+
+        The title dumps are incomplete, so a miss is no proof the subject is
+        invented; the hint questions it rather than banning it.
+        """
+        if self.ok:
+            return ""
+        if self.subject is None:
+            return f"\n\nYour last answer failed verification ({self.reason}). Follow the format exactly."
+        return (
+            f"\n\n'{self.subject}' could not be verified in the reference library. Keep it only "
+            "if you are certain it is real and correctly spelled; otherwise choose a well-documented one."
+        )
+
+
+class Grounding:
+    """Checks cards against a :class:`~kiwix_index.TitleIndex`."""
+
+    def __init__(self, index: TitleIndex) -> None:
+        self.index = index
+
+    @classmethod
+    def open(cls, path: Path = DEFAULT_INDEX) -> Optional["Grounding"]:
+        """Open the index at ``path``, or return ``None`` if it is missing or unreadable."""
+        try:
+            return cls(TitleIndex(path))
+        except (OSError, ValueError):
+            return None
+
+    def close(self) -> None:
+        self.index.close()
+
+    def _known(self, title: str, corpora) -> bool:
+        """Look ``title`` up as written, singular and without an honorific (case is ignored)."""
+        for form in _title_forms(title):
+            if self.index.exact(form, corpora):
+                return True
+            for honorific in HONORIFICS:
+                if form.startswith(honorific) and self.index.exact(form[len(honorific):], corpora):
+                    return True
+        return False
+
+    def check(self, filename: str, content: str) -> GroundingResult:
+        """Check the subject of ``content``, the text of card ``filename``."""
+        kind, corpora = CHECKS.get(filename, (None, None))
+        if kind == "headword":
+            word = extract_headword(content)
+            if not word:
+                return GroundingResult(False, None, "no 'Word: <word> - <definition>'")
+            if self._known(word, corpora):
+                return GroundingResult(True, word)
+            return GroundingResult(False, word, f"'{word}' is not in the reference library")
+        if kind == "author":
+            author = extract_author(content)
+            if not author:
+                return GroundingResult(False, None, "no author after a dash")
+            if self._known(author, corpora):
+                return GroundingResult(True, author)
+            return GroundingResult(False, author, f"no page for author '{author}'")
+        if kind == "subject":
+            subjects = candidate_subjects(content)
+            for subject in subjects:
+                if self._known(subject, corpora):
+                    return GroundingResult(True, subject)
+            if subjects:
+                return GroundingResult(False, subjects[0], f"none of {subjects[:3]} has a page")
+        return GroundingResult(True)
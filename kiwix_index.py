@@ -0,0 +1,260 @@
+"""Compact, memory-mapped index of the Kiwix title dumps in ``kiwix/``.
+
+The ``*_titles*.txt`` files are raw ZIM listings: article entries look like
+``A/Converse_(logic)`` (underscores or spaces), mixed with asset junk such as
+``-/favicon``. :func:`build_index` keeps only article entries, turns
+underscores into spaces, merges duplicates across files and writes one
+sorted binary file recording which source files each title came from.
+
+:class:`TitleIndex` maps that file and binary-searches it in place, so a
+lookup touches a handful of pages and the index costs almost no resident
+memory. Titles are ordered case-insensitively; exact lookups ignore case.
+
+File layout (little-endian)::
+
+    header   b"KIWXIDX1", version, title count, source-name bytes
+    names    JSON list of source names (bit i = names[i]), padded to 4 bytes
+    offsets  count + 1 uint32 offsets into the title blob
+    masks    count uint32 source bitmasks
+    blob     UTF-8 titles, back to back
+
+Build it once (it is not checked in)::
+
+    python kiwix_index.py build
+    python kiwix_index.py lookup "Converse (logic)"
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import random
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+KIWIX_DIR = Path(__file__).resolve().parent / "kiwix"
+DEFAULT_INDEX = KIWIX_DIR / "titles.idx"
+
+MAGIC = b"KIWXIDX1"
+VERSION = 1
+HEADER = struct.Struct("<8sIII")
+ARTICLE_PREFIX = "A/"
+
+
+def corpus_of(source: str) -> str:
+    """Return the corpus a source file belongs to: wiktionary, wikiquote or wikipedia."""
+    for corpus in ("wiktionary", "wikiquote"):
+        if source.startswith(corpus):
+            return corpus
+    return "wikipedia"
+
+
+def normalize_title(line: str) -> Optional[str]:
+    """Return the article title in a dump line, or ``None`` for non-articles."""
+    line = line.strip()
+    if not line.startswith(ARTICLE_PREFIX):
+        return None
+    title = " ".join(line[len(ARTICLE_PREFIX):].replace("_", " ").split())
+    return title or None
+
+
+def build_index(sources: Iterable[Path], out: Path = DEFAULT_INDEX) -> int:
+    """Build the index from title dump files and return the number of titles."""
+    sources = sorted(Path(s) for s in sources)
+    if len(sources) > 32:
+        raise ValueError("At most 32 source files fit in the source bitmask")
+    names = [s.stem for s in sources]
+
+    masks: Dict[str, int] = {}
+    for bit, source in enumerate(sources):
+        with source.open(encoding="utf-8", errors="replace") as f:
+            for line in f:
+                title = normalize_title(line)
+                if title:
+                    masks[title] = masks.get(title, 0) | (1 << bit)
+
+    titles = sorted(masks, key=lambda t: (t.casefold(), t))
+    name_bytes = json.dumps(names).encode("utf-8")
+    name_bytes += b" " * (-len(name_bytes) % 4)
+
+    offsets = [0]
+    blobs = []
+    for title in titles:
+        encoded = title.encode("utf-8")
+        blobs.append(encoded)
+        offsets.append(offsets[-1] + len(encoded))
+
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(titles), len(name_bytes)))
+        f.write(name_bytes)
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        f.write(struct.pack(f"<{len(titles)}I", *(masks[t] for t in titles)))
+        for encoded in blobs:
+            f.write(encoded)
+    tmp.replace(out)
+    return len(titles)
+
+
+@dataclass(frozen=True)
+class Entry:
+    """One indexed title and the source files it appears in."""
+    title: str
+    sources: tuple
+
+    @property
+    def corpora(self) -> set:
+        return {corpus_of(s) for s in self.sources}
+
+
+class TitleIndex:
+    """Read-only, memory-mapped view of an index built by :func:`build_index`."""
+
+    def __init__(self, path: Path = DEFAULT_INDEX) -> None:
+        self.path = Path(path)
+        with self.path.open("rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, names_len = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"{self.path} is not a version {VERSION} title index")
+        names_at = HEADER.size
+        self.sources: List[str] = json.loads(self._mm[names_at:names_at + names_len])
+        self._offsets_at = names_at + names_len
+        self._masks_at = self._offsets_at + 4 * (self.count + 1)
+        self._blob_at = self._masks_at + 4 * self.count
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def __enter__(self) -> "TitleIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def title(self, i: int) -> str:
+        start, end = struct.unpack_from("<II", self._mm, self._offsets_at + 4 * i)
+        return self._mm[self._blob_at + start:self._blob_at + end].decode("utf-8")
+
+    def mask(self, i: int) -> int:
+        return struct.unpack_from("<I", self._mm, self._masks_at + 4 * i)[0]
+
+    def entry(self, i: int) -> Entry:
+        mask = self.mask(i)
+        return Entry(self.title(i), tuple(s for bit, s in enumerate(self.sources) if mask >> bit & 1))
+
+    def source_mask(self, sources: Optional[Sequence[str]]) -> int:
+        """Return the bitmask for source file names and/or corpus names (all if ``None``)."""
+        if not sources:
+            return (1 << len(self.sources)) - 1
+        wanted = set(sources)
+        return sum(
+            1 << bit for bit, name in enumerate(self.sources)
+            if name in wanted or corpus_of(name) in wanted
+        )
+
+    def _lower_bound(self, key: str) -> int:
+        """Return the first position whose case-folded title is >= ``key``."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.title(mid).casefold() < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def exact(self, title: str, sources: Optional[Sequence[str]] = None) -> List[Entry]:
+        """Return every entry equal to ``title`` ignoring case (and ``_`` vs space)."""
+        key = " ".join(title.replace("_", " ").split()).casefold()
+        mask = self.source_mask(sources)
+        found = []
+        i = self._lower_bound(key)
+        while i < self.count and self.title(i).casefold() == key:
+            if self.mask(i) & mask:
+                found.append(self.entry(i))
+            i += 1
+        return found
+
+    def __contains__(self, title: str) -> bool:
+        return bool(self.exact(title))
+
+    def prefix(self, prefix: str, limit: int = 20, sources: Optional[Sequence[str]] = None) -> List[Entry]:
+        """Return up to ``limit`` entries starting with ``prefix`` (ignoring case)."""
+        key = " ".join(prefix.replace("_", " ").split()).casefold()
+        mask = self.source_mask(sources)
+        found = []
+        i = self._lower_bound(key)
+        while i < self.count and len(found) < limit:
+            title = self.title(i)
+            if not title.casefold().startswith(key):
+                break
+            if self.mask(i) & mask:
+                found.append(self.entry(i))
+            i += 1
+        return found
+
+    def sample(
+        self,
+        k: int = 1,
+        sources: Optional[Sequence[str]] = None,
+        rng: Optional[random.Random] = None,
+    ) -> List[Entry]:
+        """Return up to ``k`` distinct random entries, optionally from some sources only."""
+        rng = rng or random.Random()
+        mask = self.source_mask(sources)
+        picked: Dict[int, Entry] = {}
+        attempts = 0
+        while len(picked) < k and attempts < k * 200 and self.count:
+            attempts += 1
+            i = rng.randrange(self.count)
+            if i not in picked and self.mask(i) & mask:
+                picked[i] = self.entry(i)
+        return list(picked.values())
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build or query the Kiwix title index")
+    parser.add_argument("--index", type=Path, default=DEFAULT_INDEX, help="index file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="build the index from title dumps")
+    build.add_argument("files", nargs="*", type=Path, help="dump files (default: kiwix/*_titles*.txt)")
+    lookup = sub.add_parser("lookup", help="exact, case-insensitive lookup")
+    lookup.add_argument("title")
+    prefix = sub.add_parser("prefix", help="titles starting with a prefix")
+    prefix.add_argument("prefix")
+    prefix.add_argument("--limit", type=int, default=20)
+    sample = sub.add_parser("sample", help="random titles")
+    sample.add_argument("k", type=int, nargs="?", default=5)
+    for command in (lookup, prefix, sample):
+        command.add_argument("--source", action="append", help="source file or corpus to restrict to")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        files = args.files or sorted(KIWIX_DIR.glob("*_titles*.txt"))
+        count = build_index(files, args.index)
+        print(f"Indexed {count} titles from {len(files)} files into {args.index}")
+        return
+
+    with TitleIndex(args.index) as index:
+        if args.command == "lookup":
+            entries = index.exact(args.title, args.source)
+        elif args.command == "prefix":
+            entries = index.prefix(args.prefix, args.limit, args.source)
+        else:
+            entries = index.sample(args.k, args.source)
+    for entry in entries:
+        print(f"{entry.title}\t{','.join(entry.sources)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+"""Persistent local LLM service: each model loaded once, requests queued.
+
+The wrappers used to start ``llama-cli`` for every prompt, reloading a
+multi-GB GGUF each time; on the Pi the load dominates latency. This service
+keeps one ``llama-server`` process per backend (Mistral, DeepSeek) alive
+and feeds it from a request queue, one prompt at a time, since the Pi
+cannot run two generations at once without slowing both.
+
+Every completion is sent with ``cache_prompt``. With a single slot
+(``--parallel 1``) llama-server then keeps the KV cache of the previous
+prompt and only evaluates the part of the next prompt that differs. Prompts
+that share a system prompt (or, from ``conversation_memory.py``, a system
+prompt plus the older history) skip re-processing that prefix.
+
+Backends start on their first request and are restarted if they die. With
+``LLM_IDLE_SECONDS`` set, a backend idle for that long is stopped to free
+its memory.
+
+API (localhost only)::
+
+    GET  /health        {"backends": {"mistral": {"loaded": true, "queued": 0}, ...}}
+    POST /v1/complete   {"backend": "mistral", "prompt": "...", "system": "...",
+                         "max_tokens": 256, "temperature": 0.8, "stop": ["User:"]}
+                        -> {"content": "...", "tokens_cached": 412, "queued_ms": 3, "elapsed_ms": 2100}
+
+Run ``python llm_server.py serve`` (e.g. from systemd). The wrappers call
+``python llm_server.py ask --backend mistral "prompt"``, which exits with
+:data:`EXIT_UNREACHABLE` (2) only if nothing is listening, so they can fall
+back to ``llama-cli``. If the service answers with an error (queue full,
+backend failed) it exits with :data:`EXIT_FAILED` (3) instead: loading a
+second copy of the model next to the running one would not help.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+LLAMA_DIR = Path("/media/pi/data/llama.cpp")
+LLAMA_SERVER = Path(os.getenv("LLAMA_SERVER_BIN", str(LLAMA_DIR / "build" / "bin" / "llama-server")))
+MODELS_DIR = LLAMA_DIR / "models"
+
+HOST = "127.0.0.1"
+PORT = int(os.getenv("LLM_SERVER_PORT", "8091"))
+SERVER_URL = os.getenv("LLM_SERVER_URL", f"http://{HOST}:{PORT}")
+BACKEND_PORT_BASE = 8092  # Backends listen on consecutive ports from here
+
+STARTUP_TIMEOUT = 180  # Seconds to load a GGUF from the data drive
+REQUEST_TIMEOUT = 300  # Seconds a caller waits, including time in the queue
+MAX_QUEUE = 8  # Prompts waiting per backend before callers get 503
+IDLE_SECONDS = float(os.getenv("LLM_IDLE_SECONDS", "0"))  # 0 keeps models loaded
+
+EXIT_UNREACHABLE = 2  # `ask` could not connect: callers may fall back to llama-cli
+EXIT_FAILED = 3  # `ask` got an error or a bad reply from the running service
+
+
+class BackendError(RuntimeError):
+    """The backend process could not be started or failed a request."""
+
+
+class BackendBusy(BackendError):
+    """The backend's queue is full."""
+
+
+@dataclass
+class BackendConfig:
+    """How to run one model.
+
+    ``argv`` replaces the llama-server command line (``{port}`` is filled
+    in), which is how tests substitute a stub process.
+    """
+
+    name: str
+    model: Path
+    context: int = 2048
+    threads: int = 4
+    argv: Optional[List[str]] = None
+
+    def command(self, port: int) -> List[str]:
+        if self.argv:
+            return [arg.format(port=port) for arg in self.argv]
+        return [
+            str(LLAMA_SERVER), "-m", str(self.model),
+            "--host", HOST, "--port", str(port),
+            "-c", str(self.context), "-t", str(self.threads),
+            "--parallel", "1",
+        ]
+
+
+BACKENDS = {
+    "mistral": BackendConfig("mistral", MODELS_DIR / "mistral" / "mistral-7b-instruct-v0.1.Q4_K_M.gguf"),
+    "deepseek": BackendConfig("deepseek", MODELS_DIR / "deepseek" / "deepseek-coder.Q4_K_M.gguf", context=1024),
+}
+
+
+@dataclass
+class CompletionRequest:
+    """One queued prompt."""
+
+    prompt: str
+    system: str = ""
+    max_tokens: int = 256
+    temperature: float = 0.8
+    stop: List[str] = field(default_factory=list)
+    queued_at: float = field(default_factory=time.monotonic)
+    future: Future = field(default_factory=Future)
+
+    def payload(self) -> Dict[str, Any]:
+        # The system prompt goes first so consecutive requests share a prefix
+        prompt = f"{self.system}\n\n{self.prompt}" if self.system else self.prompt
+        return {
+            "prompt": prompt,
+            "n_predict": self.max_tokens,
+            "temperature": self.temperature,
+            "stop": self.stop,
+            "cache_prompt": True,
+        }
+
+
+def _post_json(url: str, data: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    request = urllib.request.Request(
+        url, json.dumps(data).encode("utf-8"), {"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+class Backend:
+    """A llama-server process and the queue and worker thread that feed it."""
+
+    def __init__(self, config: BackendConfig, port: int, idle_seconds: float = IDLE_SECONDS) -> None:
+        self.config = config
+        self.port = port
+        self.idle_seconds = idle_seconds
+        self.url = f"http://{HOST}:{port}"
+        self.process: Optional[subprocess.Popen] = None
+        self.queue: "queue.Queue[Optional[CompletionRequest]]" = queue.Queue(MAX_QUEUE)
+        self._worker = threading.Thread(target=self._run, name=f"llm-{config.name}", daemon=True)
+        self._worker.start()
+
+    @property
+    def loaded(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def _healthy(self) -> bool:
+        try:
+            with urllib.request.urlopen(f"{self.url}/health", timeout=2) as response:
+                return response.status == 200
+        except (OSError, ValueError):
+            return False
+
+    def start(self) -> None:
+        """Start the process and wait until the model is loaded."""
+        self.stop()
+        self.process = subprocess.Popen(
+            self.config.command(self.port), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise BackendError(f"{self.config.name} exited with status {self.process.returncode}")
+            if self._healthy():
+                return
+            time.sleep(0.2)
+        self.stop()
+        raise BackendError(f"{self.config.name} did not load within {STARTUP_TIMEOUT}s")
+
+    def stop(self) -> None:
+        process, self.process = self.process, None
+        if process is None or process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def submit(self, request: CompletionRequest) -> Future:
+        """Queue ``request`` and return the future its result will be set on."""
+        try:
+            self.queue.put_nowait(request)
+        except queue.Full:
+            raise BackendBusy(f"{self.config.name} has {MAX_QUEUE} prompts waiting") from None
+        return request.future
+
+    def close(self) -> None:
+        self.queue.put(None)
+        self._worker.join(15)
+        self.stop()
+
+    def _complete(self, request: CompletionRequest) -> Dict[str, Any]:
+        started = time.monotonic()
+        data = _post_json(f"{self.url}/completion", request.payload(), REQUEST_TIMEOUT)
+        return {
+            "content": data.get("content", "").strip(),
+            "tokens_cached": data.get("tokens_cached", 0),
+            "queued_ms": round((started - request.queued_at) * 1000),
+            "elapsed_ms": round((time.monotonic() - started) * 1000),
+        }
+
+    def _run(self) -> None:
+        while True:
+            try:
+                request = self.queue.get(timeout=self.idle_seconds or None)
+            except queue.Empty:
+                self.stop()  # Idle: give the memory back until the next prompt
+                continue
+            if request is None:
+                return
+            if not request.future.set_running_or_notify_cancel():
+                continue
+            try:
+                if not self.loaded:
+                    self.start()
+                try:
+                    result = self._complete(request)
+                except OSError:
+                    if self.loaded:
+                        raise
+                    # The process died mid-request: reload once and retry
+                    self.start()
+                    result = self._complete(request)
+                request.future.set_result(result)
+            except Exception as exc:
+                request.future.set_exception(
+                    exc if isinstance(exc, BackendError) else BackendError(f"{self.config.name}: {exc}")
+                )
+
+
+class LLMService:
+    """All backends behind one local HTTP API."""
+
+    def __init__(
+        self,
+        backends: Optional[Dict[str, BackendConfig]] = None,
+        port_base: int = BACKEND_PORT_BASE,
+        idle_seconds: float = IDLE_SECONDS,
+    ) -> None:
+        configs = BACKENDS if backends is None else backends
+        # Give up a little before the caller does, so it gets a 503 rather than a dropped connection
+        self.request_timeout = REQUEST_TIMEOUT - 10
+        self.backends = {
+            name: Backend(config, port_base + i, idle_seconds)
+            for i, (name, config) in enumerate(configs.items())
+        }
+
+    def close(self) -> None:
+        for backend in self.backends.values():
+            backend.close()
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "backends": {
+                name: {"loaded": backend.loaded, "queued": backend.queue.qsize()}
+                for name, backend in self.backends.items()
+            }
+        }
+
+    def complete(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one ``/v1/complete`` request body and return the response body."""
+        name = body.get("backend", "mistral")
+        if name not in self.backends:
+            raise KeyError(name)
+        request = CompletionRequest(
+            prompt=str(body["prompt"]),
+            system=str(body.get("system") or ""),
+            max_tokens=int(body.get("max_tokens", 256)),
+            temperature=float(body.get("temperature", 0.8)),
+            stop=[str(s) for s in body.get("stop") or []],
+        )
+        future = self.backends[name].submit(request)
+        try:
+            result = future.result(self.request_timeout)
+        except TimeoutError:
+            # Nobody will read the answer: drop it from the queue (a running one can't be stopped)
+            future.cancel()
+            raise BackendBusy(f"{name} did not answer within {self.request_timeout:g}s") from None
+        return dict(result, backend=name)
+
+    def make_server(self, host: str = HOST, port: int = PORT) -> ThreadingHTTPServer:
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status: int, body: Dict[str, Any]) -> None:
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                if self.path == "/health":
+                    self._send(200, service.health())
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def do_POST(self) -> None:
+                if self.path != "/v1/complete":
+                    self._send(404, {"error": "not found"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                    if not isinstance(body, dict) or not str(body.get("prompt", "")).strip():
+                        raise ValueError("prompt is required")
+                    self._send(200, service.complete(body))
+                except KeyError as exc:
+                    self._send(404, {"error": f"unknown backend {exc}"})
+                except (ValueError, TypeError) as exc:
+                    self._send(400, {"error": str(exc)})
+                except BackendBusy as exc:
+                    self._send(503, {"error": str(exc)})
+                except Exception as exc:
+                    self._send(502, {"error": str(exc)})
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        return server
+
+
+def ask(
+    prompt: str,
+    backend: str = "mistral",
+    max_tokens: int = 256,
+    temperature: float = 0.8,
+    system: str = "",
+    stop: Optional[List[str]] = None,
+    url: str = SERVER_URL,
+    timeout: float = REQUEST_TIMEOUT,
+) -> str:
+    """Send a prompt to the service and return the completion text.
+
+    Raises ``urllib.error.URLError`` if the service is down and
+    ``urllib.error.HTTPError`` if it answers with an error.
+    """
+    body = {
+        "backend": backend,
+        "prompt": prompt,
+        "system": system,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "stop": stop or [],
+    }
+    return _post_json(f"{url.rstrip('/')}/v1/complete", body, timeout)["content"]
+
+
+def serve(host: str = HOST, port: int = PORT) -> None:
+    service = LLMService()
+    server = service.make_server(host, port)
+    # systemd stops services with SIGTERM; shut down cleanly so models unload
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    print(f"LLM service on http://{host}:{port} ({', '.join(service.backends)})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Persistent local LLM service")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_cmd = sub.add_parser("serve", help="run the service")
+    serve_cmd.add_argument("--host", default=HOST)
+    serve_cmd.add_argument("--port", type=int, default=PORT)
+    ask_cmd = sub.add_parser("ask", help="send one prompt and print the reply")
+    ask_cmd.add_argument("prompt", nargs="?", help="prompt text (or use --prompt-file)")
+    ask_cmd.add_argument("--prompt-file", type=Path, help="read the prompt from a file")
+    ask_cmd.add_argument("--backend", default="mistral", choices=sorted(BACKENDS))
+    ask_cmd.add_argument("-n", "--max-tokens", type=int, default=256)
+    ask_cmd.add_argument("--temp", type=float, default=0.8)
+    ask_cmd.add_argument("--system", default="", help="shared system prompt (kept in the KV cache)")
+    ask_cmd.add_argument("--stop", action="append", help="stop sequence (repeatable)")
+    ask_cmd.add_argument("--url", default=SERVER_URL)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args.host, args.port)
+        return
+
+    prompt = args.prompt_file.read_text(encoding="utf-8") if args.prompt_file else args.prompt
+    if not prompt:
+        parser.error("a prompt or --prompt-file is required")
+    try:
+        print(ask(prompt, args.backend, args.max_tokens, args.temp, args.system, args.stop, args.url))
+    except urllib.error.HTTPError as exc:
+        detail = exc.read().decode("utf-8", "replace").strip() or exc.reason
+        print(f"LLM service error {exc.code}: {detail}", file=sys.stderr)
+        sys.exit(EXIT_FAILED)
+    except urllib.error.URLError as exc:
+        print(f"LLM service unavailable: {exc.reason}", file=sys.stderr)
+        sys.exit(EXIT_UNREACHABLE)
+    except (OSError, ValueError, KeyError) as exc:
+        # Timed out mid-generation or sent something that isn't a completion
+        print(f"LLM service failed: {exc}", file=sys.stderr)
+        sys.exit(EXIT_FAILED)
+
+
+if __name__ == "__main__":
+    main()
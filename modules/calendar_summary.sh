@@ -10,6 +10,10 @@ PIPER="/media/pi/data/piper/build/piper"
 VOICE_MODEL="/media/pi/data/piper/voices/en_GB-alba-medium.onnx"
 VOICE_CFG="/media/pi/data/piper/voices/en_GB-alba-medium.onnx.json"
 TEMP_JSON="/tmp/calendar_summary_events.json"
+PYTHON="/media/pi/data/assistant/venv/bin/python"
+CALENDAR_FETCH="/media/pi/data/assistant/google_calendar_fetch.py"
+LLM_CLIENT="/media/pi/data/assistant/llm/llm_server.py"
+CALENDAR_DB="${CALENDAR_DB:-/media/pi/data/assistant/calendar/events.db}"
 OUTPUT_WAV="/tmp/calendar_summary.wav"
 
 # Load token
@@ -19,16 +23,34 @@ HA_TOKEN=$(cat "$TOKEN_FILE")
 START=$(date -I)
 END=$(date -I -d "7 days")
 
-# Fetch calendar events
-curl -s -H "Authorization: Bearer $HA_TOKEN" \
-     "$HA_URL/api/calendars/$ENTITY_ID?start=$START&end=$END" > "$TEMP_JSON"
+# Read events from the local store kept current by google_calendar_fetch.py;
+# fall back to Home Assistant's calendar API if it is missing or has never
+# synced (--upcoming exits non-zero then)
+if [[ -f "$CALENDAR_DB" ]] && \
+   "$PYTHON" "$CALENDAR_FETCH" --upcoming --json --days 7 --db "$CALENDAR_DB" > "$TEMP_JSON"; then
+    :
+else
+    curl -s -H "Authorization: Bearer $HA_TOKEN" \
+         "$HA_URL/api/calendars/$ENTITY_ID?start=$START&end=$END" > "$TEMP_JSON"
+fi
 
 # Format events into prompt
 EVENTS=$(jq -r '.[] | "\(.summary) at \(.start)"' "$TEMP_JSON" | paste -sd ', ' -)
 [[ -z "$EVENTS" ]] && EVENTS="There are no events scheduled this week."
 
-# Query Mistral for summary
-SUMMARY=$("$WRAPPER" "Summarise these events for the week: $EVENTS")
+# Query Mistral for summary: the persistent LLM service if it's up (no model
+# load, and kept out of the chat memory), otherwise the wrapper. If the
+# service is up but fails, stop rather than load a second copy of the model
+SUMMARY_PROMPT="Summarise these events for the week: $EVENTS"
+SUMMARY=$("$PYTHON" "$LLM_CLIENT" ask --backend mistral -n 256 --temp 0.8 --stop "User:" \
+    --system "The following is a helpful assistant responding to user queries." \
+    "User: $SUMMARY_PROMPT"$'\n'"Assistant:")
+STATUS=$?
+if [[ $STATUS -eq 2 ]]; then
+    SUMMARY=$("$WRAPPER" "$SUMMARY_PROMPT")
+elif [[ $STATUS -ne 0 ]]; then
+    exit "$STATUS"
+fi
 
 # Speak the summary
 echo "$SUMMARY" | "$PIPER" \
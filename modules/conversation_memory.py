@@ -0,0 +1,370 @@
+"""Bounded conversation memory for the local Mistral wrappers.
+
+``mistral_wrapper.sh`` used to append every turn to ``mistral_context.txt``
+and feed the whole file back to ``llama-cli``, so prompt processing grew with
+the assistant's uptime and would eventually overflow the context window.
+This module keeps the turns in SQLite and builds a prompt of bounded size:
+
+* the most recent turns that fit in :data:`WINDOW_TOKENS`;
+* before them, cached summaries of older turns, up to :data:`SUMMARY_TOKENS`.
+
+Exchanges without a reply, empty turns and repeats of an exchange still in
+the window are never stored. Once a full chunk of
+:data:`SUMMARY_CHUNK` turns has slid out of the window, it is rolled into one
+summary. That summary is computed once, stored, and the chunk's turns are
+marked as summarised. Building a prompt reads only the unsummarised tail and
+a few summaries, so it costs the same after a day or a year.
+
+The default summariser is extractive: it keeps the first sentence of each
+turn. That needs no model call, but any ``callable(turns) -> str`` can be
+passed instead.
+
+Used by the wrapper as::
+
+    python conversation_memory.py prompt "question" > prompt.txt
+    llama-cli -f prompt.txt ... | python conversation_memory.py reply "question"
+
+An existing ``mistral_context.txt`` is imported the first time the store is
+opened empty (or explicitly with ``import``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+
+MEMORY_DIR = Path("/media/pi/data/assistant/memory")
+MEMORY_DB = Path(os.getenv("CONVERSATION_DB", str(MEMORY_DIR / "conversation.db")))
+LEGACY_CONTEXT = MEMORY_DIR / "mistral_context.txt"
+SYSTEM_PROMPT = "The following is a helpful assistant responding to user queries."
+
+WINDOW_TOKENS = int(os.getenv("CONVERSATION_WINDOW_TOKENS", "768"))  # Recent turns, verbatim
+SUMMARY_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "192"))  # Older turns, summarised
+SUMMARY_CHUNK = 8  # Turns rolled into each summary
+MAX_TURN_TOKENS = 384  # Longer turns (pasted articles) are cut to this in prompts
+SENTENCE_CHARS = 160  # Longest sentence an extractive summary keeps per turn
+
+ROLES = ("user", "assistant")
+END_MARKERS = re.compile(r"\s*\[end of text\]", re.I)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    role TEXT NOT NULL,
+    text TEXT NOT NULL,
+    tokens INTEGER NOT NULL,
+    created TEXT NOT NULL,
+    summarized INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS turns_open ON turns (session, summarized, id);
+CREATE TABLE IF NOT EXISTS summaries (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    first_turn INTEGER NOT NULL,
+    last_turn INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    tokens INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS summaries_session ON summaries (session, id);
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Return a rough Llama token count (about four characters per token)."""
+    return max(1, (len(text) + 3) // 4)
+
+
+def clean_text(text: str) -> str:
+    """Strip llama.cpp end markers and collapse whitespace."""
+    return " ".join(END_MARKERS.sub(" ", text).split())
+
+
+def truncate_tokens(text: str, tokens: int) -> str:
+    """Cut ``text`` to about ``tokens`` tokens, at a word boundary."""
+    if estimate_tokens(text) <= tokens:
+        return text
+    cut = text[:tokens * 4].rsplit(" ", 1)[0]
+    return cut + " ..."
+
+
+@dataclass
+class Turn:
+    """One stored message."""
+
+    id: int
+    role: str
+    text: str
+    tokens: int
+
+    def render(self) -> str:
+        label = "User" if self.role == "user" else "Assistant"
+        return f"{label}: {truncate_tokens(self.text, MAX_TURN_TOKENS)}"
+
+
+def first_sentence(text: str, limit: int = SENTENCE_CHARS) -> str:
+    """Return the first sentence of ``text``, cut to ``limit`` characters."""
+    sentence = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+    if len(sentence) > limit:
+        sentence = sentence[:limit].rsplit(" ", 1)[0] + " ..."
+    return sentence
+
+
+def extractive_summary(turns: Sequence[Turn]) -> str:
+    """Summarise turns by keeping the first sentence of each."""
+    parts = []
+    for turn in turns:
+        who = "User asked" if turn.role == "user" else "Assistant said"
+        parts.append(f"{who}: {first_sentence(turn.text)}")
+    return " | ".join(parts)
+
+
+class ConversationMemory:
+    """SQLite-backed, token-budgeted history of one or more chat sessions."""
+
+    def __init__(
+        self,
+        path: Path = MEMORY_DB,
+        session: str = "mistral",
+        window_tokens: int = WINDOW_TOKENS,
+        summary_tokens: int = SUMMARY_TOKENS,
+        summarize: Callable[[Sequence[Turn]], str] = extractive_summary,
+    ) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.session = session
+        self.window_tokens = window_tokens
+        self.summary_tokens = summary_tokens
+        self.summarize = summarize
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM turns WHERE session = ?", (self.session,)
+            ).fetchone()[0]
+
+    def _open_turns(self) -> List[Turn]:
+        """Return the unsummarised turns, oldest first."""
+        rows = self.conn.execute(
+            "SELECT id, role, text, tokens FROM turns "
+            "WHERE session = ? AND summarized = 0 ORDER BY id",
+            (self.session,),
+        ).fetchall()
+        return [Turn(*row) for row in rows]
+
+    def _window_start(self, turns: Sequence[Turn], budget: int) -> int:
+        """Return the index of the oldest turn in the newest run that fits ``budget``."""
+        used = 0
+        start = len(turns)
+        while start > 0:
+            cost = min(turns[start - 1].tokens, MAX_TURN_TOKENS)
+            if used + cost > budget:
+                break
+            used += cost
+            start -= 1
+        # Never open the window on a reply whose question fell out of it
+        if start < len(turns) and turns[start].role == "assistant":
+            start += 1
+        return start
+
+    def add(self, role: str, text: str) -> Optional[int]:
+        """Store a turn and return its id, or ``None`` if it was empty or a repeat.
+
+        A turn is a repeat when the previous stored turn has the same role
+        and the same text.
+        """
+        if role not in ROLES:
+            raise ValueError(f"role must be one of {ROLES}")
+        text = clean_text(text)
+        if not text:
+            return None
+        with self._lock, self.conn:
+            last = self.conn.execute(
+                "SELECT role, text FROM turns WHERE session = ? ORDER BY id DESC LIMIT 1",
+                (self.session,),
+            ).fetchone()
+            if last == (role, text):
+                return None
+            turn_id = self.conn.execute(
+                "INSERT INTO turns (session, role, text, tokens, created) VALUES (?, ?, ?, ?, ?)",
+                (self.session, role, text, estimate_tokens(text), datetime.now().isoformat()),
+            ).lastrowid
+            self._roll_up()
+        return turn_id
+
+    def _roll_up(self) -> None:
+        """Summarise full chunks of turns that no longer fit in the window."""
+        turns = self._open_turns()
+        outside = turns[:self._window_start(turns, self.window_tokens)]
+        while len(outside) >= SUMMARY_CHUNK:
+            chunk, outside = outside[:SUMMARY_CHUNK], outside[SUMMARY_CHUNK:]
+            summary = clean_text(self.summarize(chunk))
+            self.conn.execute(
+                "INSERT INTO summaries (session, first_turn, last_turn, text, tokens) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.session, chunk[0].id, chunk[-1].id, summary, estimate_tokens(summary)),
+            )
+            self.conn.execute(
+                "UPDATE turns SET summarized = 1 WHERE session = ? AND id BETWEEN ? AND ?",
+                (self.session, chunk[0].id, chunk[-1].id),
+            )
+
+    def record(self, user_text: str, reply: str) -> bool:
+        """Store one exchange and return whether it was kept.
+
+        Exchanges without a reply (llama-cli failed or timed out) are
+        dropped, and so is an exchange already in the window word for word.
+        """
+        user_text, reply = clean_text(user_text), clean_text(reply)
+        if not user_text or not reply:
+            return False
+        with self._lock:
+            turns = self._open_turns()
+        for question, answer in zip(turns, turns[1:]):
+            if (question.role, question.text, answer.role, answer.text) == ("user", user_text, "assistant", reply):
+                return False
+        self.add("user", user_text)
+        self.add("assistant", reply)
+        return True
+
+    def summaries(self) -> List[str]:
+        """Return the newest summaries that fit in the summary budget, oldest first."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT text, tokens FROM summaries WHERE session = ? ORDER BY id DESC LIMIT 32",
+                (self.session,),
+            ).fetchall()
+        picked = []
+        used = 0
+        for text, tokens in rows:
+            if used + tokens > self.summary_tokens:
+                break
+            picked.append(text)
+            used += tokens
+        return picked[::-1]
+
+    def window(self) -> List[Turn]:
+        """Return the newest turns that fit in the window budget, oldest first."""
+        with self._lock:
+            turns = self._open_turns()
+        return turns[self._window_start(turns, self.window_tokens):]
+
+    def build_prompt(self, user_text: str, system: str = SYSTEM_PROMPT) -> str:
+        """Return the prompt for ``user_text``: system line, summaries, window, question."""
+        lines = [system, ""]
+        summaries = self.summaries()
+        if summaries:
+            lines.append("Earlier in this conversation:")
+            lines.extend(f"- {summary}" for summary in summaries)
+            lines.append("")
+        lines.extend(turn.render() for turn in self.window())
+        lines.append(f"User: {clean_text(user_text)}")
+        lines.append("Assistant:")
+        return "\n".join(lines)
+
+    def import_context_file(self, path: Path) -> int:
+        """Import a legacy ``mistral_context.txt``; returns how many exchanges were kept.
+
+        Lines starting with ``User:`` or ``Assistant:`` open a turn and other
+        lines continue it. An unlabelled paragraph ending in ``[end of
+        text]`` is a reply the old wrapper failed to label. Questions that
+        never got a reply are left behind, as :meth:`record` would.
+        """
+        try:
+            text = Path(path).read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            return 0
+        turns: List[List[str]] = []
+        for block in re.split(r"\n\s*\n", text):
+            for line in block.splitlines():
+                match = re.match(r"(User|Assistant):\s?(.*)", line)
+                if match:
+                    turns.append([match.group(1).lower(), match.group(2)])
+                elif turns and turns[-1][0] == "user" and END_MARKERS.search(line):
+                    turns.append(["assistant", line])
+                elif turns:
+                    turns[-1][1] += "\n" + line
+        kept = 0
+        for (role, question), (next_role, answer) in zip(turns, turns[1:]):
+            if role == "user" and next_role == "assistant":
+                kept += self.record(question, answer)
+        return kept
+
+
+def extract_reply(output: str) -> str:
+    """Return the assistant's answer from raw ``llama-cli`` output.
+
+    ``llama-cli`` echoes the prompt, which ends with ``Assistant:``, so the
+    reply follows the last such marker and stops at the next ``User:`` or
+    llama.cpp log line.
+    """
+    marker = output.rfind("Assistant:")
+    if marker >= 0:
+        output = output[marker + len("Assistant:"):]
+    lines = []
+    for line in output.splitlines():
+        if re.match(r"\s*(User:|llama_perf|llama_print_timings)", line):
+            break
+        lines.append(line)
+    return clean_text("\n".join(lines))
+
+
+def open_memory(path: Path = MEMORY_DB, session: str = "mistral", legacy: Path = LEGACY_CONTEXT) -> ConversationMemory:
+    """Open the store, importing the legacy context file into an empty one."""
+    memory = ConversationMemory(path, session)
+    if not len(memory) and Path(legacy).exists():
+        memory.import_context_file(legacy)
+    return memory
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Token-budgeted conversation memory")
+    parser.add_argument("--db", type=Path, default=MEMORY_DB, help="memory store path")
+    parser.add_argument("--session", default="mistral", help="conversation name")
+    parser.add_argument("--legacy", type=Path, default=LEGACY_CONTEXT, help="old context file to import")
+    sub = parser.add_subparsers(dest="command", required=True)
+    prompt = sub.add_parser("prompt", help="print the prompt for a new question")
+    prompt.add_argument("text")
+    prompt.add_argument("--system", default=SYSTEM_PROMPT)
+    reply = sub.add_parser("reply", help="read llama-cli output on stdin, store the exchange, print the reply")
+    reply.add_argument("text")
+    record = sub.add_parser("record", help="store an exchange")
+    record.add_argument("text")
+    record.add_argument("reply")
+    imported = sub.add_parser("import", help="import a legacy context file")
+    imported.add_argument("file", type=Path)
+    args = parser.parse_args(argv)
+
+    memory = open_memory(args.db, args.session, args.legacy)
+    try:
+        if args.command == "prompt":
+            print(memory.build_prompt(args.text, args.system))
+        elif args.command == "reply":
+            answer = extract_reply(sys.stdin.read())
+            memory.record(args.text, answer)
+            print(answer)
+        elif args.command == "record":
+            memory.record(args.text, args.reply)
+        else:
+            print(f"Imported {memory.import_context_file(args.file)} exchanges from {args.file}")
+    finally:
+        memory.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,43 @@
 #!/bin/bash
 
-# Mistral prompt wrapper with persistent memory
+# Mistral prompt wrapper with persistent, bounded memory
 # Usage: ./mistral_wrapper.sh "Your prompt here"
+#
+# conversation_memory.py builds each prompt from the recent turns that fit a
+# token budget plus cached summaries of older ones, so prompts stay the same
+# size however long the assistant runs. The old mistral_context.txt is
+# imported into the memory store on first use.
+#
+# Prompts go to the persistent LLM service (llm/llm_server.py), which keeps
+# the model loaded and reuses the KV cache for the shared history prefix.
+# If it isn't running (ask exits 2), llama-cli is started for this one prompt
+# instead; any other failure means the model is loaded but erred, so no
+# second copy is started.
 
 USER_INPUT="$1"
 MODEL_PATH="/media/pi/data/llama.cpp/models/mistral/mistral-7b-instruct-v0.1.Q4_K_M.gguf"
 LLAMA_BIN="/media/pi/data/llama.cpp/build/bin/llama-cli"
-MEMORY_FILE="/media/pi/data/assistant/memory/mistral_context.txt"
+PYTHON="/media/pi/data/assistant/venv/bin/python"
+MEMORY="/media/pi/data/assistant/modules/conversation_memory.py"
+LLM_CLIENT="/media/pi/data/assistant/llm/llm_server.py"
+MEMORY_DIR="/media/pi/data/assistant/memory"
 TEMP_PROMPT="/tmp/mistral_prompt.txt"
 
-mkdir -p "$(dirname "$MEMORY_FILE")"
-
-# Append user input to persistent memory
-echo -e "\nUser: $USER_INPUT" >> "$MEMORY_FILE"
-
-# Build full conversation prompt
-echo -e "The following is a helpful assistant responding to user queries.\n" > "$TEMP_PROMPT"
-cat "$MEMORY_FILE" >> "$TEMP_PROMPT"
-
-# Run Mistral with full context
-RESPONSE=$("$LLAMA_BIN" -m "$MODEL_PATH" -f "$TEMP_PROMPT" -n 256 --temp 0.8)
-
-# Extract and store assistant reply
-ASSISTANT_REPLY=$(echo "$RESPONSE" | sed -n '/Assistant:/,$p' | sed 's/^Assistant: //')
-echo "Assistant: $ASSISTANT_REPLY" >> "$MEMORY_FILE"
-
-# Output to screen or pipeline
-echo "$ASSISTANT_REPLY"
+mkdir -p "$MEMORY_DIR"
+export CONVERSATION_DB="${CONVERSATION_DB:-$MEMORY_DIR/conversation.db}"
+
+# Build the prompt: system line, summaries, recent turns, this question
+"$PYTHON" "$MEMORY" --legacy "$MEMORY_DIR/mistral_context.txt" prompt "$USER_INPUT" > "$TEMP_PROMPT"
+
+# Run Mistral, then store the exchange and print only the reply
+OUTPUT=$("$PYTHON" "$LLM_CLIENT" ask --backend mistral --prompt-file "$TEMP_PROMPT" \
+    -n 256 --temp 0.8 --stop "User:")
+STATUS=$?
+if [[ $STATUS -eq 0 ]]; then
+    printf '%s\n' "$OUTPUT" | "$PYTHON" "$MEMORY" reply "$USER_INPUT"
+elif [[ $STATUS -eq 2 ]]; then
+    "$LLAMA_BIN" -m "$MODEL_PATH" -f "$TEMP_PROMPT" -n 256 --temp 0.8 2>/dev/null |
+        "$PYTHON" "$MEMORY" reply "$USER_INPUT"
+else
+    exit "$STATUS"
+fi
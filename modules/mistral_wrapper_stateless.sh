@@ -2,6 +2,17 @@
 USER_INPUT="$1"
 MODEL_PATH="/media/pi/data/llama.cpp/models/mistral/mistral-7b-instruct-v0.1.Q4_K_M.gguf"
 LLAMA_BIN="/media/pi/data/llama.cpp/build/bin/llama-cli"
+PYTHON="/media/pi/data/assistant/venv/bin/python"
+LLM_CLIENT="/media/pi/data/assistant/llm/llm_server.py"
+
+# Ask the persistent LLM service first; it keeps the model loaded. Only
+# fall back to llama-cli if it isn't running (exit 2), not if it erred
+"$PYTHON" "$LLM_CLIENT" ask --backend mistral -n 128 --temp 0.8 --stop "User:" \
+    "User: $USER_INPUT"$'\n\n'"Assistant:"
+STATUS=$?
+if [[ $STATUS -ne 2 ]]; then
+    exit "$STATUS"
+fi
 
 # Run llama directly with prompt and capture output
 OUTPUT=$("$LLAMA_BIN" -m "$MODEL_PATH" -p "User: $USER_INPUT\n\nAssistant:" -n 128 --temp 0.8 -t 4 2>&1)
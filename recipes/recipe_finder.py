@@ -7,30 +7,60 @@ and saves the chosen recipe for display on a dashboard.
 
 Usage:
     python recipe_finder.py "chicken, rice, tomato" --dietary vegetarian --preferences quick
+    python recipe_finder.py "chicken, rice" --auto-select best-rated
+    python recipe_finder.py --batch requests.jsonl --jobs 4 --auto-select first
+
+``--auto-select`` runs without prompting (e.g. from a Home Assistant shell
+command). ``--batch`` reads one request per line from a file or ``-`` for
+stdin: a JSON object such as ``{"ingredients": "chicken, rice", "dietary":
+"none", "preferences": "quick", "limit": 3}`` or just the ingredient list.
+Results are printed as JSON lines.
+
+Every suggested recipe is kept in a local library (recipe_library.py). A
+request the library can already answer well is served from it without calling
+GPT; otherwise suggestions are cached by a canonical form of the request, so
+"rice, chicken" and "Chicken,rice" share one entry. Pass ``--fresh`` to ask GPT
+again.
 
 Environment variables:
     OPENAI_API_KEY - API key for the OpenAI client
+    OPENAI_CACHE_MODE - on (default), off or replay; see response_cache.py
+    RECIPE_CACHE_TTL - seconds cached suggestions stay fresh (default 7 days)
 """
 
 from __future__ import annotations
 
 import argparse
+import fcntl
+import functools
 import json
 import os
 import sys
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 from openai import OpenAI
 
+# Shared helpers live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from response_cache import CacheMiss, ResponseCache  # noqa: E402
+
+from recipe_library import RecipeLibrary, canonical_ingredients  # noqa: E402
+
 TEXT_MODEL = "gpt-4"
 OUTPUT_DIR = Path("/srv/homeassistant/ai")
 RECIPES_DIR = OUTPUT_DIR / "recipes"
 OPTIONS_FILE = OUTPUT_DIR / "recipe_options.txt"
 SELECTED_FILE = OUTPUT_DIR / "selected_recipe.txt"
 HISTORY_FILE = RECIPES_DIR / "recipe_history.json"
+LIBRARY_DB = RECIPES_DIR / "recipe_library.db"
+LOCK_FILE = RECIPES_DIR / ".recipe_finder.lock"
+AUTO_SELECT_POLICIES = ("first", "best-rated")
+RECIPE_CACHE_TTL = 7 * 24 * 3600
 
 DIETARY_OPTIONS = [
     "vegetarian",
@@ -55,28 +85,143 @@ class Recipe:
     rating: Optional[float] = None
     date_added: Optional[str] = None
 
+RECIPE_FIELDS = {f.name for f in fields(Recipe)}
+
+def recipe_cache_key(
+    ingredients: str,
+    dietary: str = "none",
+    preferences: Optional[str] = None,
+    limit: int = 3,
+) -> dict:
+    """Return the cache key data for a suggestion request.
+
+    Requests that differ only in ingredient order, case, spacing or
+    plurals map to the same key.
+    """
+    return {
+        "model": TEXT_MODEL,
+        "ingredients": canonical_ingredients(ingredients),
+        "dietary": (dietary or "none").lower(),
+        "preferences": " ".join((preferences or "").lower().split()) or None,
+        "limit": limit,
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def get_client(api_key: str) -> OpenAI:
+    """Return a shared OpenAI client so its connection pool is reused."""
+    return OpenAI(api_key=api_key)
+
+
 def setup_directories() -> None:
     """Create necessary directories if they don't exist."""
     RECIPES_DIR.mkdir(parents=True, exist_ok=True)
     if not HISTORY_FILE.exists():
         HISTORY_FILE.write_text("[]", encoding="utf-8")
 
-def fetch_recipes(
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive ``flock`` on ``path`` (shared by threads and processes)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def open_library(path: Optional[Path] = None) -> RecipeLibrary:
+    """Open the recipe library, seeding a new one from ``recipe_history.json``."""
+    library = RecipeLibrary(path or LIBRARY_DB)
+    if not len(library):
+        library.import_history(HISTORY_FILE)
+    return library
+
+def recipe_from_dict(data: dict) -> Recipe:
+    """Build a :class:`Recipe`, ignoring unknown fields."""
+    return Recipe(**{k: v for k, v in data.items() if k in RECIPE_FIELDS})
+
+class RecipeStreamParser:
+    """Incremental splitter for the JSON objects in a streamed reply.
+
+    Feed it text as it arrives; it returns the source of every top-level
+    object whose closing brace has been seen. It tracks brace depth, string
+    state and backslash escapes, and ignores anything between objects (the
+    surrounding ``[``/``]``, commas, code fences or chatter), so one broken
+    object never costs the others.
+    """
+
+    def __init__(self) -> None:
+        self._buf: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text: str) -> List[str]:
+        """Consume ``text`` and return the objects it completed."""
+        done = []
+        for ch in text:
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._buf = [ch]
+                continue
+            self._buf.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    done.append("".join(self._buf))
+                    self._buf = []
+        return done
+
+
+def parse_recipe(text: str) -> Optional[Recipe]:
+    """Build a :class:`Recipe` from one JSON object, or ``None`` if it is malformed."""
+    try:
+        return recipe_from_dict(json.loads(text))
+    except (ValueError, TypeError, AttributeError):
+        print("Debug: Skipping malformed recipe:", text[:200], file=sys.stderr)
+        return None
+
+
+def stream_recipes(
     ingredients: str,
     dietary: str = "none",
     preferences: Optional[str] = None,
-    limit: int = 3
-) -> List[Recipe]:
-    """Return detailed recipe suggestions from GPT for the given ingredients."""
+    limit: int = 3,
+    cache: Optional[ResponseCache] = None,
+    fresh: bool = False,
+) -> Iterator[Recipe]:
+    """Yield recipe suggestions from GPT as soon as each one is complete.
+
+    The completion is streamed and parsed incrementally, so the first
+    recipe is available while the rest are still being generated.
+    Malformed objects are skipped. Replies are cached on disk keyed by
+    :func:`recipe_cache_key` (a repeated request, in any ingredient order
+    or spelling, is answered without calling GPT); ``fresh`` bypasses the
+    cached answer and replaces it. The reply is only cached once it has
+    been received in full, and only if it held at least one usable recipe.
+    """
+    cache = cache or ResponseCache(ttl=float(os.getenv("RECIPE_CACHE_TTL", RECIPE_CACHE_TTL)))
     api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
+    if not api_key and cache.mode != "replay":
         raise EnvironmentError("OPENAI_API_KEY must be set")
-
-    client = OpenAI(api_key=api_key)
+    key_data = recipe_cache_key(ingredients, dietary, preferences, limit)
     
     # Build a more detailed prompt
     prompt = (
-        f"Suggest {limit} detailed recipes using these ingredients: {ingredients}.\n"
+        f"Suggest {limit} detailed recipes using these ingredients: {', '.join(key_data['ingredients'])}.\n"
         f"Dietary restrictions: {dietary}\n"
         f"Additional preferences: {preferences or 'none'}\n\n"
         "For each recipe, provide a JSON array of objects with these fields:\n"
@@ -92,82 +237,181 @@ def fetch_recipes(
         "Return ONLY the JSON array, no other text."
     )
 
-    try:
-        response = client.chat.completions.create(
-            model=TEXT_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=1000,
-            temperature=0.7,
-        )
-    except Exception as exc:
-        raise RuntimeError(f"GPT request failed: {exc}") from exc
+    request = dict(
+        model=TEXT_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=1000,
+        temperature=0.7,
+    )
 
-    try:
-        # Clean the response to ensure it's valid JSON
-        content = response.choices[0].message.content.strip()
-        # Remove any markdown code block markers
-        content = content.replace("```json", "").replace("```", "").strip()
-        recipes_data = json.loads(content)
-        
-        if not isinstance(recipes_data, list):
-            recipes_data = [recipes_data]
-            
-        return [Recipe(**recipe) for recipe in recipes_data[:limit]]
-    except json.JSONDecodeError as exc:
-        print("Debug: Raw GPT response:", content)
-        raise RuntimeError(f"Failed to parse recipe data: {exc}") from exc
-    except Exception as exc:
-        print("Debug: Raw GPT response:", content)
-        raise RuntimeError(f"Failed to process recipe data: {exc}") from exc
-
-def choose_recipe(recipes: List[Recipe]) -> Recipe:
-    """Display recipe options and prompt for selection."""
+    key = cache.key("recipes", key_data)
+    cached = None if fresh and cache.mode != "replay" else cache.get(key)
+    if cached is None and cache.mode == "replay":
+        raise CacheMiss(f"No recorded recipes response ({key[:12]})")
+
+    def completion() -> Iterator[str]:
+        if cached is not None:
+            yield cached
+            return
+        try:
+            for chunk in get_client(api_key).chat.completions.create(**request, stream=True):
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as exc:
+            raise RuntimeError(f"GPT request failed: {exc}") from exc
+
+    parser = RecipeStreamParser()
+    parts: List[str] = []
+    count = 0
+    for piece in completion():
+        parts.append(piece)
+        for text in parser.feed(piece):
+            recipe = parse_recipe(text)
+            if recipe and count < limit:
+                count += 1
+                yield recipe
+    if cached is None and count:
+        cache.put(key, "".join(parts))
+
+
+def fetch_recipes(
+    ingredients: str,
+    dietary: str = "none",
+    preferences: Optional[str] = None,
+    limit: int = 3,
+    cache: Optional[ResponseCache] = None,
+    fresh: bool = False,
+) -> List[Recipe]:
+    """Return detailed recipe suggestions from GPT for the given ingredients.
+
+    Collects :func:`stream_recipes`; raises ``RuntimeError`` if no usable
+    recipe came back.
+    """
+    recipes = list(stream_recipes(ingredients, dietary, preferences, limit, cache, fresh))
     if not recipes:
-        raise ValueError("No recipe options available")
+        raise RuntimeError("Failed to parse recipe data: no valid recipes in response")
+    return recipes
+
+def suggest_recipes(
+    ingredients: str,
+    dietary: str = "none",
+    preferences: Optional[str] = None,
+    limit: int = 3,
+    cache: Optional[ResponseCache] = None,
+    fresh: bool = False,
+    library: Optional[RecipeLibrary] = None,
+) -> Iterator[Recipe]:
+    """Yield suggestions, from the local library when it covers the request.
+
+    The library is used when it has ``limit`` recipes using most of the
+    ingredients (and meeting ``dietary``). Free-text ``preferences`` cannot
+    be judged locally, so those requests, ``fresh`` ones and poorly covered
+    ones stream from GPT via :func:`stream_recipes`.
+    """
+    if library is not None and not fresh and not preferences:
+        matches = library.search(ingredients, dietary, limit)
+        if len(matches) >= limit:
+            print(f"Found {len(matches)} matching recipes in the local library", file=sys.stderr)
+            for match in matches:
+                recipe = recipe_from_dict(match.data)
+                recipe.rating = match.rating
+                yield recipe
+            return
+    yield from stream_recipes(ingredients, dietary, preferences, limit, cache, fresh)
 
+
+def choose_recipe(recipes: Iterable[Recipe], options: Optional[List[Recipe]] = None) -> Recipe:
+    """Display recipe options as they arrive and prompt for selection.
+
+    ``recipes`` may be a generator such as :func:`stream_recipes`; each
+    option is printed as soon as it is available. ``options``, if given,
+    receives every recipe shown.
+    """
+    options = [] if options is None else options
     print("\nRecipe options:")
     for idx, recipe in enumerate(recipes, start=1):
+        options.append(recipe)
         print(f"\n{idx}. {recipe.title}")
         print(f"   Cooking time: {recipe.cooking_time}")
         print(f"   Difficulty: {recipe.difficulty}")
         print(f"   Category: {recipe.category}")
         if recipe.dietary_info:
             print(f"   Dietary: {', '.join(recipe.dietary_info)}")
+    if not options:
+        raise ValueError("No recipe options available")
 
     while True:
-        choice = input(f"\nSelect [1-{len(recipes)}]: ").strip()
-        if choice.isdigit() and 1 <= int(choice) <= len(recipes):
-            return recipes[int(choice) - 1]
+        choice = input(f"\nSelect [1-{len(options)}]: ").strip()
+        if choice.isdigit() and 1 <= int(choice) <= len(options):
+            return options[int(choice) - 1]
         print("Invalid selection, try again.")
 
-def save_selection(selected: Recipe, options: List[Recipe]) -> None:
-    """Save the chosen recipe and update history."""
+def save_selection(
+    selected: Recipe,
+    options: List[Recipe],
+    library: Optional[RecipeLibrary] = None,
+    rated: bool = True,
+) -> None:
+    """Save the chosen recipe, update history and add every option to the library.
+
+    ``recipe_history.json`` keeps the last 10 picks for the dashboard; the
+    library keeps all suggestions, with selection counts and ratings.
+    ``rated`` says whether ``selected.rating`` is a new rating to record.
+    Writes happen under :data:`LOCK_FILE`, so concurrent runs don't clobber
+    each other's history.
+    """
+    with file_lock(LOCK_FILE):
+        _save_selection(selected, options, library, rated)
+
+def _save_selection(
+    selected: Recipe,
+    options: List[Recipe],
+    library: Optional[RecipeLibrary],
+    rated: bool,
+) -> None:
     setup_directories()
-    
-    # Save options list
-    options_text = "\n".join(f"{idx+1}. {recipe.title}" for idx, recipe in enumerate(options))
-    OPTIONS_FILE.write_text(options_text, encoding="utf-8")
-    
-    # Save selected recipe details
-    selected.date_added = datetime.now().isoformat()
-    recipe_data = {
-        "title": selected.title,
-        "ingredients": selected.ingredients,
-        "instructions": selected.instructions,
-        "cooking_time": selected.cooking_time,
-        "difficulty": selected.difficulty,
-        "category": selected.category,
-        "dietary_info": selected.dietary_info,
-        "date_added": selected.date_added
-    }
-    SELECTED_FILE.write_text(json.dumps(recipe_data, indent=2), encoding="utf-8")
-    
-    # Update history
-    history = []
-    if HISTORY_FILE.exists():
-        history = json.loads(HISTORY_FILE.read_text(encoding="utf-8"))
-    history.append(recipe_data)
-    HISTORY_FILE.write_text(json.dumps(history[-10:], indent=2), encoding="utf-8")
+    # Open (and seed) the library before this pick reaches the history file
+    own_library = library is None
+    library = open_library() if own_library else library
+    try:
+        # Save options list
+        options_text = "\n".join(f"{idx+1}. {recipe.title}" for idx, recipe in enumerate(options))
+        OPTIONS_FILE.write_text(options_text, encoding="utf-8")
+
+        # Save selected recipe details
+        selected.date_added = datetime.now().isoformat()
+        recipe_data = {
+            "title": selected.title,
+            "ingredients": selected.ingredients,
+            "instructions": selected.instructions,
+            "cooking_time": selected.cooking_time,
+            "difficulty": selected.difficulty,
+            "category": selected.category,
+            "dietary_info": selected.dietary_info,
+            "date_added": selected.date_added
+        }
+        SELECTED_FILE.write_text(json.dumps(recipe_data, indent=2), encoding="utf-8")
+
+        # Update history
+        history = []
+        if HISTORY_FILE.exists():
+            history = json.loads(HISTORY_FILE.read_text(encoding="utf-8"))
+        history.append(recipe_data)
+        HISTORY_FILE.write_text(json.dumps(history[-10:], indent=2), encoding="utf-8")
+
+        for recipe in options:
+            if recipe is not selected:
+                library.add(_library_data(recipe))
+        library.add(_library_data(selected), selected=True, rating=selected.rating if rated else None)
+    finally:
+        if own_library:
+            library.close()
+
+def _library_data(recipe: Recipe) -> dict:
+    """Return the fields of ``recipe`` worth storing (its own text, not our bookkeeping)."""
+    data = asdict(recipe)
+    data.pop("rating", None)
+    return data
 
 def rate_recipe(recipe: Recipe) -> None:
     """Allow user to rate the selected recipe."""
@@ -181,10 +425,99 @@ def rate_recipe(recipe: Recipe) -> None:
         except ValueError:
             print("Please enter a valid number")
 
+def auto_select(options: List[Recipe], policy: str = "first") -> Recipe:
+    """Pick a recipe without prompting.
+
+    ``best-rated`` takes the highest-rated option (ratings come from the
+    library) and falls back to the first when none is rated.
+    """
+    if not options:
+        raise ValueError("No recipe options available")
+    if policy == "best-rated":
+        rated = [r for r in options if r.rating is not None]
+        if rated:
+            return max(rated, key=lambda r: r.rating)
+    return options[0]
+
+def read_batch(source: str) -> List[Dict[str, Any]]:
+    """Read batch requests (JSON lines or plain ingredient lists) from a file or ``-``."""
+    stream = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    jobs = []
+    try:
+        for lineno, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError:
+                job = line
+            if isinstance(job, str):
+                job = {"ingredients": job}
+            if not isinstance(job, dict) or not job.get("ingredients"):
+                raise ValueError(f"{source}:{lineno}: expected ingredients or a JSON object with 'ingredients'")
+            jobs.append(job)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return jobs
+
+def run_batch_job(
+    job: Dict[str, Any],
+    policy: str = "first",
+    library: Optional[RecipeLibrary] = None,
+    cache: Optional[ResponseCache] = None,
+) -> Dict[str, Any]:
+    """Suggest, auto-select and save recipes for one batch request."""
+    options = list(suggest_recipes(
+        job["ingredients"],
+        dietary=job.get("dietary") or "none",
+        preferences=job.get("preferences") or None,
+        limit=int(job.get("limit", 3)),
+        cache=cache,
+        fresh=bool(job.get("fresh")),
+        library=library,
+    ))
+    selected = auto_select(options, policy)
+    save_selection(selected, options, library, rated=False)
+    return {
+        "ingredients": job["ingredients"],
+        "selected": selected.title,
+        "options": [recipe.title for recipe in options],
+    }
+
+def run_batch(
+    jobs: List[Dict[str, Any]],
+    policy: str = "first",
+    workers: int = 4,
+    library: Optional[RecipeLibrary] = None,
+    cache: Optional[ResponseCache] = None,
+) -> List[Dict[str, Any]]:
+    """Run ``jobs`` on a pool of ``workers`` threads; results keep the input order.
+
+    A failed job yields ``{"ingredients": ..., "error": ...}`` instead of
+    stopping the batch.
+    """
+    own_library = library is None
+    library = open_library() if own_library else library
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = [pool.submit(run_batch_job, job, policy, library, cache) for job in jobs]
+            results = []
+            for job, future in zip(jobs, futures):
+                try:
+                    results.append(future.result())
+                except Exception as exc:
+                    results.append({"ingredients": job["ingredients"], "error": str(exc)})
+    finally:
+        if own_library:
+            library.close()
+    return results
+
 def main(argv: List[str] | None = None) -> None:
     """Entry point: fetch recipes and prompt for selection."""
     parser = argparse.ArgumentParser(description="Find recipes based on ingredients")
-    parser.add_argument("ingredients", help="Comma-separated list of ingredients")
+    parser.add_argument("ingredients", nargs="?", help="Comma-separated list of ingredients")
     parser.add_argument(
         "--dietary",
         choices=DIETARY_OPTIONS,
@@ -195,26 +528,84 @@ def main(argv: List[str] | None = None) -> None:
         "--preferences",
         help="Additional preferences (e.g., 'quick', 'healthy')"
     )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Ask GPT again instead of reusing cached suggestions"
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="Read requests from a JSON lines file ('-' for stdin) and run them without prompting"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=4,
+        help="Concurrent requests in batch mode (default 4)"
+    )
+    parser.add_argument(
+        "--auto-select",
+        choices=AUTO_SELECT_POLICIES,
+        help="Pick a recipe without prompting (default 'first' in batch mode)"
+    )
     
     args = parser.parse_args(argv if argv is not None else sys.argv[1:])
     
-    try:
-        recipes = fetch_recipes(
-            args.ingredients,
-            dietary=args.dietary,
-            preferences=args.preferences
-        )
-    except Exception as exc:
-        sys.exit(f"Failed to fetch recipes: {exc}")
+    if args.batch or args.auto_select:
+        if args.batch:
+            try:
+                jobs = read_batch(args.batch)
+            except (OSError, ValueError) as exc:
+                sys.exit(f"Failed to read batch: {exc}")
+        elif args.ingredients:
+            jobs = [{
+                "ingredients": args.ingredients,
+                "dietary": args.dietary,
+                "preferences": args.preferences,
+                "fresh": args.fresh,
+            }]
+        else:
+            parser.error("ingredients are required without --batch")
+        results = run_batch(jobs, args.auto_select or "first", args.jobs)
+        for result in results:
+            print(json.dumps(result))
+        if any("error" in result for result in results):
+            sys.exit(1)
+        return
+
+    if not args.ingredients:
+        parser.error("ingredients are required without --batch")
 
+    recipes: List[Recipe] = []
+    library = open_library()
     try:
-        selected = choose_recipe(recipes)
-        rate_recipe(selected)
-        save_selection(selected, recipes)
-        print(f"\nRecipe saved to {SELECTED_FILE}")
-        print(f"History updated in {HISTORY_FILE}")
-    except Exception as exc:
-        sys.exit(f"Selection error: {exc}")
+        try:
+            # Options are shown as they arrive
+            selected = choose_recipe(
+                suggest_recipes(
+                    args.ingredients,
+                    dietary=args.dietary,
+                    preferences=args.preferences,
+                    fresh=args.fresh,
+                    library=library,
+                ),
+                recipes,
+            )
+        except (RuntimeError, EnvironmentError) as exc:
+            sys.exit(f"Failed to fetch recipes: {exc}")
+        except Exception as exc:
+            sys.exit(f"Selection error: {exc}")
+
+        try:
+            rate_recipe(selected)
+            save_selection(selected, recipes, library)
+            print(f"\nRecipe saved to {SELECTED_FILE}")
+            print(f"History updated in {HISTORY_FILE}")
+        except Exception as exc:
+            sys.exit(f"Selection error: {exc}")
+    finally:
+        library.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,232 @@
+"""Local, searchable library of every recipe the finder has suggested.
+
+Recipes are stored in SQLite together with their ratings and how often they
+were picked. An inverted index maps each normalised ingredient word to the
+recipes that use it, so "what can I make with chicken and rice?" is answered
+with a few indexed lookups instead of a GPT call. Matches are ranked by how
+many of the requested ingredients a recipe uses, nudged by its rating.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+MIN_COVERAGE = 0.6  # Share of the requested ingredients a local match must use
+
+# Quantities, units and preparation words that say nothing about the ingredient
+FILLER_WORDS = frozenset("""
+a an and the of or to for with into some few optional taste about plus
+g kg mg ml l oz lb lbs cup tbsp tsp tablespoon teaspoon pinch dash handful
+clove can tin jar packet bunch slice piece sprig stick knob
+large small medium fresh dried frozen chopped diced sliced minced grated crushed
+peeled finely roughly thinly boneless skinless cooked raw ripe whole halved
+""".split())
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recipes (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    data TEXT NOT NULL,
+    added TEXT NOT NULL,
+    times_selected INTEGER NOT NULL DEFAULT 0,
+    rating_sum REAL NOT NULL DEFAULT 0,
+    rating_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS recipe_terms (
+    term TEXT NOT NULL,
+    recipe_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS recipe_terms_term ON recipe_terms (term);
+CREATE INDEX IF NOT EXISTS recipe_terms_recipe ON recipe_terms (recipe_id);
+"""
+
+
+def normalize_ingredient(name: str) -> str:
+    """Return a canonical spelling of one ingredient.
+
+    Lower-cases, collapses whitespace and folds a plural last word to its
+    singular, e.g. "Cherry  Tomatoes" -> "cherry tomato".
+    """
+    words = re.sub(r"[^a-z0-9\s-]", " ", name.lower()).split()
+    if not words:
+        return ""
+    last = words[-1]
+    if len(last) > 4 and last.endswith("ies"):
+        last = last[:-3] + "y"
+    elif len(last) > 4 and last.endswith(("oes", "ches", "shes", "xes", "sses")):
+        last = last[:-2]
+    elif len(last) > 3 and last.endswith("s") and not last.endswith(("ss", "us", "is")):
+        last = last[:-1]
+    return " ".join(words[:-1] + [last])
+
+
+def canonical_ingredients(ingredients: str | Iterable[str]) -> List[str]:
+    """Return the sorted, de-duplicated canonical ingredients of a comma list."""
+    if isinstance(ingredients, str):
+        ingredients = ingredients.split(",")
+    return sorted({n for n in (normalize_ingredient(i) for i in ingredients) if n})
+
+
+def ingredient_terms(line: str) -> Set[str]:
+    """Return the normalised words naming the ingredient in a recipe line.
+
+    "2 large chicken breasts, diced" -> {"chicken", "breast"}.
+    """
+    line = re.sub(r"\([^)]*\)", " ", line.lower()).split(",")[0]
+    terms = set()
+    for word in re.findall(r"[a-z]+", line):
+        word = normalize_ingredient(word)
+        if len(word) > 1 and word not in FILLER_WORDS:
+            terms.add(word)
+    return terms
+
+
+def recipe_key(data: Dict[str, Any]) -> str:
+    """Return the identity of a recipe: its normalised title."""
+    return " ".join(re.findall(r"[a-z0-9]+", str(data.get("title", "")).lower()))
+
+
+@dataclass
+class LibraryMatch:
+    """A stored recipe that uses some of the requested ingredients."""
+
+    recipe_id: int
+    data: Dict[str, Any]
+    coverage: float
+    rating: Optional[float]
+    times_selected: int
+
+    @property
+    def score(self) -> float:
+        """Ranking score: ingredient coverage, nudged by rating and popularity."""
+        bonus = 0.0
+        if self.rating is not None:
+            bonus += (self.rating - 3) / 20  # +/- 0.1 for 5 or 1 stars
+        bonus += min(self.times_selected, 5) / 100
+        return self.coverage + bonus
+
+
+class RecipeLibrary:
+    """SQLite recipe store with an inverted ingredient index."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM recipes").fetchone()[0]
+
+    def add(self, data: Dict[str, Any], selected: bool = False, rating: Optional[float] = None) -> int:
+        """Store or update a recipe and return its id.
+
+        A recipe with the same normalised title replaces the stored text but
+        keeps its rating and selection history.
+        """
+        key = recipe_key(data)
+        terms = set()
+        for line in data.get("ingredients") or []:
+            terms |= ingredient_terms(str(line))
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO recipes (key, title, data, added) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET title = excluded.title, data = excluded.data",
+                (key, data.get("title", ""), json.dumps(data), datetime.now().isoformat()),
+            )
+            recipe_id = self.conn.execute("SELECT id FROM recipes WHERE key = ?", (key,)).fetchone()[0]
+            if selected:
+                self.conn.execute(
+                    "UPDATE recipes SET times_selected = times_selected + 1 WHERE id = ?", (recipe_id,)
+                )
+            if rating is not None:
+                self.conn.execute(
+                    "UPDATE recipes SET rating_sum = rating_sum + ?, rating_count = rating_count + 1 "
+                    "WHERE id = ?",
+                    (rating, recipe_id),
+                )
+            self.conn.execute("DELETE FROM recipe_terms WHERE recipe_id = ?", (recipe_id,))
+            self.conn.executemany(
+                "INSERT INTO recipe_terms (term, recipe_id) VALUES (?, ?)",
+                [(term, recipe_id) for term in sorted(terms)],
+            )
+        return recipe_id
+
+    def search(
+        self,
+        ingredients: str | Iterable[str],
+        dietary: str = "none",
+        limit: int = 3,
+        min_coverage: float = MIN_COVERAGE,
+    ) -> List[LibraryMatch]:
+        """Return the best stored recipes for ``ingredients``, best first.
+
+        A recipe counts as using a requested ingredient when it has every
+        word of it (so "tomato" matches "cherry tomatoes"). Recipes using
+        less than ``min_coverage`` of the request, or not marked with the
+        ``dietary`` restriction, are left out.
+        """
+        wanted = [ingredient_terms(i) for i in canonical_ingredients(ingredients)]
+        wanted = [terms for terms in wanted if terms]
+        if not wanted:
+            return []
+
+        hits: Dict[int, int] = {}
+        with self._lock:
+            postings: Dict[str, Set[int]] = {}
+            for term in set().union(*wanted):
+                postings[term] = {
+                    rid for (rid,) in self.conn.execute(
+                        "SELECT recipe_id FROM recipe_terms WHERE term = ?", (term,)
+                    )
+                }
+            for terms in wanted:
+                for rid in set.intersection(*(postings[t] for t in terms)):
+                    hits[rid] = hits.get(rid, 0) + 1
+
+            matches = []
+            for rid, count in hits.items():
+                coverage = count / len(wanted)
+                if coverage < min_coverage:
+                    continue
+                data, times_selected, rating_sum, rating_count = self.conn.execute(
+                    "SELECT data, times_selected, rating_sum, rating_count FROM recipes WHERE id = ?",
+                    (rid,),
+                ).fetchone()
+                data = json.loads(data)
+                if dietary and dietary != "none" and dietary.lower() not in (
+                    str(d).lower() for d in data.get("dietary_info") or []
+                ):
+                    continue
+                rating = rating_sum / rating_count if rating_count else None
+                matches.append(LibraryMatch(rid, data, coverage, rating, times_selected))
+
+        matches.sort(key=lambda m: (m.score, m.recipe_id), reverse=True)
+        return matches[:limit]
+
+    def import_history(self, json_path: Path) -> int:
+        """Add the recipes of a ``recipe_history.json`` file; returns how many."""
+        try:
+            history = json.loads(Path(json_path).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return 0
+        count = 0
+        for data in history if isinstance(history, list) else []:
+            if isinstance(data, dict) and data.get("title"):
+                self.add(data, selected=True, rating=data.get("rating"))
+                count += 1
+        return count
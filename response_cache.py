@@ -0,0 +1,138 @@
+"""On-disk cache for OpenAI responses, shared by every script in the hub.
+
+Requests are keyed by a hash of the endpoint plus whatever identifies the
+request (model, messages or prompt, parameters, and optionally a scope such
+as the date). Values are JSON files under the cache directory. They expire
+after a TTL. When the directory outgrows its size budget, the least recently
+used entries are evicted first.
+
+Modes, chosen with ``OPENAI_CACHE_MODE`` or the ``mode`` argument:
+
+``on``      serve hits, call the API on a miss and record the result (default)
+``off``     always call the API, never read or write the cache
+``replay``  serve recorded responses only; a miss raises :class:`CacheMiss`,
+            so tests and benchmarks can replay a session offline. TTLs are
+            ignored in this mode.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+MODES = ("on", "off", "replay")
+DEFAULT_DIR = Path.home() / ".cache" / "ai-hub" / "openai"
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+
+class CacheMiss(RuntimeError):
+    """Raised in replay mode when no recorded response exists."""
+
+
+class ResponseCache:
+    """JSON response cache with TTL, size-based LRU eviction and replay mode."""
+
+    def __init__(
+        self,
+        root: Optional[Path] = None,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        mode: Optional[str] = None,
+    ) -> None:
+        self.root = Path(root or os.getenv("OPENAI_CACHE_DIR") or DEFAULT_DIR)
+        self.ttl = float(ttl if ttl is not None else os.getenv("OPENAI_CACHE_TTL", DEFAULT_TTL))
+        self.max_bytes = int(max_bytes if max_bytes is not None else os.getenv("OPENAI_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self.mode = (mode or os.getenv("OPENAI_CACHE_MODE", "on")).lower()
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown cache mode {self.mode!r}; expected one of {', '.join(MODES)}")
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(endpoint: str, key_data: Dict[str, Any]) -> str:
+        """Return the cache key for a request."""
+        payload = json.dumps({"endpoint": endpoint, **key_data}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for ``key`` or ``None``."""
+        if self.mode == "off":
+            return None
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if self.mode != "replay" and time.time() - entry.get("created", 0) > self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(path)  # Mark as recently used for LRU eviction
+        except OSError:
+            pass
+        return entry.get("value")
+
+    def put(self, key: str, value: Any) -> None:
+        """Record ``value`` under ``key`` (ignored in ``off`` and ``replay`` modes)."""
+        if self.mode != "on" or value is None:
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"created": time.time(), "value": value}, f)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        self._evict()
+
+    def call(
+        self,
+        endpoint: str,
+        key_data: Dict[str, Any],
+        compute: Callable[[], Any],
+        fresh: bool = False,
+    ) -> Any:
+        """Return the cached value for a request, calling ``compute`` on a miss.
+
+        ``fresh`` skips the lookup (outside replay mode) but still records the
+        new value, replacing the stale one.
+        """
+        key = self.key(endpoint, key_data)
+        value = None if fresh and self.mode != "replay" else self.get(key)
+        if value is not None:
+            return value
+        if self.mode == "replay":
+            raise CacheMiss(f"No recorded {endpoint} response ({key[:12]})")
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits ``max_bytes``."""
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.root.glob("*/*.json"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
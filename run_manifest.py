@@ -0,0 +1,116 @@
+"""Per-run progress manifest for the Daily Brain Boost.
+
+Records how far each card of a run has got so an interrupted run can be
+finished with ``--resume`` instead of regenerating (and re-paying for)
+everything. Cards move through these stages, in order:
+
+``text``    text generated and written (``content``)
+``artist``  artist chosen (``artist``)
+``image``   image stored in the image store (``sha256``)
+``linked``  image published under its dashboard names
+
+Run-wide steps that must happen once, such as saving the run to history,
+are recorded by name with :meth:`RunManifest.mark_done`.
+
+The manifest is rewritten atomically after every change, so a crash leaves
+either the previous or the new state on disk, never a partial file.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+STAGES = ("text", "artist", "image", "linked")
+
+
+class RunManifest:
+    """Stage tracking for one generator run, keyed by card name (e.g. ``fact``)."""
+
+    def __init__(self, path: Path, timestamp: str, date: str) -> None:
+        self.path = Path(path)
+        self.timestamp = timestamp
+        self.date = date
+        self.finished = False
+        self.cards: Dict[str, Dict[str, Any]] = {}
+        self.steps: List[str] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["RunManifest"]:
+        """Load a manifest, or return ``None`` if there is no readable one."""
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        manifest = cls(path, data["timestamp"], data["date"])
+        manifest.finished = data.get("finished", False)
+        manifest.cards = data.get("cards", {})
+        manifest.steps = data.get("steps", [])
+        return manifest
+
+    def stage(self, card: str) -> Optional[str]:
+        """Return the last stage ``card`` completed."""
+        with self._lock:
+            return self.cards.get(card, {}).get("stage")
+
+    def reached(self, card: str, stage: str) -> bool:
+        """Return True if ``card`` has completed ``stage`` (or a later one)."""
+        current = self.stage(card)
+        return current is not None and STAGES.index(current) >= STAGES.index(stage)
+
+    def get(self, card: str, field: str) -> Any:
+        with self._lock:
+            return self.cards.get(card, {}).get(field)
+
+    def record(self, card: str, stage: Optional[str] = None, **fields: Any) -> None:
+        """Store ``fields`` for ``card`` and advance it to ``stage``.
+
+        Stages never move backwards, so recording an earlier stage again
+        (e.g. replacing the word text) only updates the fields.
+        """
+        with self._lock:
+            entry = self.cards.setdefault(card, {})
+            entry.update(fields)
+            current = entry.get("stage")
+            if stage and (current is None or STAGES.index(stage) > STAGES.index(current)):
+                entry["stage"] = stage
+            self._save()
+
+    def done(self, step: str) -> bool:
+        """Return True if the run-wide ``step`` has been marked done."""
+        with self._lock:
+            return step in self.steps
+
+    def mark_done(self, step: str) -> None:
+        with self._lock:
+            if step not in self.steps:
+                self.steps.append(step)
+                self._save()
+
+    def mark_finished(self) -> None:
+        with self._lock:
+            self.finished = True
+            self._save()
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "timestamp": self.timestamp,
+            "date": self.date,
+            "finished": self.finished,
+            "cards": self.cards,
+            "steps": self.steps,
+        }
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, self.path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
@@ -8,15 +8,22 @@ Designed for cross-platform compatibility (Raspberry Pi and Windows).
 
 from __future__ import annotations
 
+import hashlib
 import json
 import os
+import shutil
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 
 import requests
 
+# Shared helpers live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from image_variants import write_variants  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+
 try:
     from dotenv import load_dotenv
     import openai
@@ -51,24 +58,59 @@ def init_client() -> openai.OpenAI:
     return openai.OpenAI(api_key=api_key)
 
 
-def generate_text(client: openai.OpenAI, prompt: str) -> str:
-    """Generate text using the chat completion endpoint."""
-    response = client.chat.completions.create(
+def _today() -> str:
+    return datetime.now().strftime("%Y%m%d")
+
+
+def generate_text(
+    client: openai.OpenAI, prompt: str, cache: Optional[ResponseCache] = None
+) -> str:
+    """Generate text using the chat completion endpoint.
+
+    Answers are cached per day, so rerunning after a failure reuses them.
+    """
+    cache = cache or ResponseCache(mode="off")
+    request = dict(
         model=TEXT_MODEL,
         messages=[{"role": "user", "content": prompt}],
         max_tokens=60,
     )
-    return response.choices[0].message.content.strip()
 
+    def create() -> str:
+        response = client.chat.completions.create(**request)
+        return response.choices[0].message.content.strip()
+
+    return cache.call("chat.completions", {**request, "day": _today()}, create)
 
-def generate_image(client: openai.OpenAI, prompt: str, filename: Path) -> bool:
+
+def generate_image(
+    client: openai.OpenAI,
+    prompt: str,
+    filename: Path,
+    cache: Optional[ResponseCache] = None,
+) -> bool:
     """Generate an image for ``prompt`` and save it to ``filename``.
 
-    Returns ``True`` if the image was successfully downloaded.
+    Smaller WebP/JPEG variants (``<name>_<width>.webp`` etc.) are written
+    next to it for the web UI. Returns ``True`` if the image was
+    successfully downloaded. The cache
+    records the digest of the saved file; if that file is still on disk a
+    rerun reuses it instead of generating a new image.
     """
 
+    cache = cache or ResponseCache(mode="off")
+    request = dict(model=IMAGE_MODEL, prompt=prompt, n=1)
+    key = cache.key("images.generate", {**request, "day": _today(), "file": filename.name})
+    cached = cache.get(key)
+    if cached and filename.exists():
+        if hashlib.sha256(filename.read_bytes()).hexdigest() == cached.get("sha256"):
+            return True
+    if cache.mode == "replay":
+        print(f"No recorded image for {filename.name}")
+        return False
+
     try:
-        img = client.images.generate(model=IMAGE_MODEL, prompt=prompt, n=1)
+        img = client.images.generate(**request)
         url = img.data[0].url
     except Exception as exc:  # pragma: no cover - network failure
         print(f"Image request failed: {exc}")
@@ -78,6 +120,11 @@ def generate_image(client: openai.OpenAI, prompt: str, filename: Path) -> bool:
         response = requests.get(url, timeout=30)
         if response.status_code == 200:
             filename.write_bytes(response.content)
+            cache.put(key, {"sha256": hashlib.sha256(response.content).hexdigest()})
+            try:
+                write_variants(filename)
+            except OSError as exc:
+                print(f"Image variants failed: {exc}")
             return True
     except Exception as exc:  # pragma: no cover - network failure
         print(f"Image download failed: {exc}")
@@ -85,30 +132,44 @@ def generate_image(client: openai.OpenAI, prompt: str, filename: Path) -> bool:
 
 
 def save_text(data: Dict[str, str], folder: Path) -> None:
-    """Save generated text to JSON in the given folder."""
-    folder.mkdir(parents=True, exist_ok=True)
-    outfile = folder / "content.json"
-    with outfile.open("w", encoding="utf-8") as f:
+    """Save generated text to JSON in the given folder.
+
+    A new folder is assembled under a hidden name and renamed into place,
+    and an existing ``content.json`` is replaced atomically, so the web hub
+    never sees an empty folder or a half-written file.
+    """
+    if folder.exists():
+        staging = folder
+    else:
+        staging = folder.with_name(f".{folder.name}.tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+    tmp = staging / "content.json.tmp"
+    with tmp.open("w", encoding="utf-8") as f:
         json.dump(data, f, indent=2)
+    os.replace(tmp, staging / "content.json")
+    if staging != folder:
+        os.rename(staging, folder)
 
 
 def main() -> None:
     """Generate daily content and optionally images."""
     client = init_client()
-    today = datetime.now().strftime("%Y%m%d")
+    cache = ResponseCache()
+    today = _today()
     out_folder = DATA_DIR / today
-    out_folder.mkdir(parents=True, exist_ok=True)
     IMAGES_DIR.mkdir(parents=True, exist_ok=True)
 
     results: Dict[str, str] = {}
     for key, prompt in PROMPTS.items():
-        results[key] = generate_text(client, prompt)
-
-    save_text(results, out_folder)
+        results[key] = generate_text(client, prompt, cache)
 
     # Example image: generate based on the joke
     img_file = IMAGES_DIR / f"joke_{today}.png"
-    generate_image(client, results.get("joke", ""), img_file)
+    generate_image(client, results.get("joke", ""), img_file, cache)
+
+    # Save the text last: the folder appearing is what publishes the day
+    save_text(results, out_folder)
     print(f"Content saved to {out_folder}")
 
 
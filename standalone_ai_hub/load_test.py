@@ -0,0 +1,146 @@
+"""Load-test harness for the Standalone AI Hub web server.
+
+Hammers ``/`` and the current image route with concurrent keep-alive
+connections and reports requests per second and latency percentiles.
+Uses only the standard library so it runs on the Pi itself::
+
+    python web_app.py --serve production --workers 4 &
+    python load_test.py --url http://localhost:8000 --concurrency 16 --requests 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import itertools
+import json
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+
+@dataclass
+class RouteResult:
+    """Timings collected for one route."""
+
+    path: str
+    elapsed: float = 0.0
+    errors: int = 0
+    latencies: List[float] = field(default_factory=list)
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies) + self.errors
+
+    @property
+    def rps(self) -> float:
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, pct: float) -> float:
+        """Return the ``pct`` percentile latency in milliseconds (nearest rank)."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        rank = max(1, math.ceil(pct / 100 * len(ordered)))
+        return ordered[rank - 1] * 1000
+
+
+def run_route(
+    host: str,
+    port: int,
+    path: str,
+    concurrency: int,
+    total: int,
+    headers: Optional[Dict[str, str]] = None,
+) -> RouteResult:
+    """Issue ``total`` GETs for ``path`` from ``concurrency`` threads."""
+    result = RouteResult(path)
+    counter = itertools.count()
+    lock = threading.Lock()
+
+    def worker() -> None:
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        latencies, errors = [], 0
+        while next(counter) < total:
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers or {})
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    errors += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+                continue
+            latencies.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            result.latencies.extend(latencies)
+            result.errors += errors
+
+    threads = [threading.Thread(target=worker) for _ in range(max(1, concurrency))]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def discover_image(host: str, port: int) -> Optional[str]:
+    """Return the current content-hashed image path from ``/api/content``."""
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    try:
+        conn.request("GET", "/api/content")
+        response = conn.getresponse()
+        if response.status != 200:
+            return None
+        return json.loads(response.read()).get("image")
+    except (OSError, ValueError, http.client.HTTPException):
+        return None
+    finally:
+        conn.close()
+
+
+def format_results(results: List[RouteResult]) -> str:
+    """Return a plain-text table of ``results``."""
+    lines = [f"{'route':<48} {'reqs':>7} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}"]
+    for r in results:
+        lines.append(
+            f"{r.path[:48]:<48} {r.requests:>7} {r.errors:>7} {r.rps:>9.1f} "
+            f"{r.percentile(50):>8.2f} {r.percentile(99):>8.2f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Load-test the Standalone AI Hub web server")
+    parser.add_argument("--url", default="http://localhost:8000", help="base URL of the server")
+    parser.add_argument("--concurrency", type=int, default=16, help="simultaneous connections")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per route")
+    parser.add_argument("--image", help="image path to test (default: discovered from /api/content)")
+    args = parser.parse_args(argv)
+
+    url = urlsplit(args.url)
+    host, port = url.hostname or "localhost", url.port or 80
+
+    paths = ["/"]
+    image = args.image or discover_image(host, port)
+    if image:
+        paths.append(image)
+    else:
+        print("No image found; testing / only (pass --image to choose one)")
+
+    results = [run_route(host, port, path, args.concurrency, args.requests) for path in paths]
+    print(format_results(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,50 @@
 
 This script serves the latest generated content via a simple web
 interface. The Raspberry Pi can access it over the network.
+
+``python web_app.py`` starts Flask's development server. For wall tablets
+and dashboards use ``python web_app.py --serve production --workers N``,
+which runs the same app under gunicorn's pre-forked workers (``gthread``
+workers, so idle SSE streams don't block other requests) with ``sendfile``
+for images.
 """
 
 from __future__ import annotations
 
+import argparse
+import hashlib
 import json
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+
+# Shared helpers live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from image_variants import FORMATS, WIDTHS, variant_name  # noqa: E402
 
-from flask import Flask, render_template_string, send_from_directory
+from flask import (
+    Flask,
+    Response,
+    abort,
+    jsonify,
+    make_response,
+    render_template_string,
+    request,
+    send_from_directory,
+)
 
 DATA_DIR = Path("data")
 IMAGES_DIR = DATA_DIR / "images"
+SNAPSHOT_POLL_INTERVAL = 2.0  # Seconds between checks for new content
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600  # Content-hashed URLs never change
+DIGEST_CACHE_SIZE = 512  # Digests of older days' images kept in memory (LRU)
+STREAM_KEEPALIVE = 15.0  # Seconds between SSE keep-alive comments
+DEFAULT_WORKERS = os.cpu_count() or 1  # Production worker processes
+DEFAULT_THREADS = 16  # Threads per worker; each open SSE stream holds one
 
 app = Flask(__name__)
 
@@ -28,7 +60,12 @@ HTML_TEMPLATE = """
   {% endfor %}
   </ul>
   {% if image_name %}
-    <img src="/images/{{ image_name }}" alt="Daily image" />
+    <picture>
+    {% for mimetype, srcset in image_sources %}
+      <source type="{{ mimetype }}" srcset="{{ srcset }}" sizes="(max-width: 512px) 100vw, 512px" />
+    {% endfor %}
+      <img src="/images/{{ image_digest }}/{{ image_name }}" alt="Daily image" style="max-width: 100%" />
+    </picture>
   {% endif %}
 {% else %}
   <p>No content available. Run daily_content.py first.</p>
@@ -36,17 +73,24 @@ HTML_TEMPLATE = """
 """
 
 
-def _latest_data_folder() -> Path | None:
+def _latest_data_folder(data_dir: Path = DATA_DIR) -> Path | None:
     """Return the most recent data directory or ``None`` if none exist."""
-    if not DATA_DIR.exists():
+    if not data_dir.exists():
         return None
-    dirs = [d for d in DATA_DIR.iterdir() if d.is_dir() and d.name.isdigit()]
+    dirs = [d for d in data_dir.iterdir() if d.is_dir() and d.name.isdigit()]
     return max(dirs, default=None)
 
 
-def load_latest_data() -> Dict[str, Any]:
-    """Load the most recent ``content.json`` file if present."""
-    folder = _latest_data_folder()
+def _mtime(path: Path | None) -> int | None:
+    """Return ``path``'s mtime in nanoseconds, or ``None`` if it is missing."""
+    try:
+        return path.stat().st_mtime_ns if path else None
+    except OSError:
+        return None
+
+
+def _read_content(folder: Path | None) -> Dict[str, Any]:
+    """Parse ``content.json`` in ``folder``, returning ``{}`` if unavailable."""
     if not folder:
         return {}
     json_file = folder / "content.json"
@@ -58,31 +102,424 @@ def load_latest_data() -> Dict[str, Any]:
         return {}
 
 
+def _file_digest(path: Path) -> str:
+    """Return a short SHA-256 of ``path``'s contents for cache-busting URLs."""
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+@dataclass
+class Page:
+    """A rendered page body and its strong ETag."""
+
+    body: bytes
+    etag: str
+
+
+@dataclass
+class Snapshot:
+    """The latest content folder, its parsed content and its joke image."""
+
+    folder: Optional[Path] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    image_name: Optional[str] = None
+    image_digest: Optional[str] = None
+    variants: List[Tuple[int, str, str]] = field(default_factory=list)
+    digests: Dict[str, str] = field(default_factory=dict)
+    modified: Optional[float] = None
+    signature: Tuple[Any, ...] = ()
+    page: Optional[Page] = None
+
+    def image_sources(self) -> List[Tuple[str, str]]:
+        """Return ``(mimetype, srcset)`` pairs for the image's smaller variants."""
+        sources: Dict[str, List[str]] = {}
+        for width, fmt, name in self.variants:
+            url = image_url(name, self.digests.get(name))
+            sources.setdefault(f"image/{fmt}", []).append(f"{url} {width}w")
+        return [(mimetype, ", ".join(srcset)) for mimetype, srcset in sources.items()]
+
+    @property
+    def version(self) -> str:
+        """An identifier that changes whenever the snapshot's files do."""
+        return "-".join(str(part) for part in self.signature)
+
+
+def _attach_image(snapshot: Snapshot, image: Path) -> None:
+    """Record ``image`` and its smaller variants, with digests, on ``snapshot``."""
+    snapshot.image_name = image.name
+    snapshot.image_digest = _file_digest(image)
+    snapshot.digests[image.name] = snapshot.image_digest
+    for fmt in FORMATS:
+        for width in WIDTHS:
+            variant = image.with_name(variant_name(image.stem, width, fmt))
+            if variant.is_file():
+                snapshot.variants.append((width, fmt, variant.name))
+                snapshot.digests[variant.name] = _file_digest(variant)
+
+
+class SnapshotCache:
+    """Process-wide cache of the latest snapshot with mtime change detection.
+
+    At most once per ``poll_interval`` a request stats the data directory,
+    the latest ``content.json`` and its image. The directory is only listed
+    again when its own mtime changes (i.e. a folder was added or removed),
+    and content is only re-parsed when one of those mtimes moves, so page
+    hits between daily runs cost no directory scans or JSON parsing.
+    """
+
+    def __init__(
+        self,
+        data_dir: Path = DATA_DIR,
+        images_dir: Path = IMAGES_DIR,
+        poll_interval: float = SNAPSHOT_POLL_INTERVAL,
+    ) -> None:
+        self.data_dir = data_dir
+        self.images_dir = images_dir
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Snapshot] = None
+        self._checked = 0.0
+        self._dir_mtime: int | None = None
+        self._folder: Path | None = None
+        self._digests: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+    def get(self) -> Snapshot:
+        """Return the current snapshot, refreshing it if the files changed."""
+        with self._lock:
+            now = time.monotonic()
+            if self._snapshot is not None and now - self._checked < self.poll_interval:
+                return self._snapshot
+            self._checked = now
+
+            dir_mtime = _mtime(self.data_dir)
+            if self._snapshot is None or dir_mtime != self._dir_mtime:
+                self._dir_mtime = dir_mtime
+                self._folder = _latest_data_folder(self.data_dir)
+
+            folder = self._folder
+            image = self.images_dir / f"joke_{folder.name}.png" if folder else None
+            signature = (
+                folder.name if folder else None,
+                _mtime(folder / "content.json" if folder else None),
+                _mtime(image),
+            )
+            if self._snapshot is None or signature != self._snapshot.signature:
+                self._snapshot = self._load(folder, image, signature)
+            return self._snapshot
+
+    def _load(self, folder: Path | None, image: Path | None, signature: Tuple[Any, ...]) -> Snapshot:
+        mtimes = [m for m in signature[1:] if m is not None]
+        snapshot = Snapshot(
+            folder=folder,
+            data=_read_content(folder),
+            modified=max(mtimes) / 1e9 if mtimes else None,
+            signature=signature,
+        )
+        if signature[2] is not None:
+            _attach_image(snapshot, image)
+        return snapshot
+
+    def image_digest(self, filename: str) -> Optional[str]:
+        """Return the digest of ``filename`` in the images directory, if any.
+
+        The current snapshot's images are answered from memory; older ones
+        are hashed once and remembered until their mtime or size changes,
+        keeping the :data:`DIGEST_CACHE_SIZE` most recently requested.
+        """
+        snapshot = self.get()
+        if filename in snapshot.digests:
+            return snapshot.digests[filename]
+        path = self.images_dir / filename
+        if path.parent != self.images_dir or not path.is_file():
+            return None
+        stat = path.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._digests.pop(filename, None)
+            if cached and cached[0] == signature:
+                self._digests[filename] = cached  # Most recently used last
+                return cached[1]
+        digest = _file_digest(path)
+        with self._lock:
+            self._digests.pop(filename, None)
+            self._digests[filename] = (signature, digest)
+            while len(self._digests) > DIGEST_CACHE_SIZE:
+                del self._digests[next(iter(self._digests))]
+        return digest
+
+
+snapshot_cache = SnapshotCache()
+
+
+def image_url(name: str | None, digest: str | None) -> str | None:
+    """Return the content-hashed URL for an image, or ``None``."""
+    return f"/images/{digest}/{name}" if name and digest else None
+
+
+def content_payload(snapshot: Snapshot) -> Dict[str, Any]:
+    """Return the API representation of ``snapshot``."""
+    return {
+        "date": snapshot.folder.name if snapshot.folder else None,
+        "content": snapshot.data,
+        "image": image_url(snapshot.image_name, snapshot.image_digest),
+        "variants": [
+            {"width": width, "type": f"image/{fmt}", "url": image_url(name, snapshot.digests.get(name))}
+            for width, fmt, name in snapshot.variants
+        ],
+        "version": snapshot.version,
+    }
+
+
+class ContentWatcher:
+    """Background thread that wakes stream clients when a day is published.
+
+    One thread polls the snapshot cache; every ``/api/stream`` connection
+    just waits on a condition variable, so idle clients cost no disk I/O.
+    An event is keyed on the folder and its ``content.json`` mtime, so
+    ``daily_content.py`` publishing a day (or re-running it) produces a
+    single event.
+    """
+
+    def __init__(self, cache: SnapshotCache, interval: float = SNAPSHOT_POLL_INTERVAL) -> None:
+        self.cache = cache
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._event_id: Optional[str] = None
+        self._payload: Optional[Dict[str, Any]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Start the polling thread if it is not already running."""
+        with self._cond:
+            if self._thread is None:
+                self.check()
+                self._thread = threading.Thread(target=self._run, name="content-watcher", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self) -> None:
+        """Refresh the snapshot and notify waiters if a new day was published."""
+        snapshot = self.cache.get()
+        folder, content_mtime = snapshot.signature[:2]
+        if content_mtime is None:
+            return
+        event_id = f"{folder}-{content_mtime}"
+        with self._cond:
+            if event_id != self._event_id:
+                self._event_id = event_id
+                self._payload = content_payload(snapshot)
+                self._cond.notify_all()
+
+    @property
+    def event_id(self) -> Optional[str]:
+        with self._cond:
+            return self._event_id
+
+    def wait(self, last_id: Optional[str], timeout: float) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Block until the event id differs from ``last_id`` or ``timeout`` passes."""
+        with self._cond:
+            if self._cond.wait_for(lambda: self._event_id not in (None, last_id), timeout):
+                return self._event_id, self._payload
+            return None
+
+
+content_watcher = ContentWatcher(snapshot_cache)
+
+
+def load_latest_data() -> Dict[str, Any]:
+    """Load the most recent ``content.json`` file if present."""
+    return snapshot_cache.get().data
+
+
+_page_lock = threading.Lock()
+
+
+def render_page(snapshot: Snapshot) -> Page:
+    """Render the index for ``snapshot`` once and reuse it until content changes."""
+    with _page_lock:
+        if snapshot.page is None:
+            body = render_template_string(
+                HTML_TEMPLATE,
+                data=snapshot.data,
+                image_name=snapshot.image_name,
+                image_digest=snapshot.image_digest,
+                image_sources=snapshot.image_sources(),
+            ).encode("utf-8")
+            snapshot.page = Page(body, hashlib.sha256(body).hexdigest())
+        return snapshot.page
+
+
+def _conditional(body: bytes, mimetype: str, modified: float | None, etag: str | None = None) -> Response:
+    """Return ``body`` with a strong ETag, answering 304 when it matches."""
+    response = make_response(body)
+    response.content_type = mimetype
+    response.set_etag(etag or hashlib.sha256(body).hexdigest())
+    if modified is not None:
+        response.last_modified = modified
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
 @app.route("/")
-def index() -> str:
-    """Render the latest text content and image."""
-    folder = _latest_data_folder()
-    data = load_latest_data()
-
-    image_name = None
-    if folder:
-        candidate = IMAGES_DIR / f"joke_{folder.name}.png"
-        if candidate.exists():
-            image_name = candidate.name
-
-    return render_template_string(
-        HTML_TEMPLATE,
-        data=data,
-        image_name=image_name,
-    )
+def index():
+    """Render the latest text content and image.
+
+    The page carries a strong ETag and ``Last-Modified`` so clients can
+    revalidate with a conditional request and get a bodiless 304 until the
+    content changes.
+    """
+    snapshot = snapshot_cache.get()
+    page = render_page(snapshot)
+    return _conditional(page.body, "text/html; charset=utf-8", snapshot.modified, page.etag)
+
+
+@app.route("/api/content")
+def api_content():
+    """Return the latest content, image URL and version as JSON."""
+    snapshot = snapshot_cache.get()
+    return _conditional(jsonify(content_payload(snapshot)).get_data(), "application/json", snapshot.modified)
+
+
+@app.route("/api/content/<date>")
+def api_content_for_date(date: str):
+    """Return the content published on ``date`` (``YYYYMMDD``) as JSON."""
+    if len(date) != 8 or not date.isdigit():
+        return jsonify(error="date must be YYYYMMDD"), 400
+    snapshot = snapshot_cache.get()
+    if snapshot.folder is None or snapshot.folder.name != date:
+        folder = snapshot_cache.data_dir / date
+        content = folder / "content.json"
+        if not content.is_file():
+            return jsonify(error=f"no content for {date}"), 404
+        image = snapshot_cache.images_dir / f"joke_{date}.png"
+        snapshot = Snapshot(
+            folder=folder,
+            data=_read_content(folder),
+            modified=content.stat().st_mtime,
+            signature=(date, _mtime(content), _mtime(image)),
+        )
+        if image.is_file():
+            _attach_image(snapshot, image)
+    return _conditional(jsonify(content_payload(snapshot)).get_data(), "application/json", snapshot.modified)
+
+
+@app.route("/api/stream")
+def api_stream():
+    """Server-sent events: one ``content`` event per published day.
+
+    Clients hold one idle connection; comments are sent every
+    ``STREAM_KEEPALIVE`` seconds to keep proxies from closing it. A client
+    reconnecting with ``Last-Event-ID`` immediately receives anything it
+    missed.
+    """
+    content_watcher.start()
+    last_id = request.headers.get("Last-Event-ID") or content_watcher.event_id
+
+    def events():
+        nonlocal last_id
+        yield "retry: 5000\n\n"
+        while True:
+            event = content_watcher.wait(last_id, STREAM_KEEPALIVE)
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            last_id, payload = event
+            yield f"id: {last_id}\nevent: content\ndata: {json.dumps(payload)}\n\n"
+
+    response = Response(events(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@app.route("/images/<digest>/<name>")
+def hashed_images(digest: str, name: str):
+    """Serve an image under a content-hashed URL with immutable caching."""
+    if snapshot_cache.image_digest(name) != digest:
+        abort(404)
+    response = send_from_directory(snapshot_cache.images_dir, name)
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.cache_control.immutable = True
+    return response
 
 
 @app.route("/images/<path:filename>")
 def images(filename: str):
-    """Serve generated images."""
-    return send_from_directory(IMAGES_DIR, filename)
+    """Serve generated images by name (revalidated with ETag/Last-Modified).
+
+    ``send_from_directory`` hands the open file to the server's
+    ``wsgi.file_wrapper``, which gunicorn sends with ``sendfile`` so image
+    bytes never pass through Python in production mode.
+    """
+    return send_from_directory(snapshot_cache.images_dir, filename)
+
+
+def production_options(host: str, port: int, workers: int, threads: int) -> Dict[str, Any]:
+    """Return the gunicorn settings used by ``--serve production``."""
+    return {
+        "bind": f"{host}:{port}",
+        "workers": max(1, workers),
+        "worker_class": "gthread",
+        "threads": max(1, threads),
+        "sendfile": True,
+        "keepalive": 5,
+        "timeout": 30,
+    }
+
+
+def run_production(host: str, port: int, workers: int, threads: int) -> None:
+    """Serve the app with gunicorn's pre-forked worker model."""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError as exc:
+        raise SystemExit("--serve production requires gunicorn: pip install gunicorn") from exc
+
+    options = production_options(host, port, workers, threads)
+
+    class HubApplication(BaseApplication):
+        def load_config(self) -> None:
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self) -> Flask:
+            return app
+
+    HubApplication().run()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the Standalone AI Hub web UI")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--serve",
+        choices=("dev", "production"),
+        default="dev",
+        help="dev: Flask's built-in server; production: gunicorn pre-forked workers",
+    )
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="worker processes (production)")
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS, help="threads per worker (production)")
+    args = parser.parse_args(argv)
+
+    if args.serve == "production":
+        run_production(args.host, args.port, args.workers, args.threads)
+    else:
+        app.run(host=args.host, port=args.port, threaded=True)
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=8000)
+    main()
 
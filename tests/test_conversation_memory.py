@@ -0,0 +1,82 @@
+import sys
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+if str(root / "modules") not in sys.path:
+    sys.path.insert(0, str(root / "modules"))
+
+import conversation_memory  # noqa: E402
+from conversation_memory import ConversationMemory, extract_reply  # noqa: E402
+
+
+def test_drops_empty_unanswered_and_repeated_exchanges(tmp_path):
+    memory = ConversationMemory(tmp_path / "memory.db")
+
+    assert not memory.record("Ping", "")
+    assert not memory.record("Ping", " [end of text] ")
+    assert memory.record("Summarise: meeting at 10", "Your meeting is at 10. [end of text]")
+    assert not memory.record("Summarise: meeting at 10", "Your meeting is at 10.")
+    assert memory.add("user", "   ") is None
+
+    assert [(t.role, t.text) for t in memory.window()] == [
+        ("user", "Summarise: meeting at 10"),
+        ("assistant", "Your meeting is at 10."),
+    ]
+    prompt = memory.build_prompt("And lunch?")
+    assert prompt.endswith("Assistant: Your meeting is at 10.\nUser: And lunch?\nAssistant:")
+
+
+def test_old_turns_roll_into_cached_summaries(tmp_path):
+    memory = ConversationMemory(tmp_path / "memory.db", window_tokens=60, summary_tokens=200)
+    for i in range(40):
+        memory.record(f"Question {i}? Some detail.", f"Answer {i}. More words here.")
+
+    window = memory.window()
+    assert window[0].role == "user"
+    assert window[-1].text == "Answer 39. More words here."
+    assert sum(t.tokens for t in window) <= 60
+
+    summaries = memory.summaries()
+    assert summaries and all(summary.startswith("User asked: Question") for summary in summaries)
+    assert "Some detail" not in " ".join(summaries)
+    assert sum(conversation_memory.estimate_tokens(s) for s in summaries) <= 200
+
+    # Only the unsummarised tail is read back, however long the history
+    open_turns = memory.conn.execute("SELECT COUNT(*) FROM turns WHERE summarized = 0").fetchone()[0]
+    assert open_turns < len(window) + conversation_memory.SUMMARY_CHUNK
+    prompt = memory.build_prompt("Next?")
+    assert "Earlier in this conversation:" in prompt
+    assert "Question 0?" not in prompt.split("Earlier in this conversation:")[1].split("\n\n")[1]
+
+
+def test_imports_legacy_context_file(tmp_path):
+    legacy = tmp_path / "mistral_context.txt"
+    legacy.write_text(
+        "\nUser: \nAssistant: \n\n\n"
+        "User: Summarise: Meeting at 10.\nAssistant: \n\n\n"
+        "User: Summarise: Meeting at 10.\nYour meeting is at 10. [end of text]\n\n"
+        "User: Using only this article:\n\nDucci sequence A Ducci sequence is...\n\n"
+        "User: Ping\nAssistant: Pong\n"
+    )
+
+    memory = conversation_memory.open_memory(tmp_path / "memory.db", legacy=legacy)
+
+    assert [(t.role, t.text) for t in memory.window()] == [
+        ("user", "Summarise: Meeting at 10."),
+        ("assistant", "Your meeting is at 10."),
+        ("user", "Ping"),
+        ("assistant", "Pong"),
+    ]
+    memory.close()
+    # Only an empty store imports
+    memory = conversation_memory.open_memory(tmp_path / "memory.db", legacy=legacy)
+    assert len(memory) == 4
+
+
+def test_extracts_reply_from_llama_output():
+    output = (
+        "The following is a helpful assistant.\n\nUser: Hi\nAssistant: Hello\n"
+        "User: How are you?\nAssistant: Very well,\nthank you. [end of text]\n\n"
+        "llama_perf_context_print:        load time =   1234.56 ms\n"
+    )
+    assert extract_reply(output) == "Very well, thank you."
@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+if str(root) not in sys.path:
+    sys.path.insert(0, str(root))
+
+from dedup_index import DedupIndex
+
+
+FLEMING = "Alexander Fleming discovered penicillin in 1928 at St Mary's Hospital in London."
+
+
+def test_rephrased_content_is_flagged(tmp_path):
+    index = DedupIndex(tmp_path / "dedup.db")
+    index.add("fact.txt", FLEMING)
+
+    match = index.find_duplicate("In 1928 Alexander Fleming discovered penicillin at London's St Mary's Hospital!")
+
+    assert match is not None
+    assert match.category == "fact.txt"
+    assert match.content == FLEMING
+    assert match.similarity >= 0.5
+
+
+def test_unrelated_content_passes(tmp_path):
+    index = DedupIndex(tmp_path / "dedup.db")
+    index.add("fact.txt", FLEMING)
+
+    assert index.find_duplicate("The Forth Bridge in Scotland opened in 1890 and was painted red.") is None
+
+
+def test_index_persists_between_runs(tmp_path):
+    index = DedupIndex(tmp_path / "dedup.db")
+    index.add_many([("fact.txt", FLEMING), ("joke.txt", "")])
+    index.close()
+
+    reopened = DedupIndex(tmp_path / "dedup.db")
+    assert len(reopened) == 1
+    assert reopened.find_duplicate(FLEMING).similarity == 1.0
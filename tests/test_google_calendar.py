@@ -0,0 +1,151 @@
+import datetime
+import json
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+root = Path(__file__).resolve().parents[1]
+if str(root) not in sys.path:
+    sys.path.insert(0, str(root))
+
+import google_calendar_fetch as gcal  # noqa: E402
+
+NOW = datetime.datetime(2025, 6, 2, 8, 0)
+
+
+def _event(event_id, summary, start, hours=1, status="confirmed"):
+    end = start + datetime.timedelta(hours=hours)
+    return {
+        "id": event_id, "status": status, "summary": summary,
+        "start": {"dateTime": start.isoformat()}, "end": {"dateTime": end.isoformat()},
+    }
+
+
+class Gone(Exception):
+    resp = types.SimpleNamespace(status=410)
+
+
+class StubService:
+    """Stands in for ``build('calendar', 'v3')``: serves scripted pages."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def events(self):
+        return self
+
+    def list(self, **params):
+        self.requests.append(params)
+        response = self.responses.pop(0)
+        return types.SimpleNamespace(execute=lambda: self._raise_or_return(response))
+
+    @staticmethod
+    def _raise_or_return(response):
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = gcal.EventStore(tmp_path / "events.db")
+    yield store
+    store.close()
+
+
+def test_full_sync_follows_pages_then_applies_deltas(store):
+    school = _event("a", "Back to school", NOW + datetime.timedelta(hours=1))
+    dentist = _event("b", "Dentist", NOW + datetime.timedelta(days=2))
+    service = StubService([
+        {"items": [school], "nextPageToken": "p2"},
+        {"items": [dentist], "nextSyncToken": "sync-1"},
+    ])
+
+    result = gcal.sync_events(service, store, now=NOW)
+
+    assert result == gcal.SyncResult(full=True, updated=2, deleted=0)
+    assert "timeMin" in service.requests[0] and "syncToken" not in service.requests[0]
+    assert service.requests[1]["pageToken"] == "p2"
+    assert [e["summary"] for e in store.upcoming(7, now=NOW)] == ["Back to school", "Dentist"]
+
+    moved = _event("b", "Dentist (moved)", NOW + datetime.timedelta(days=3))
+    service = StubService([{"items": [moved, {"id": "a", "status": "cancelled"}], "nextSyncToken": "sync-2"}])
+
+    result = gcal.sync_events(service, store, now=NOW)
+
+    assert result == gcal.SyncResult(full=False, updated=1, deleted=1)
+    assert service.requests[0]["syncToken"] == "sync-1"
+    assert "timeMin" not in service.requests[0]
+    assert [e["summary"] for e in store.upcoming(7, now=NOW)] == ["Dentist (moved)"]
+    assert store.sync_token("primary") == "sync-2"
+
+
+def test_expired_token_triggers_full_resync(store):
+    store.apply("primary", [_event("old", "Stale", NOW)], "expired", full=True)
+    fresh = _event("new", "Fresh", NOW + datetime.timedelta(hours=2))
+    service = StubService([Gone(), {"items": [fresh], "nextSyncToken": "sync-3"}])
+
+    result = gcal.sync_events(service, store, now=NOW)
+
+    assert result.full
+    assert service.requests[0]["syncToken"] == "expired"
+    assert "syncToken" not in service.requests[1]
+    assert [e["summary"] for e in store.upcoming(7, now=NOW)] == ["Fresh"]
+    assert store.sync_token("primary") == "sync-3"
+
+
+def test_failed_sync_leaves_store_unchanged(store):
+    store.apply("primary", [_event("a", "Kept", NOW + datetime.timedelta(hours=1))], "sync-1", full=True)
+    service = StubService([{"items": [{"id": "a", "status": "cancelled"}], "nextPageToken": "p2"}, RuntimeError("boom")])
+
+    with pytest.raises(RuntimeError):
+        gcal.sync_events(service, store, now=NOW)
+
+    assert [e["summary"] for e in store.upcoming(7, now=NOW)] == ["Kept"]
+    assert store.sync_token("primary") == "sync-1"
+
+
+def test_upcoming_window_includes_all_day_and_ongoing_events(store):
+    all_day = {"id": "d", "summary": "Holiday", "start": {"date": "2025-06-03"}, "end": {"date": "2025-06-04"}}
+    ongoing = _event("o", "Ongoing", NOW - datetime.timedelta(minutes=30))
+    past = _event("p", "Past", NOW - datetime.timedelta(days=1))
+    later = _event("l", "Next month", NOW + datetime.timedelta(days=30))
+    store.apply("primary", [all_day, ongoing, past, later], "t", full=True)
+
+    assert [e["summary"] for e in store.upcoming(7, now=NOW)] == ["Ongoing", "Holiday"]
+
+
+def test_upcoming_json_needs_no_network(store, tmp_path, capsys, monkeypatch):
+    start = datetime.datetime.now() + datetime.timedelta(hours=1)
+    store.apply("primary", [_event("a", "Dentist", start)], "t", full=True)
+    monkeypatch.setattr(gcal, "get_service", lambda: pytest.fail("network used"))
+
+    gcal.main(["--upcoming", "--json", "--db", str(tmp_path / "events.db")])
+
+    events = json.loads(capsys.readouterr().out)
+    assert events == [{"summary": "Dentist", "start": start.isoformat(),
+                       "end": (start + datetime.timedelta(hours=1)).isoformat(), "location": ""}]
+
+
+def test_upcoming_fails_if_never_synced(tmp_path, capsys, monkeypatch):
+    monkeypatch.setattr(gcal, "get_service", lambda: pytest.fail("network used"))
+
+    with pytest.raises(SystemExit) as exit_info:
+        gcal.main(["--upcoming", "--json", "--db", str(tmp_path / "events.db")])
+
+    assert exit_info.value.code
+    assert capsys.readouterr().out == ""
+
+
+def test_upcoming_works_after_a_sync_without_a_token(store, tmp_path, capsys, monkeypatch):
+    start = datetime.datetime.now() + datetime.timedelta(hours=1)
+    store.apply("primary", [_event("a", "Dentist", start)], None, full=True)
+    monkeypatch.setattr(gcal, "get_service", lambda: pytest.fail("network used"))
+
+    gcal.main(["--upcoming", "--json", "--db", str(tmp_path / "events.db")])
+
+    assert store.synced_at("primary") is not None
+    assert [e["summary"] for e in json.loads(capsys.readouterr().out)] == ["Dentist"]
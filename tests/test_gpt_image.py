@@ -1,6 +1,8 @@
 import importlib
+import struct
 import sys
 import types
+import zlib
 from pathlib import Path
 
 import pytest
@@ -34,35 +36,81 @@ def _setup_module(monkeypatch, tmp_path):
     module = importlib.import_module('daily_brain_boost_complete')
     monkeypatch.setattr(module, 'OUTDIR', tmp_path)
     monkeypatch.setattr(module, 'WWW_DIR', tmp_path)
+    monkeypatch.setattr(module, 'response_cache', module.ResponseCache(tmp_path / "cache", mode="off"))
     (tmp_path / "images").mkdir(exist_ok=True)
     tmp_path.mkdir(exist_ok=True)
 
     return module
 
 
+def _png_bytes(width=2, height=2):
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    pixels = zlib.compress(b"".join(b"\x00" + b"\x00" * 3 * width for _ in range(height)))
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IDAT", pixels) + chunk(b"IEND", b"")
+
+
+class DummyResponse:
+    def __init__(self, status_code=200, content=b'', chunk_size=7):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {}
+        self.chunk_size = chunk_size
+
+    def iter_content(self, chunk_size=None):
+        for i in range(0, len(self.content), self.chunk_size):
+            yield self.content[i:i + self.chunk_size]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
 def test_gpt_image_download_success(monkeypatch, tmp_path):
     module = _setup_module(monkeypatch, tmp_path)
+    png = _png_bytes()
 
-    class DummyResponse:
-        def __init__(self):
-            self.status_code = 200
-            self.content = b'data'
-
-    monkeypatch.setattr(module.requests, 'get', lambda *a, **k: DummyResponse())
+    monkeypatch.setattr(module.http_session, 'get', lambda *a, **k: DummyResponse(content=png))
 
     assert module.gpt_image('test prompt', 'test.png') is True
-    assert any(tmp_path.glob('test_*'))
+    assert any((tmp_path / 'images').glob('test_*'))
+    assert (module.get_release_dir() / 'test.png').read_bytes() == png
 
 
 def test_gpt_image_download_failure(monkeypatch, tmp_path):
     module = _setup_module(monkeypatch, tmp_path)
 
-    class DummyResponse:
-        def __init__(self):
-            self.status_code = 404
-            self.content = b''
-
-    monkeypatch.setattr(module.requests, 'get', lambda *a, **k: DummyResponse())
+    monkeypatch.setattr(module.http_session, 'get', lambda *a, **k: DummyResponse(status_code=404))
 
     assert module.gpt_image('test prompt', 'fail.png') is False
-    assert not any(tmp_path.glob('fail_*'))
+    assert not any(tmp_path.glob('**/fail*'))
+
+
+@pytest.mark.parametrize("content", [
+    b'data' * 10,                # not a PNG at all
+    _png_bytes()[:-12],          # truncated before IEND
+    _png_bytes(width=100000),    # implausible dimensions
+])
+def test_gpt_image_rejects_bad_downloads(monkeypatch, tmp_path, content):
+    module = _setup_module(monkeypatch, tmp_path)
+
+    monkeypatch.setattr(module.http_session, 'get', lambda *a, **k: DummyResponse(content=content))
+
+    assert module.gpt_image('test prompt', 'bad.png') is False
+    assert not any(tmp_path.glob('**/bad*'))
+    assert not any((tmp_path / 'images' / 'store' / 'tmp').iterdir())
+
+
+def test_download_image_enforces_size_limit(monkeypatch, tmp_path):
+    module = _setup_module(monkeypatch, tmp_path)
+    monkeypatch.setattr(module, 'MAX_IMAGE_BYTES', 64)
+    store = module.get_image_store()
+
+    monkeypatch.setattr(module.http_session, 'get', lambda *a, **k: DummyResponse(content=_png_bytes(8, 8) + b"x" * 100))
+
+    with pytest.raises(module.ImageDownloadError, match="larger than"):
+        module.download_image('http://example.com/img.png', store)
@@ -0,0 +1,86 @@
+import importlib
+import json
+import sys
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+
+def _setup_module(monkeypatch, tmp_path):
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr('openai.OpenAI', lambda *a, **k: types.SimpleNamespace())
+
+    module = importlib.import_module('daily_brain_boost_complete')
+    monkeypatch.setattr(module, 'OUTDIR', tmp_path)
+    monkeypatch.setattr(module, 'WWW_DIR', tmp_path)
+    monkeypatch.setattr(module, 'response_cache', module.ResponseCache(tmp_path / "cache", mode="off"))
+    return module
+
+
+@pytest.fixture
+def fake_ha():
+    """A local stand-in for the Home Assistant REST API."""
+    calls = []
+    status = {"code": 200}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            calls.append({
+                "path": self.path,
+                "auth": self.headers.get("Authorization"),
+                "json": json.loads(body or b"null"),
+            })
+            self.send_response(status["code"])
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b"[]")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield types.SimpleNamespace(
+        url=f"http://127.0.0.1:{server.server_port}", calls=calls, status=status
+    )
+    server.shutdown()
+    server.server_close()
+
+
+def test_refresh_updates_sensor_and_entities(monkeypatch, tmp_path, fake_ha):
+    module = _setup_module(monkeypatch, tmp_path)
+    monkeypatch.setattr(module, 'HA_URL', fake_ha.url)
+    monkeypatch.setattr(module, 'HA_TOKEN', "secret")
+    monkeypatch.setattr(module, 'HA_REFRESH_ENTITIES', ["sensor.daily_fact"])
+
+    assert module.refresh_home_assistant("1700000000") is True
+
+    state_call, update_call = fake_ha.calls
+    assert state_call["path"] == "/api/states/sensor.brain_boost_timestamp"
+    assert state_call["auth"] == "Bearer secret"
+    assert state_call["json"]["state"] == "1700000000"
+    assert update_call["path"] == "/api/services/homeassistant/update_entity"
+    assert update_call["json"] == {"entity_id": ["sensor.daily_fact"]}
+
+
+def test_restart_is_only_an_opt_in_fallback(monkeypatch, tmp_path, fake_ha):
+    module = _setup_module(monkeypatch, tmp_path)
+    monkeypatch.setattr(module, 'HA_URL', fake_ha.url)
+    monkeypatch.setattr(module, 'HA_TOKEN', "secret")
+    fake_ha.status["code"] = 401
+    restarts = []
+    monkeypatch.setattr(module, 'restart_home_assistant', lambda: restarts.append(1) or True)
+
+    assert module.invalidate_ha_cache("1700000000") is False
+    assert restarts == []
+
+    assert module.invalidate_ha_cache("1700000000", restart_fallback=True) is True
+    assert restarts == [1]
@@ -0,0 +1,48 @@
+import json
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+if str(root) not in sys.path:
+    sys.path.insert(0, str(root))
+
+from history_store import HistoryStore
+
+
+def test_recent_returns_last_n_in_order(tmp_path):
+    store = HistoryStore(tmp_path / "history.db")
+    start = datetime(2025, 1, 1)
+    for day in range(10):
+        store.add("fact.txt", f"fact {day}", date=start + timedelta(days=day))
+    store.add("joke.txt", "a joke", date=start)
+
+    assert store.recent("fact.txt", limit=3) == ["fact 7", "fact 8", "fact 9"]
+    assert store.recent("fact.txt", since=start + timedelta(days=8)) == ["fact 8", "fact 9"]
+    assert store.latest_per_category(limit=1) == {"fact.txt": ["fact 9"], "joke.txt": ["a joke"]}
+
+
+def test_compact_drops_entries_outside_retention(tmp_path):
+    store = HistoryStore(tmp_path / "history.db")
+    now = datetime(2025, 6, 30)
+    store.add("fact.txt", "old", date=now - timedelta(days=20))
+    store.add("fact.txt", "new", date=now - timedelta(days=2))
+
+    assert store.compact(14, now=now) == 1
+    assert store.recent("fact.txt") == ["new"]
+
+
+def test_import_json_migrates_legacy_file_once(tmp_path):
+    legacy = tmp_path / "brain_boost_history.json"
+    legacy.write_text(json.dumps({
+        "fact.txt": [
+            {"date": "2025-06-01T02:05:00.123456", "content": "first"},
+            {"date": "not a date", "content": "skipped"},
+        ],
+    }))
+    store = HistoryStore(tmp_path / "history.db")
+
+    assert store.import_json(legacy) == 1
+    assert not legacy.exists()
+    assert (tmp_path / "brain_boost_history.json.migrated").exists()
+    assert store.recent("fact.txt") == ["first"]
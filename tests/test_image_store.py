@@ -0,0 +1,56 @@
+import sys
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+if str(root) not in sys.path:
+    sys.path.insert(0, str(root))
+
+from image_store import ImageStore
+
+
+def test_put_dedups_identical_bytes(tmp_path):
+    store = ImageStore(tmp_path / "store")
+
+    first = store.put(b"same bytes")
+    second = store.put(b"same bytes")
+
+    assert first == second
+    assert len(list(store.blobs.glob("*/*.png"))) == 1
+
+
+def test_links_share_one_blob_and_gc_frees_unreferenced(tmp_path):
+    store = ImageStore(tmp_path / "store")
+    blob = store.put(b"image")
+    archive = store.link(blob, tmp_path / "archive" / "fact_20250101.png")
+    web = store.link(blob, tmp_path / "www" / "fact_1700000000.png")
+    orphan = store.put(b"orphan")
+
+    assert store.references(blob) == 2
+    assert archive.read_bytes() == web.read_bytes() == b"image"
+    assert archive.stat().st_ino == blob.stat().st_ino
+
+    assert store.gc() == [orphan]
+
+    web.unlink()
+    archive.unlink()
+    assert store.gc() == [blob]
+    assert not blob.exists()
+
+
+def test_gc_keeps_requested_blobs(tmp_path):
+    store = ImageStore(tmp_path / "store")
+    pending = store.put(b"stored before a crash")
+    orphan = store.put(b"orphan")
+
+    assert store.gc(keep=[pending.stem]) == [orphan]
+    assert pending.exists()
+
+
+def test_link_replaces_existing_name(tmp_path):
+    store = ImageStore(tmp_path / "store")
+    dest = tmp_path / "www" / "fact.png"
+    store.link(store.put(b"old"), dest)
+    store.link(store.put(b"new"), dest)
+
+    assert dest.read_bytes() == b"new"
+    assert len(store.gc()) == 1
@@ -0,0 +1,49 @@
+import io
+import sys
+from pathlib import Path
+
+from PIL import Image
+
+root = Path(__file__).resolve().parents[1]
+if str(root) not in sys.path:
+    sys.path.insert(0, str(root))
+
+from image_variants import available_formats, render_variants, variant_name, write_variants  # noqa: E402
+
+
+def _save_png(path, size=(1024, 1024), mode="RGBA"):
+    Image.new(mode, size, (200, 30, 30, 255) if mode == "RGBA" else (200, 30, 30)).save(path, "PNG")
+    return path
+
+
+def test_render_variants_downscales_each_format(tmp_path):
+    source = _save_png(tmp_path / "fact.png")
+
+    variants = render_variants(source, widths=(128, 512), formats=["webp", "jpeg"])
+
+    assert [(v.width, v.fmt) for v in variants] == [(128, "webp"), (128, "jpeg"), (512, "webp"), (512, "jpeg")]
+    for variant in variants:
+        with Image.open(io.BytesIO(variant.data)) as image:
+            assert image.size == (variant.width, variant.width)
+            assert image.format == {"webp": "WEBP", "jpeg": "JPEG"}[variant.fmt]
+    assert len(variants[0].data) < source.stat().st_size
+
+
+def test_widths_not_below_original_are_skipped(tmp_path):
+    source = _save_png(tmp_path / "small.png", size=(200, 100), mode="RGB")
+
+    variants = render_variants(source, widths=(128, 256), formats=["webp"])
+
+    assert [(v.width, v.fmt) for v in variants] == [(128, "webp")]
+    with Image.open(io.BytesIO(variants[0].data)) as image:
+        assert image.size == (128, 64)
+
+
+def test_write_variants_names_files_after_source(tmp_path):
+    source = _save_png(tmp_path / "joke_20240101.png")
+
+    paths = write_variants(source, widths=(256,))
+
+    assert {p.name for p in paths} == {variant_name("joke_20240101", 256, fmt) for fmt in available_formats()}
+    assert "joke_20240101_256.webp" in {p.name for p in paths}
+    assert all(p.parent == tmp_path for p in paths)
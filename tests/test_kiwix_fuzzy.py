@@ -0,0 +1,76 @@
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+root = Path(__file__).resolve().parents[1]
+if str(root) not in sys.path:
+    sys.path.insert(0, str(root))
+
+import kiwix_fuzzy  # noqa: E402
+import kiwix_index  # noqa: E402
+
+
+def _naive_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+@pytest.fixture
+def fuzzy(tmp_path):
+    (tmp_path / "science_titles.txt").write_text(
+        "A/Converse_(logic)\nA/Photosynthesis\nA/Photon\nA/Biak_language\nA/Bima_language\n"
+        "A/History_of_the_Ukraine\nA/History_of_the_UAE\n"
+    )
+    (tmp_path / "wikiquote_titles_clean.txt").write_text("A/Winston Churchill\nA/photon\n")
+    (tmp_path / "wiktionary_titles_clean.txt").write_text("A/petrichor\nA/photon\n")
+    kiwix_index.build_index(sorted(tmp_path.glob("*.txt")), tmp_path / "titles.idx")
+    titles = kiwix_index.TitleIndex(tmp_path / "titles.idx")
+    kiwix_fuzzy.build_fuzzy_index(titles, tmp_path / "titles.fuzzy")
+    with kiwix_fuzzy.FuzzyIndex(tmp_path / "titles.fuzzy", titles) as index:
+        yield index
+    titles.close()
+
+
+def test_banded_levenshtein_matches_full_distance():
+    rng = random.Random(0)
+    for _ in range(300):
+        a = "".join(rng.choice("abc ") for _ in range(rng.randint(0, 9)))
+        b = "".join(rng.choice("abc ") for _ in range(rng.randint(0, 9)))
+        limit = rng.randint(0, 4)
+        expected = _naive_distance(a, b)
+        assert kiwix_fuzzy.levenshtein(a, b, limit) == (expected if expected <= limit else limit + 1)
+
+
+def test_finds_misspelled_titles_ignoring_case_and_punctuation(fuzzy):
+    assert fuzzy.search("converse logik")[0] == kiwix_fuzzy.FuzzyMatch(
+        "Converse (logic)", ("science_titles",), 1
+    )
+    assert fuzzy.search("WINSTON CHURCHIL")[0].title == "Winston Churchill"
+    assert [m.title for m in fuzzy.search("history of the ukrane", limit=1)] == ["History of the Ukraine"]
+    biak = fuzzy.search("biak lanxguage")
+    assert biak[0].title == "Biak language"
+    assert [m.distance for m in biak] == sorted(m.distance for m in biak)
+    assert fuzzy.search("zzzzzzzz") == []
+
+
+def test_merges_case_variants_and_filters_sources(fuzzy):
+    photon = fuzzy.search("photon", limit=1)
+    assert photon[0].distance == 0
+    assert set(photon[0].sources) == {"science_titles", "wikiquote_titles_clean", "wiktionary_titles_clean"}
+    assert [m.title for m in fuzzy.search("petricor", sources=["wiktionary"])] == ["petrichor"]
+    assert fuzzy.search("petricor", sources=["wikipedia"]) == []
+
+
+def test_rejects_index_built_for_other_titles(fuzzy, tmp_path):
+    (tmp_path / "other.txt").write_text("A/Only\n")
+    kiwix_index.build_index([tmp_path / "other.txt"], tmp_path / "other.idx")
+    with kiwix_index.TitleIndex(tmp_path / "other.idx") as other:
+        with pytest.raises(ValueError):
+            kiwix_fuzzy.FuzzyIndex(fuzzy.path, other)
@@ -0,0 +1,95 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+root = Path(__file__).resolve().parents[1]
+if str(root) not in sys.path:
+    sys.path.insert(0, str(root))
+
+import kiwix_index  # noqa: E402
+from kiwix_grounding import (  # noqa: E402
+    Grounding,
+    candidate_subjects,
+    extract_author,
+    extract_headword,
+)
+
+
+@pytest.fixture
+def grounding(tmp_path):
+    (tmp_path / "wiktionary_titles_clean.txt").write_text("A/petrichor\nA/a_lot_of\n")
+    (tmp_path / "wikiquote_titles_clean.txt").write_text("A/Samuel_Johnson\nA/Winston_Churchill\n")
+    (tmp_path / "science_titles.txt").write_text(
+        "A/Alexander_Fleming\nA/Battle_of_Hastings\nA/Serendipity\nA/Great\nA/Company\nA/Great_Fire_of_London\n"
+        "A/Andre_Geim\nA/Corgi\nA/Gallimaufry\n"
+    )
+    path = tmp_path / "titles.idx"
+    kiwix_index.build_index(sorted(tmp_path.glob("*.txt")), path)
+    grounding = Grounding.open(path)
+    yield grounding
+    grounding.close()
+
+
+def test_extracts_headword_author_and_subjects():
+    assert extract_headword("Word: Petrichor - the smell of rain") == "Petrichor"
+    assert extract_headword("Word: **Collywobbles** (noun): nerves") == "Collywobbles"
+    assert extract_headword("**Word:** Ebullient - full of energy") == "Ebullient"
+    assert extract_headword("*Word*: _Halcyon_ - calm and peaceful") == "Halcyon"
+    assert extract_headword("Petrichor means the smell of rain") is None
+
+    assert extract_author('"Depend upon it, sir..." — Samuel Johnson, 1777') == "Samuel Johnson"
+    assert extract_author('"Hello" - Anne-Marie Duff (actress)') == "Anne-Marie Duff"
+    assert extract_author("A quote with nobody attached.") is None
+
+    subjects = candidate_subjects("On 14 October 1066 the Battle of Hastings was fought. The Normans won.")
+    assert subjects[0] == "Battle of Hastings"
+    assert "October" not in " ".join(subjects)
+    assert "The" not in subjects
+
+
+def test_checks_each_card_kind(grounding):
+    assert grounding.check("word.txt", "Word: Petrichor - the smell of rain").ok
+    # Missing from the Wiktionary dump, but Wikipedia has a page
+    assert grounding.check("word.txt", "Word: Serendipity - a happy accident").ok
+    word = grounding.check("word.txt", "Word: Flumbrosity - made up")
+    assert not word.ok and word.subject == "Flumbrosity"
+    assert "Flumbrosity" in word.hint and "NOT" not in word.hint
+
+    assert grounding.check("quote.txt", '"We shall fight on the beaches" — Sir Winston Churchill').ok
+    assert not grounding.check("quote.txt", '"Hmm" — Reginald Fakeperson').ok
+    missing = grounding.check("poem.txt", "Roses are red, violets are blue")
+    assert not missing.ok and missing.subject is None
+
+    assert grounding.check("fact.txt", "Alexander Fleming discovered penicillin in 1928.").ok
+    assert not grounding.check("history.txt", "Zorblax Quentin founded Glimmerton in 1204.").ok
+    assert grounding.check("fact.txt", "water expands when it freezes.").ok
+    assert grounding.check("riddle.txt", "Riddle: what has keys? Answer: a piano").ok
+
+
+def test_fact_subjects_ignore_sentence_initial_and_lone_words(grounding):
+    assert candidate_subjects("Octopuses have three hearts and blue blood.") == []
+    assert candidate_subjects("Bananas are berries, but strawberries are not. Honey never spoils.") == []
+    subjects = candidate_subjects("The Great Fire of London started in a bakery on Pudding Lane in 1666.")
+    assert subjects[0] == "Great Fire of London"
+    assert "Great" not in subjects and "London" not in subjects
+    assert "Pudding Lane" in subjects
+
+    assert grounding.check("fact.txt", "Octopuses have three hearts and blue blood.").ok
+    assert grounding.check("fact.txt", "Bananas are berries, but strawberries are not.").ok
+    assert grounding.check("history.txt", "In 1666 the Great Fire of London destroyed 13,200 houses.").ok
+    # Real single words inside an invented name don't vouch for it
+    assert not grounding.check("history.txt", "The Great Zorblax Company sold tea to Glimmerton in 1702.").ok
+    assert candidate_subjects("Its tea was sold by the Company and praised as Great by all.") == []
+
+
+def test_names_joined_by_and_and_plural_forms_resolve(grounding):
+    fact = "Andre Geim and Konstantin Novoselov isolated graphene at Manchester in 2004."
+    assert {"Andre Geim", "Konstantin Novoselov"} <= set(candidate_subjects(fact))
+    assert grounding.check("fact.txt", fact).ok
+    assert grounding.check("fact.txt", "In 1944 the young princess was given one of her many Corgis.").ok
+    assert grounding.check("word.txt", "Word: Gallimaufries - jumbles or medleys").ok
+
+
+def test_missing_index_disables_grounding(tmp_path):
+    assert Grounding.open(tmp_path / "missing.idx") is None
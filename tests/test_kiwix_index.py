@@ -0,0 +1,64 @@
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+root = Path(__file__).resolve().parents[1]
+if str(root) not in sys.path:
+    sys.path.insert(0, str(root))
+
+import kiwix_index  # noqa: E402
+
+
+@pytest.fixture
+def index(tmp_path):
+    (tmp_path / "science_titles.txt").write_text(
+        "-/favicon\n-/content.parsoid.css\nA/Converse_(logic)\nA/Photosynthesis\nA/photosynthesis\nA/Photon\n"
+    )
+    (tmp_path / "wikiquote_titles_clean.txt").write_text("-/favicon\nA/Albert Einstein\nA/Photon\n\n")
+    (tmp_path / "wiktionary_titles_clean.txt").write_text("A/serendipity\nA/photon\nA/a_lot_of\n")
+    path = tmp_path / "titles.idx"
+
+    count = kiwix_index.build_index(sorted(tmp_path.glob("*.txt")), path)
+
+    assert count == 8
+    with kiwix_index.TitleIndex(path) as index:
+        yield index
+
+
+def test_filters_normalises_and_dedups(index):
+    titles = [index.title(i) for i in range(len(index))]
+
+    assert titles == sorted(titles, key=lambda t: (t.casefold(), t))
+    assert "a lot of" in titles
+    assert not any(t.startswith("-/") or "_" in t for t in titles)
+    assert index.exact("Photon") == [
+        kiwix_index.Entry("Photon", ("science_titles", "wikiquote_titles_clean")),
+    ] + [kiwix_index.Entry("photon", ("wiktionary_titles_clean",))]
+
+
+def test_exact_lookup_ignores_case_and_underscores(index):
+    assert [e.title for e in index.exact("converse_(LOGIC)")] == ["Converse (logic)"]
+    assert "albert einstein" in index
+    assert "Albert Einstien" not in index
+    assert [e.title for e in index.exact("photon", sources=["wiktionary"])] == ["photon"]
+    assert index.exact("Albert Einstein")[0].corpora == {"wikiquote"}
+
+
+def test_prefix_and_sample(index):
+    assert [e.title for e in index.prefix("pho")] == ["Photon", "photon", "Photosynthesis", "photosynthesis"]
+    assert [e.title for e in index.prefix("pho", limit=1, sources=["wiktionary"])] == ["photon"]
+    assert index.prefix("zzz") == []
+
+    picked = index.sample(3, sources=["wiktionary"], rng=random.Random(1))
+    assert len(picked) == 3
+    assert all("wiktionary" in e.corpora for e in picked)
+
+
+def test_rejects_other_files(tmp_path):
+    bogus = tmp_path / "bogus.idx"
+    bogus.write_bytes(b"not an index" * 4)
+
+    with pytest.raises(ValueError):
+        kiwix_index.TitleIndex(bogus)
@@ -0,0 +1,168 @@
+import json
+import socket
+import sys
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+root = Path(__file__).resolve().parents[1]
+if str(root / "llm") not in sys.path:
+    sys.path.insert(0, str(root / "llm"))
+
+import llm_server  # noqa: E402
+
+# Stands in for llama-server: /health, /completion with a one-slot prompt
+# cache, and a log of starts and of how many completions ran at once.
+STUB = '''
+import json, os, sys, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+port, log = int(sys.argv[1]), sys.argv[2]
+state = {"previous": "", "running": 0}
+lock = threading.Lock()
+with open(log, "a") as f:
+    f.write(f"start {os.getpid()}\\n")
+
+class Handler(BaseHTTPRequestHandler):
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._send(200, {"status": "ok"})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with lock:
+            state["running"] += 1
+            with open(log, "a") as f:
+                f.write(f"running {state['running']}\\n")
+        time.sleep(0.05)
+        cached = 0
+        if body.get("cache_prompt"):
+            for a, b in zip(state["previous"], body["prompt"]):
+                if a != b:
+                    break
+                cached += 1
+        with lock:
+            state["previous"] = body["prompt"]
+            state["running"] -= 1
+        last = body["prompt"].splitlines()[-1]
+        self._send(200, {"content": f" reply to {last} ", "tokens_cached": cached})
+
+    def log_message(self, *args):
+        pass
+
+time.sleep(0.3)  # "Loading the model"
+ThreadingHTTPServer(("127.0.0.1", port), Handler).serve_forever()
+'''
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def service(tmp_path):
+    stub = tmp_path / "stub_server.py"
+    stub.write_text(STUB)
+    log = tmp_path / "stub.log"
+    config = llm_server.BackendConfig(
+        "mistral", tmp_path / "model.gguf", argv=[sys.executable, str(stub), "{port}", str(log)]
+    )
+    service = llm_server.LLMService({"mistral": config}, port_base=_free_port())
+    server = service.make_server(port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    service.url = f"http://127.0.0.1:{server.server_address[1]}"
+    service.log = log
+    yield service
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+def _log(service, kind):
+    return [line.split()[1] for line in service.log.read_text().splitlines() if line.startswith(kind)]
+
+
+def test_one_process_serves_every_prompt_and_reuses_the_prefix(service):
+    system = "You are a helpful assistant on a Raspberry Pi."
+
+    first = llm_server.ask("User: hello", system=system, url=service.url)
+    second = llm_server._post_json(
+        f"{service.url}/v1/complete", {"prompt": "User: and again", "system": system}, 10
+    )
+
+    assert first == "reply to User: hello"
+    assert second["content"] == "reply to User: and again"
+    assert second["backend"] == "mistral"
+    assert second["tokens_cached"] >= len(system)
+    assert len(_log(service, "start")) == 1
+    health = json.loads(urllib.request.urlopen(f"{service.url}/health").read())
+    assert health == {"backends": {"mistral": {"loaded": True, "queued": 0}}}
+
+
+def test_concurrent_prompts_are_queued_one_at_a_time(service):
+    with ThreadPoolExecutor(4) as pool:
+        replies = list(pool.map(lambda i: llm_server.ask(f"prompt {i}", url=service.url), range(4)))
+
+    assert replies == [f"reply to prompt {i}" for i in range(4)]
+    assert set(_log(service, "running")) == {"1"}
+
+
+def test_timed_out_prompts_are_dropped_from_the_queue(service):
+    llm_server.ask("warm up", url=service.url)
+    service.request_timeout = 0.02
+
+    def ask(i):
+        with pytest.raises(urllib.error.HTTPError) as error:
+            llm_server.ask(f"prompt {i}", url=service.url)
+        return error.value.code
+
+    with ThreadPoolExecutor(3) as pool:
+        assert list(pool.map(ask, range(3))) == [503, 503, 503]
+    service.request_timeout = 10
+    assert llm_server.ask("after", url=service.url) == "reply to after"
+
+    # The one already running finished; the queued ones never reached the model
+    assert len(_log(service, "running")) == 3
+
+
+def test_dead_backend_is_restarted(service):
+    llm_server.ask("warm up", url=service.url)
+    service.backends["mistral"].process.kill()
+    service.backends["mistral"].process.wait()
+
+    assert llm_server.ask("after crash", url=service.url) == "reply to after crash"
+    assert len(_log(service, "start")) == 2
+
+
+def test_rejects_bad_requests(service):
+    for body, status in (({"prompt": "hi", "backend": "gpt"}, 404), ({"prompt": " "}, 400)):
+        with pytest.raises(urllib.error.HTTPError) as error:
+            llm_server._post_json(f"{service.url}/v1/complete", body, 10)
+        assert error.value.code == status
+
+
+def test_ask_exits_non_zero_when_service_is_down(capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        llm_server.main(["ask", "--url", f"http://127.0.0.1:{_free_port()}", "hello"])
+    assert exit_info.value.code == 2
+    assert "unavailable" in capsys.readouterr().err
+
+
+def test_ask_error_from_running_service_is_not_a_fallback(service, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        llm_server.main(["ask", "--url", service.url, "   "])
+    assert exit_info.value.code == llm_server.EXIT_FAILED != llm_server.EXIT_UNREACHABLE
+    assert "error 400" in capsys.readouterr().err
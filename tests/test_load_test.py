@@ -0,0 +1,55 @@
+import json
+import sys
+import threading
+from pathlib import Path
+
+from werkzeug.serving import make_server
+
+hub = Path(__file__).resolve().parents[1] / "standalone_ai_hub"
+if str(hub) not in sys.path:
+    sys.path.insert(0, str(hub))
+
+import load_test  # noqa: E402
+import web_app  # noqa: E402
+
+
+def test_percentile_uses_nearest_rank():
+    result = load_test.RouteResult("/", latencies=[i / 1000 for i in range(1, 101)])
+
+    assert result.percentile(50) == 50
+    assert result.percentile(99) == 99
+    assert load_test.RouteResult("/").percentile(99) == 0
+
+
+def test_load_test_reports_both_routes(monkeypatch, tmp_path):
+    data_dir = tmp_path / "data"
+    (data_dir / "20240101").mkdir(parents=True)
+    (data_dir / "20240101" / "content.json").write_text(json.dumps({"fact": "one"}))
+    (data_dir / "images").mkdir()
+    (data_dir / "images" / "joke_20240101.png").write_bytes(b"png")
+    monkeypatch.setattr(web_app, "snapshot_cache", web_app.SnapshotCache(data_dir, data_dir / "images"))
+
+    server = make_server("127.0.0.1", 0, web_app.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        image = load_test.discover_image("127.0.0.1", server.port)
+        assert image and image.endswith("/joke_20240101.png")
+        results = [load_test.run_route("127.0.0.1", server.port, path, 4, 40) for path in ("/", image)]
+    finally:
+        server.shutdown()
+
+    for result in results:
+        assert result.requests == 40
+        assert result.errors == 0
+        assert result.rps > 0
+    assert "p99 ms" in load_test.format_results(results)
+
+
+def test_production_options():
+    options = web_app.production_options("0.0.0.0", 8000, 4, 8)
+
+    assert options["bind"] == "0.0.0.0:8000"
+    assert options["workers"] == 4
+    assert options["worker_class"] == "gthread"
+    assert options["sendfile"] is True
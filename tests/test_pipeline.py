@@ -0,0 +1,332 @@
+import importlib
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+import pytest
+
+
+def _setup_module(monkeypatch, tmp_path):
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr('openai.OpenAI', lambda *a, **k: types.SimpleNamespace())
+
+    module = importlib.import_module('daily_brain_boost_complete')
+    monkeypatch.setattr(module, 'OUTDIR', tmp_path)
+    monkeypatch.setattr(module, 'WWW_DIR', tmp_path)
+    monkeypatch.setattr(module, 'response_cache', module.ResponseCache(tmp_path / "cache", mode="off"))
+    (tmp_path / "images").mkdir(exist_ok=True)
+    return module
+
+
+def test_run_pipeline_generates_every_card(monkeypatch, tmp_path):
+    module = _setup_module(monkeypatch, tmp_path)
+    images = []
+
+    monkeypatch.setattr(module, 'gpt_text', lambda prompt, max_tokens=80: f"Word: text for {prompt}")
+    monkeypatch.setattr(module, 'fetch_joke', lambda: "a joke")
+    monkeypatch.setattr(module, 'choose_artists', lambda items: {name: "Klimt" for name in items})
+    monkeypatch.setattr(
+        module, 'gpt_image',
+        lambda prompt, filename, artist=None, manifest=None: images.append((filename, artist)) or True
+    )
+
+    content = module.run_pipeline({"fact.txt": "fact prompt", "word.txt": "word prompt"})
+
+    assert content == {
+        "fact.txt": "Word: text for fact prompt",
+        "word.txt": "Word: text for word prompt",
+        "joke.txt": "a joke",
+    }
+    assert sorted(images) == [("fact.png", "Klimt"), ("joke.png", "Klimt"), ("word.png", "Klimt")]
+    assert (module.get_release_dir() / "fact.txt").read_text() == "Word: text for fact prompt\n"
+
+
+def test_run_pipeline_caps_requests_in_flight(monkeypatch, tmp_path):
+    module = _setup_module(monkeypatch, tmp_path)
+    monkeypatch.setattr(module, 'request_slots', threading.BoundedSemaphore(2))
+    monkeypatch.setattr(module, 'ENABLE_IMAGES', False)
+
+    lock = threading.Lock()
+    in_flight = []
+    peak = []
+
+    def slow_text(prompt, max_tokens=80):
+        with module.request_slots:
+            with lock:
+                in_flight.append(prompt)
+                peak.append(len(in_flight))
+            time.sleep(0.05)
+            with lock:
+                in_flight.remove(prompt)
+        return prompt
+
+    monkeypatch.setattr(module, 'gpt_text', slow_text)
+    monkeypatch.setattr(module, 'fetch_joke', lambda: "a joke")
+
+    prompts = {f"card{i}.txt": f"prompt {i}" for i in range(6)}
+    content = module.run_pipeline(prompts)
+
+    assert len(content) == 7
+    assert max(peak) == 2
+
+
+def _chat_client(content, calls):
+    class DummyChatCompletions:
+        def create(self, *args, **kwargs):
+            calls.append(kwargs)
+            return types.SimpleNamespace(
+                choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=content))]
+            )
+
+    return types.SimpleNamespace(chat=types.SimpleNamespace(completions=DummyChatCompletions()))
+
+
+def test_choose_artists_uses_one_call_and_validates(monkeypatch, tmp_path):
+    module = _setup_module(monkeypatch, tmp_path)
+    calls = []
+    reply = '{"fact.png": "Hokusai", "joke.png": "' + "x" * 60 + '"}'
+    monkeypatch.setattr(module, 'openai_client', _chat_client(reply, calls))
+
+    artists = module.choose_artists({"fact.png": "a fact", "joke.png": "a joke", "quote.png": "a quote"})
+
+    assert len(calls) == 1
+    assert artists["fact.png"] == "Hokusai"
+    assert artists["joke.png"] in module.ARTISTS_FALLBACK
+    assert artists["quote.png"] in module.ARTISTS_FALLBACK
+
+
+def test_choose_artists_falls_back_on_bad_json(monkeypatch, tmp_path):
+    module = _setup_module(monkeypatch, tmp_path)
+    monkeypatch.setattr(module, 'openai_client', _chat_client("Monet", []))
+
+    artists = module.choose_artists({"fact.png": "a fact"})
+
+    assert artists["fact.png"] in module.ARTISTS_FALLBACK
+
+
+def test_near_duplicate_text_is_regenerated(monkeypatch, tmp_path):
+    module = _setup_module(monkeypatch, tmp_path)
+    monkeypatch.setattr(module, 'ENABLE_IMAGES', False)
+    dedup = module.DedupIndex(tmp_path / "dedup.db")
+    dedup.add("fact.txt", "Alexander Fleming discovered penicillin in 1928 in London.")
+    replies = iter([
+        "In 1928, Alexander Fleming discovered penicillin in London.",
+        "The first British postage stamp, the Penny Black, was issued in 1840.",
+    ])
+    prompts = []
+
+    def fake_text(prompt, max_tokens=80):
+        prompts.append(prompt)
+        return next(replies)
+
+    monkeypatch.setattr(module, 'gpt_text', fake_text)
+
+    content = module.generate_text_card("fact.txt", "fact prompt", dedup)
+
+    assert content.startswith("The first British postage stamp")
+    assert len(prompts) == 2
+    assert "Do NOT repeat" in prompts[1]
+
+
+def test_resumed_run_only_redoes_unfinished_work(monkeypatch, tmp_path):
+    module = _setup_module(monkeypatch, tmp_path)
+    manifest = module.RunManifest(tmp_path / "runs" / "20250101.json", "1700000000", "20250101")
+    store = module.get_image_store()
+    blob = store.put(b"fact image")
+    manifest.record("fact", "text", content="stored fact")
+    manifest.record("fact", "artist", artist="Hokusai")
+    manifest.record("fact", "image", sha256=blob.stem)
+    manifest.record("joke", "text", content="stored joke")
+    manifest = module.RunManifest.load(manifest.path)
+
+    texts = []
+    images = []
+    monkeypatch.setattr(module, 'TIMESTAMP', manifest.timestamp)
+    monkeypatch.setattr(module, 'gpt_text', lambda prompt, max_tokens=80: texts.append(prompt) or "new quote")
+    monkeypatch.setattr(module, 'fetch_joke', lambda: pytest.fail("joke refetched"))
+    monkeypatch.setattr(module, 'choose_artists', lambda items: {name: "Klimt" for name in items})
+    monkeypatch.setattr(module, 'openai_client', types.SimpleNamespace(images=types.SimpleNamespace(
+        generate=lambda **k: images.append(k["prompt"]) or pytest.fail("image regenerated")
+    )))
+    real_gpt_image = module.gpt_image
+    monkeypatch.setattr(module, 'gpt_image', lambda prompt, filename, artist=None, manifest=None: (
+        real_gpt_image(prompt, filename, artist, manifest)
+        if filename == "fact.png" else images.append(filename) or True
+    ))
+
+    content = module.run_pipeline({"fact.txt": "fact prompt", "quote.txt": "quote prompt"}, manifest=manifest)
+
+    assert content == {"fact.txt": "stored fact", "quote.txt": "new quote", "joke.txt": "stored joke"}
+    assert texts == ["quote prompt"]
+    assert sorted(images) == ["joke.png", "quote.png"]
+    assert manifest.stage("fact") == "linked"
+    assert (tmp_path / "releases" / "1700000000" / "fact.png").read_bytes() == b"fact image"
+    assert manifest.get("quote", "artist") == "Klimt"
+
+
+def test_ungrounded_text_is_regenerated_before_images(monkeypatch, tmp_path):
+    module = _setup_module(monkeypatch, tmp_path)
+    for name, titles in {
+        "wiktionary_titles_clean.txt": "A/petrichor\n",
+        "wikiquote_titles_clean.txt": "A/Samuel_Johnson\n",
+    }.items():
+        (tmp_path / name).write_text(titles)
+    module_index = importlib.import_module('kiwix_index')
+    module_index.build_index(sorted(tmp_path.glob("*_titles_clean.txt")), tmp_path / "titles.idx")
+    monkeypatch.setattr(module, 'KIWIX_INDEX', tmp_path / "titles.idx")
+    grounding = module.load_grounding()
+
+    replies = {
+        "word": iter(["Word: Flumbrosity - made up", "Word: Petrichor - the smell of rain"]),
+        "quote": iter(['"Hmm" — Reginald Fakeperson', '"Hmm" — Reginald Fakeperson',
+                       '"Hmm" — Reginald Fakeperson', '"Hmm" — Reginald Fakeperson']),
+    }
+    prompts = []
+
+    def fake_text(prompt, max_tokens=80, fresh=False):
+        prompts.append(prompt)
+        return next(replies[prompt.split()[0]])
+
+    images = []
+    monkeypatch.setattr(module, 'gpt_text', fake_text)
+    monkeypatch.setattr(module, 'fetch_joke', lambda: "a joke")
+    monkeypatch.setattr(module, 'choose_artists', lambda items: {name: "Klimt" for name in items})
+    monkeypatch.setattr(
+        module, 'gpt_image',
+        lambda prompt, filename, artist=None, manifest=None: images.append((filename, prompt)) or True
+    )
+
+    content = module.run_pipeline(
+        {"word.txt": "word prompt", "quote.txt": "quote prompt"}, grounding=grounding
+    )
+    grounding.close()
+
+    assert content["word.txt"] == "Word: Petrichor - the smell of rain"
+    assert ("word.png", "Petrichor") in images
+    assert not any("Flumbrosity" in prompt for _, prompt in images)
+    # Unverifiable quotes are retried GROUNDING_RETRY_LIMIT times, then kept
+    assert [p for p in prompts if p.startswith("quote")][1].count("Reginald Fakeperson") == 1
+    assert len([p for p in prompts if p.startswith("quote")]) == module.GROUNDING_RETRY_LIMIT + 1
+    assert content["quote.txt"] == '"Hmm" — Reginald Fakeperson'
+
+
+def test_word_retry_bypasses_the_response_cache(monkeypatch, tmp_path):
+    module = _setup_module(monkeypatch, tmp_path)
+    monkeypatch.setattr(module, 'response_cache', module.ResponseCache(tmp_path / "cache", mode="on"))
+    replies = iter(["Word: Ebullient - cheerful", "Word: Petrichor - the smell of rain"])
+    calls = []
+
+    class ChatCompletions:
+        def create(self, **kwargs):
+            calls.append(kwargs)
+            return types.SimpleNamespace(
+                choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=next(replies)))]
+            )
+
+    monkeypatch.setattr(module, 'openai_client', types.SimpleNamespace(
+        chat=types.SimpleNamespace(completions=ChatCompletions())
+    ))
+    images = []
+    monkeypatch.setattr(
+        module, 'gpt_image',
+        lambda prompt, filename, artist=None, manifest=None: images.append(prompt) or prompt == "Petrichor"
+    )
+
+    first = module.gpt_text("word prompt", max_tokens=40)
+    text = module.generate_word_with_retry("word prompt", first, "Klimt")
+
+    assert text == "Word: Petrichor - the smell of rain"
+    assert images == ["Ebullient", "Petrichor"]
+    assert len(calls) == 2
+    # The retried word replaces the failed one in the cache
+    assert module.gpt_text("word prompt", max_tokens=40) == text
+
+
+def test_ungrounded_word_retry_does_not_use_an_image_attempt(monkeypatch, tmp_path):
+    module = _setup_module(monkeypatch, tmp_path)
+    (tmp_path / "wiktionary_titles_clean.txt").write_text("A/petrichor\n")
+    (tmp_path / "wikipedia_en_titles_clean.txt").write_text("A/Serendipity\n")
+    module_index = importlib.import_module('kiwix_index')
+    module_index.build_index(sorted(tmp_path.glob("*_titles_clean.txt")), tmp_path / "titles.idx")
+    monkeypatch.setattr(module, 'KIWIX_INDEX', tmp_path / "titles.idx")
+    grounding = module.load_grounding()
+
+    replies = iter(["Word: Flumbrosity - made up", "Word: Serendipity - a happy accident"])
+    prompts = []
+    images = []
+    monkeypatch.setattr(module, 'WORD_RETRY_LIMIT', 1)
+    monkeypatch.setattr(
+        module, 'gpt_text',
+        lambda prompt, max_tokens=80, fresh=False: prompts.append(prompt) or next(replies)
+    )
+    monkeypatch.setattr(
+        module, 'gpt_image',
+        lambda prompt, filename, artist=None, manifest=None: images.append(prompt) or prompt != "Petrichor"
+    )
+
+    text = module.generate_word_with_retry("word prompt", "Word: Petrichor - rain", "Klimt", grounding=grounding)
+    grounding.close()
+
+    assert text == "Word: Serendipity - a happy accident"
+    assert images == ["Petrichor", "Serendipity"]
+    assert "Flumbrosity" in prompts[1]
+
+
+def test_resume_after_crash_does_not_save_history_twice(monkeypatch, tmp_path):
+    module = _setup_module(monkeypatch, tmp_path)
+    monkeypatch.setattr(module, 'HISTORY_DB', tmp_path / "history.db")
+    monkeypatch.setattr(module, 'HISTORY_FILE', tmp_path / "history.json")
+    monkeypatch.setattr(module, 'get_prompts', lambda history: {"fact.txt": "fact prompt"})
+    monkeypatch.setattr(module, 'load_grounding', lambda: None)
+    monkeypatch.setattr(module, 'invalidate_ha_cache', lambda *a, **k: None)
+    monkeypatch.setattr(
+        module, 'run_pipeline',
+        lambda prompts, dedup, manifest, grounding: {"fact.txt": "a fact", "joke.txt": "a joke"}
+    )
+
+    def crash(card_files):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(module, 'publish_release', crash)
+    with pytest.raises(OSError):
+        module.main([])
+    monkeypatch.setattr(module, 'publish_release', lambda card_files: None)
+    module.main(["--resume"])
+
+    history = module.HistoryStore(module.HISTORY_DB)
+    dedup = module.DedupIndex(module.HISTORY_DB)
+    assert sorted(c for c, _, _ in history.entries()) == ["fact.txt", "joke.txt"]
+    assert len(dedup) == 2
+    history.close()
+    dedup.close()
+    manifest = module.RunManifest.load(tmp_path / "runs" / f"{module.TODAY_STR}.json")
+    assert manifest.finished and manifest.done("history")
+
+
+def test_each_image_starts_as_soon_as_its_text_is_ready(monkeypatch, tmp_path):
+    module = _setup_module(monkeypatch, tmp_path)
+    fact_image = threading.Event()
+
+    def fake_text(prompt, max_tokens=80, fresh=False):
+        if prompt == "quote prompt":
+            # The slow card: only finishes once another card's image is under way
+            assert fact_image.wait(5), "images waited for every text"
+        return f"text for {prompt}"
+
+    monkeypatch.setattr(module, 'gpt_text', fake_text)
+    monkeypatch.setattr(module, 'fetch_joke', lambda: "a joke")
+    monkeypatch.setattr(module, 'choose_artists', lambda items: {name: "Klimt" for name in items})
+    monkeypatch.setattr(
+        module, 'gpt_image',
+        lambda prompt, filename, artist=None, manifest=None: filename != "fact.png" or fact_image.set() or True
+    )
+
+    content = module.run_pipeline({"fact.txt": "fact prompt", "quote.txt": "quote prompt"})
+
+    assert content["quote.txt"] == "text for quote prompt"
+    assert fact_image.is_set()
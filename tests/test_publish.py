@@ -0,0 +1,161 @@
+import importlib
+import io
+import sys
+import types
+from pathlib import Path
+
+
+def _setup_module(monkeypatch, tmp_path):
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr('openai.OpenAI', lambda *a, **k: types.SimpleNamespace())
+
+    module = importlib.import_module('daily_brain_boost_complete')
+    monkeypatch.setattr(module, 'OUTDIR', tmp_path / "ai")
+    monkeypatch.setattr(module, 'WWW_DIR', tmp_path / "www")
+    (tmp_path / "ai" / "images").mkdir(parents=True)
+    (tmp_path / "www").mkdir()
+    return module
+
+
+def _build(module, monkeypatch, timestamp, texts, images=()):
+    monkeypatch.setattr(module, 'TIMESTAMP', timestamp)
+    store = module.get_image_store()
+    for filename, content in texts.items():
+        module.write_card_text(filename, content)
+    for filename in images:
+        module.publish_image(store, store.put(f"{filename} {timestamp}".encode()), filename)
+
+
+def test_first_release_replaces_loose_files(monkeypatch, tmp_path):
+    module = _setup_module(monkeypatch, tmp_path)
+    (tmp_path / "ai" / "joke.txt").write_text("old joke\n")
+    _build(module, monkeypatch, "1700000000", {"fact.txt": "new fact"}, ["fact.png"])
+
+    module.publish_release(["fact.txt", "joke.txt"])
+
+    outdir, www = tmp_path / "ai", tmp_path / "www"
+    assert (outdir / "fact.txt").is_symlink()
+    assert (outdir / "fact.txt").read_text() == "new fact\n"
+    assert (outdir / "joke.txt").read_text() == "old joke\n"  # Carried over
+    assert (www / "fact.png").read_bytes() == b"fact.png 1700000000"
+    assert (www / "current_timestamp.txt").read_text() == "1700000000"
+
+
+def test_new_release_switches_every_card_at_once(monkeypatch, tmp_path):
+    module = _setup_module(monkeypatch, tmp_path)
+    _build(module, monkeypatch, "1700000000", {"fact.txt": "day one", "joke.txt": "joke one"}, ["fact.png"])
+    module.publish_release(["fact.txt", "joke.txt"])
+
+    # Day two is built but not yet visible; its joke failed
+    _build(module, monkeypatch, "1700086400", {"fact.txt": "day two"}, ["fact.png"])
+    outdir, www = tmp_path / "ai", tmp_path / "www"
+    assert (outdir / "fact.txt").read_text() == "day one\n"
+
+    module.publish_release(["fact.txt", "joke.txt"])
+
+    assert (outdir / "fact.txt").read_text() == "day two\n"
+    assert (outdir / "joke.txt").read_text() == "joke one\n"
+    assert (www / "fact.png").read_bytes() == b"fact.png 1700086400"
+    assert (www / "current").resolve() == (www / "releases" / "1700086400").resolve()
+    assert (www / "current_timestamp.txt").read_text() == "1700086400"
+
+
+def test_dashboard_variant_is_rendered_for_carried_over_images(monkeypatch, tmp_path):
+    module = _setup_module(monkeypatch, tmp_path)
+    www = tmp_path / "www"
+    (www / "joke.png").write_bytes(_png("blue"))
+    # Not a decodable image, so no variants can be rendered
+    _build(module, monkeypatch, "1700000000", {"fact.txt": "fact"}, ["fact.png"])
+
+    module.publish_release(["fact.txt", "joke.txt"])
+
+    assert (www / "joke_128.jpg").read_bytes()[:2] == b"\xff\xd8"
+    assert not (www / "fact_128.jpg").exists()
+
+
+def test_upgrade_keeps_legacy_images_until_the_first_release(monkeypatch, tmp_path):
+    module = _setup_module(monkeypatch, tmp_path)
+    www = tmp_path / "www"
+    (www / "fact_1600000000.png").write_bytes(b"legacy fact")
+    (www / "fact.png").symlink_to("fact_1600000000.png")
+    (www / "joke_1500000000.png").write_bytes(b"unused")
+
+    module.cleanup_old_images()
+    assert (www / "fact.png").read_bytes() == b"legacy fact"
+    assert not (www / "joke_1500000000.png").exists()
+
+    # The fact image fails on the first release run: the legacy one is carried over
+    _build(module, monkeypatch, "1700000000", {"fact.txt": "new fact"})
+    module.publish_release(["fact.txt"])
+    assert (www / "releases" / "1700000000" / "fact.png").read_bytes() == b"legacy fact"
+
+    module.cleanup_old_images()
+    assert not (www / "fact_1600000000.png").exists()
+    assert (www / "fact.png").read_bytes() == b"legacy fact"
+
+
+def test_cleanup_keeps_images_of_the_run_being_resumed(monkeypatch, tmp_path):
+    module = _setup_module(monkeypatch, tmp_path)
+    store = module.get_image_store()
+    # Crashed after the image was stored and recorded, before it was linked
+    blob = store.put(b"paid for")
+    manifest = module.RunManifest(tmp_path / "ai" / "runs" / "20250101.json", "1700000000", "20250101")
+    manifest.record("fact", "image", sha256=blob.stem)
+    orphan = store.put(b"orphan")
+
+    module.cleanup_old_images(manifest)
+
+    assert blob.exists()
+    assert not orphan.exists()
+
+
+def test_cleanup_keeps_live_and_recent_releases(monkeypatch, tmp_path):
+    module = _setup_module(monkeypatch, tmp_path)
+    monkeypatch.setattr(module, 'RELEASES_TO_KEEP', 1)
+    _build(module, monkeypatch, "1700000000", {"fact.txt": "one"}, ["fact.png"])
+    module.publish_release(["fact.txt"])
+    _build(module, monkeypatch, "1700086400", {"fact.txt": "two"}, ["fact.png"])
+    module.publish_release(["fact.txt"])
+    (tmp_path / "ai" / "images" / "fact_{}.png".format(module.TODAY_STR)).unlink()
+
+    module.cleanup_old_images()
+
+    releases = tmp_path / "www" / "releases"
+    assert [d.name for d in releases.iterdir()] == ["1700086400"]
+    assert len(list(module.get_image_store().blobs.glob("*/*.png"))) == 1
+
+
+def _png(color, size=1024):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (size, size), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_image_variants_are_published_and_carried_over(monkeypatch, tmp_path):
+    module = _setup_module(monkeypatch, tmp_path)
+    monkeypatch.setattr(module, 'TIMESTAMP', "1700000000")
+    store = module.get_image_store()
+    module.publish_image(store, store.put(_png("red")), "fact.png")
+    module.publish_release(["fact.txt"])
+
+    www = tmp_path / "www"
+    small = www / "fact_128.webp"
+    assert small.is_symlink()
+    assert small.read_bytes()[8:12] == b"WEBP"
+    assert (www / "fact_512.jpg").read_bytes()[:2] == b"\xff\xd8"
+    assert (tmp_path / "ai" / "images" / f"fact_{module.TODAY_STR}_256.webp").exists()
+    first = small.read_bytes()
+
+    # Next day's fact image fails: the old image keeps its own variants
+    monkeypatch.setattr(module, 'TIMESTAMP', "1700086400")
+    module.publish_release(["fact.txt"])
+    assert (www / "releases" / "1700086400" / "fact_128.webp").exists()
+    assert small.read_bytes() == first
+
+    module.cleanup_old_images()
+    assert list(module.get_image_store(".webp").blobs.glob("*/*.webp"))
@@ -0,0 +1,235 @@
+import json
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+root = Path(__file__).resolve().parents[1]
+for path in (root, root / "recipes"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import recipe_finder  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+
+REPLY = json.dumps([{
+    "title": "Chicken Rice", "ingredients": ["chicken", "rice"], "instructions": ["cook"],
+    "cooking_time": "30 minutes", "difficulty": "Easy", "category": "Main Course",
+    "dietary_info": [],
+}])
+
+
+def _chunks(text, size=7):
+    """Split ``text`` into streamed completion chunks."""
+    return [
+        types.SimpleNamespace(choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=text[i:i + size]))])
+        for i in range(0, len(text), size)
+    ]
+
+
+@pytest.fixture
+def fake_gpt(monkeypatch):
+    calls = []
+
+    def create(**request):
+        assert request.pop("stream") is True
+        calls.append(request)
+        return iter(_chunks(REPLY))
+
+    client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(recipe_finder, "get_client", lambda api_key: client)
+    return calls
+
+
+def test_equivalent_requests_share_a_key():
+    key = recipe_finder.recipe_cache_key("rice, chicken")
+
+    assert recipe_finder.recipe_cache_key("Chicken,rice, ,chickens") == key
+    assert recipe_finder.recipe_cache_key("chicken, rice", dietary="vegan") != key
+    assert recipe_finder.recipe_cache_key("chicken, rice", limit=2) != key
+    assert recipe_finder.recipe_cache_key("chicken, rice", preferences=" Quick ") == \
+        recipe_finder.recipe_cache_key("chicken, rice", preferences="quick")
+
+
+def test_repeat_requests_are_served_from_cache(fake_gpt, tmp_path):
+    cache = ResponseCache(tmp_path, mode="on")
+
+    first = recipe_finder.fetch_recipes("rice, chicken", cache=cache)
+    again = recipe_finder.fetch_recipes("Chicken, Rice", cache=cache)
+
+    assert again == first
+    assert len(fake_gpt) == 1
+    assert "chicken, rice" in fake_gpt[0]["messages"][0]["content"]
+
+
+def test_fresh_bypasses_and_refreshes_cache(fake_gpt, tmp_path):
+    cache = ResponseCache(tmp_path, mode="on")
+    recipe_finder.fetch_recipes("chicken, rice", cache=cache)
+
+    recipe_finder.fetch_recipes("chicken, rice", cache=cache, fresh=True)
+    recipe_finder.fetch_recipes("chicken, rice", cache=cache)
+
+    assert len(fake_gpt) == 2
+
+
+def _recipe(title, **extra):
+    return {
+        "title": title, "ingredients": ["a"], "instructions": ["b"], "cooking_time": "5 minutes",
+        "difficulty": "Easy", "category": "Snack", "dietary_info": [], **extra,
+    }
+
+
+def test_stream_parser_handles_split_chunks_strings_and_fences():
+    tricky = _recipe('Brace {yourself} "quoted" \\ slash')
+    text = "```json\n[" + json.dumps(tricky) + ",\n" + json.dumps(_recipe("Two")) + "]\n```"
+    parser = recipe_finder.RecipeStreamParser()
+
+    objects = []
+    for i in range(0, len(text), 3):
+        objects.extend(parser.feed(text[i:i + 3]))
+
+    assert [json.loads(o)["title"] for o in objects] == [tricky["title"], "Two"]
+
+
+def test_malformed_recipe_is_skipped(monkeypatch, tmp_path):
+    reply = "[" + json.dumps(_recipe("One")) + ', {"title": "Broken", "ingredients": [}, ' \
+        + json.dumps({"title": "Missing fields"}) + ", " + json.dumps(_recipe("Three", extra_field=1)) + "]"
+    client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(
+        create=lambda **request: iter(_chunks(reply)))))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(recipe_finder, "get_client", lambda api_key: client)
+
+    recipes = recipe_finder.fetch_recipes("a", cache=ResponseCache(tmp_path, mode="on"))
+
+    assert [r.title for r in recipes] == ["One", "Three"]
+
+
+def test_reply_without_recipes_is_not_cached(monkeypatch, tmp_path):
+    replies = iter(["Sorry, I can't help with that.", REPLY])
+    client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(
+        create=lambda **request: iter(_chunks(next(replies))))))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(recipe_finder, "get_client", lambda api_key: client)
+    cache = ResponseCache(tmp_path, mode="on")
+
+    with pytest.raises(RuntimeError):
+        recipe_finder.fetch_recipes("chicken, rice", cache=cache)
+    recipes = recipe_finder.fetch_recipes("chicken, rice", cache=cache)
+
+    assert [r.title for r in recipes] == ["Chicken Rice"]
+
+
+def test_first_recipe_arrives_before_stream_finishes(monkeypatch, tmp_path):
+    produced = []
+    text = "[" + ", ".join(json.dumps(_recipe(t)) for t in ("One", "Two", "Three")) + "]"
+
+    def create(**request):
+        for chunk in _chunks(text, size=20):
+            produced.append(chunk)
+            yield chunk
+
+    client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(recipe_finder, "get_client", lambda api_key: client)
+    cache = ResponseCache(tmp_path, mode="on")
+
+    stream = recipe_finder.stream_recipes("a", cache=cache)
+    first = next(stream)
+
+    assert first.title == "One"
+    assert len(produced) < len(_chunks(text, size=20))
+    stream.close()
+    # An abandoned stream is not cached
+    assert cache.get(cache.key("recipes", recipe_finder.recipe_cache_key("a"))) is None
+
+
+def _use_tmp_outputs(monkeypatch, tmp_path):
+    for name in ("OPTIONS_FILE", "SELECTED_FILE"):
+        monkeypatch.setattr(recipe_finder, name, tmp_path / f"{name.lower()}.txt")
+    monkeypatch.setattr(recipe_finder, "RECIPES_DIR", tmp_path / "recipes")
+    monkeypatch.setattr(recipe_finder, "HISTORY_FILE", tmp_path / "recipes" / "history.json")
+    monkeypatch.setattr(recipe_finder, "LOCK_FILE", tmp_path / "recipes" / ".lock")
+    monkeypatch.setattr(recipe_finder, "LIBRARY_DB", tmp_path / "recipes" / "library.db")
+
+
+def test_library_answers_covered_requests_without_gpt(fake_gpt, monkeypatch, tmp_path):
+    from recipe_library import RecipeLibrary
+
+    _use_tmp_outputs(monkeypatch, tmp_path)
+    library = RecipeLibrary(tmp_path / "library.db")
+    cache = ResponseCache(tmp_path / "cache", mode="on")
+
+    # First request goes to GPT; every option ends up in the library
+    options = list(recipe_finder.suggest_recipes("rice, chicken", limit=1, cache=cache, library=library))
+    options[0].rating = 4
+    recipe_finder.save_selection(options[0], options, library)
+    assert len(fake_gpt) == 1
+
+    again = list(recipe_finder.suggest_recipes("chicken, rice, chicken", limit=1, library=library,
+                                               cache=ResponseCache(tmp_path / "other", mode="on")))
+    assert [r.title for r in again] == ["Chicken Rice"]
+    assert again[0].rating == 4
+    assert len(fake_gpt) == 1
+
+    # Preferences can't be judged locally
+    list(recipe_finder.suggest_recipes("rice, chicken", preferences="quick", limit=1, cache=cache, library=library))
+    assert len(fake_gpt) == 2
+
+
+def test_read_batch_accepts_json_and_plain_lines(tmp_path):
+    batch = tmp_path / "batch.jsonl"
+    batch.write_text('# weekly shop\n{"ingredients": "rice, chicken", "dietary": "none"}\n\nlentils, carrots\n')
+
+    assert recipe_finder.read_batch(str(batch)) == [
+        {"ingredients": "rice, chicken", "dietary": "none"},
+        {"ingredients": "lentils, carrots"},
+    ]
+
+    batch.write_text('{"dietary": "vegan"}\n')
+    with pytest.raises(ValueError, match="batch.jsonl:1"):
+        recipe_finder.read_batch(str(batch))
+
+
+def test_auto_select_policies():
+    def recipe(title, rating=None):
+        return recipe_finder.Recipe(title, [], [], "", "", "", [], rating=rating)
+
+    options = [recipe("A"), recipe("B", 3), recipe("C", 5)]
+    assert recipe_finder.auto_select(options, "first").title == "A"
+    assert recipe_finder.auto_select(options, "best-rated").title == "C"
+    assert recipe_finder.auto_select([recipe("A")], "best-rated").title == "A"
+    with pytest.raises(ValueError):
+        recipe_finder.auto_select([], "first")
+
+
+def test_batch_runs_concurrently_and_saves_every_pick(fake_gpt, monkeypatch, tmp_path):
+    _use_tmp_outputs(monkeypatch, tmp_path)
+    jobs = [{"ingredients": f"rice, chicken, item{i}", "fresh": True} for i in range(8)]
+    jobs.insert(3, {"ingredients": "rice", "limit": "many"})
+
+    results = recipe_finder.run_batch(jobs, "first", workers=4, cache=ResponseCache(tmp_path / "cache", mode="on"))
+
+    assert [r.get("selected") for r in results[:3]] == ["Chicken Rice"] * 3
+    assert "error" in results[3]
+    assert len(fake_gpt) == 8
+    history = json.loads((tmp_path / "recipes" / "history.json").read_text())
+    assert len(history) == 8
+
+    from recipe_library import RecipeLibrary
+    library = RecipeLibrary(tmp_path / "recipes" / "library.db")
+    (match,) = library.search("chicken, rice")
+    assert match.times_selected == 8
+    assert match.rating is None
+
+
+def test_main_auto_select_prints_json(fake_gpt, monkeypatch, tmp_path, capsys):
+    _use_tmp_outputs(monkeypatch, tmp_path)
+    monkeypatch.setenv("OPENAI_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr("builtins.input", lambda *a: pytest.fail("prompted"))
+
+    recipe_finder.main(["chicken, rice", "--auto-select", "best-rated"])
+
+    result = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert result == {"ingredients": "chicken, rice", "selected": "Chicken Rice", "options": ["Chicken Rice"]}
@@ -0,0 +1,68 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+root = Path(__file__).resolve().parents[1]
+for path in (root, root / "recipes"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from recipe_library import RecipeLibrary, ingredient_terms, normalize_ingredient  # noqa: E402
+
+
+def _recipe(title, ingredients, dietary=()):
+    return {
+        "title": title, "ingredients": ingredients, "instructions": ["cook"],
+        "cooking_time": "20 minutes", "difficulty": "Easy", "category": "Main Course",
+        "dietary_info": list(dietary),
+    }
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("Chicken", "chicken"),
+    ("  Cherry   Tomatoes ", "cherry tomato"),
+    ("berries", "berry"),
+    ("peaches", "peach"),
+    ("eggs", "egg"),
+    ("rice", "rice"),
+    ("hummus", "hummus"),
+    ("swiss cheese", "swiss cheese"),
+])
+def test_normalize_ingredient(raw, expected):
+    assert normalize_ingredient(raw) == expected
+
+
+def test_ingredient_terms_drop_quantities_and_preparation():
+    assert ingredient_terms("2 large chicken breasts, diced") == {"chicken", "breast"}
+    assert ingredient_terms("1 tbsp olive oil (optional)") == {"olive", "oil"}
+    assert ingredient_terms("200g cherry tomatoes") == {"cherry", "tomato"}
+
+
+def test_search_ranks_by_coverage_then_rating(tmp_path):
+    library = RecipeLibrary(tmp_path / "library.db")
+    library.add(_recipe("Chicken Fried Rice", ["2 chicken thighs", "300g rice", "2 eggs"]))
+    library.add(_recipe("Tomato Rice", ["rice", "4 tomatoes"]), rating=5)
+    library.add(_recipe("Roast Chicken", ["1 whole chicken"]), rating=4)
+    library.add(_recipe("Pancakes", ["flour", "eggs", "milk"]))
+
+    matches = library.search("rice, chickens, egg", limit=5)
+
+    assert [m.data["title"] for m in matches] == ["Chicken Fried Rice"]
+    assert matches[0].coverage == 1
+
+    matches = library.search("rice, chicken", limit=5, min_coverage=0.5)
+    assert [m.data["title"] for m in matches] == ["Chicken Fried Rice", "Tomato Rice", "Roast Chicken"]
+    assert matches[1].rating == 5
+
+
+def test_same_title_updates_and_keeps_history(tmp_path):
+    library = RecipeLibrary(tmp_path / "library.db")
+    library.add(_recipe("Tomato Rice", ["rice", "tomato"]), selected=True, rating=4)
+    library.add(_recipe("tomato rice!", ["rice", "tomato", "basil"]), selected=True, rating=2)
+
+    assert len(library) == 1
+    (match,) = library.search("basil")
+    assert match.times_selected == 2
+    assert match.rating == 3
+    assert library.search("tomato, rice", dietary="vegan") == []
@@ -0,0 +1,97 @@
+import json
+import os
+import sys
+import time
+import types
+from pathlib import Path
+
+import pytest
+
+root = Path(__file__).resolve().parents[1]
+for path in (root, root / "recipes"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from response_cache import CacheMiss, ResponseCache
+
+
+def test_call_records_then_serves_hits(tmp_path):
+    cache = ResponseCache(tmp_path, mode="on")
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return "answer"
+
+    request = {"model": "gpt-4o", "messages": [{"role": "user", "content": "hi"}]}
+    assert cache.call("chat.completions", request, compute) == "answer"
+    assert cache.call("chat.completions", dict(request), compute) == "answer"
+    assert len(calls) == 1
+    assert cache.call("chat.completions", {**request, "max_tokens": 5}, compute) == "answer"
+    assert len(calls) == 2
+
+
+def test_expired_entries_are_refetched(tmp_path):
+    cache = ResponseCache(tmp_path, ttl=60, mode="on")
+    key = cache.key("chat.completions", {"prompt": "x"})
+    cache.put(key, "old")
+    entry = next(tmp_path.glob("*/*.json"))
+    data = json.loads(entry.read_text())
+    data["created"] = time.time() - 120
+    entry.write_text(json.dumps(data))
+
+    assert cache.get(key) is None
+    assert ResponseCache(tmp_path, ttl=60, mode="replay").get(key) is None  # Deleted on expiry
+
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    cache = ResponseCache(tmp_path, max_bytes=250, mode="on")
+    keys = [cache.key("chat.completions", {"n": n}) for n in range(3)]
+    for n, key in enumerate(keys[:2]):
+        cache.put(key, "x" * 60)
+        path = tmp_path / key[:2] / f"{key}.json"
+        os.utime(path, (1000 + n, 1000 + n))
+
+    assert cache.get(keys[0]) == "x" * 60  # Touch: keys[1] is now least recently used
+    cache.put(keys[2], "x" * 60)
+
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is not None
+
+
+def test_replay_mode_never_calls_out(tmp_path):
+    cache = ResponseCache(tmp_path, mode="replay")
+
+    with pytest.raises(CacheMiss):
+        cache.call("chat.completions", {"prompt": "x"}, lambda: pytest.fail("API called"))
+
+
+def test_recipe_session_replays_offline(monkeypatch, tmp_path):
+    import recipe_finder
+
+    reply = json.dumps([{
+        "title": "Chicken Rice", "ingredients": ["chicken", "rice"], "instructions": ["cook"],
+        "cooking_time": "30 minutes", "difficulty": "Easy", "category": "Main Course",
+        "dietary_info": [],
+    }])
+
+    class RecordingOpenAI:
+        def __init__(self, *args, **kwargs):
+            self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(
+                create=lambda **k: iter([types.SimpleNamespace(
+                    choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=reply))]
+                )])
+            ))
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(recipe_finder, "OpenAI", RecordingOpenAI)
+    recipe_finder.get_client.cache_clear()
+    recorded = recipe_finder.fetch_recipes("chicken, rice", cache=ResponseCache(tmp_path, mode="on"))
+
+    monkeypatch.delenv("OPENAI_API_KEY")
+    monkeypatch.setattr(recipe_finder, "OpenAI", lambda *a, **k: pytest.fail("API called"))
+    replayed = recipe_finder.fetch_recipes("chicken, rice", cache=ResponseCache(tmp_path, mode="replay"))
+
+    assert replayed == recorded
+    assert replayed[0].title == "Chicken Rice"
@@ -0,0 +1,233 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+hub = Path(__file__).resolve().parents[1] / "standalone_ai_hub"
+if str(hub) not in sys.path:
+    sys.path.insert(0, str(hub))
+
+import web_app  # noqa: E402
+
+
+def _write_day(data_dir, name, content, image=False):
+    folder = data_dir / name
+    folder.mkdir(parents=True)
+    (folder / "content.json").write_text(json.dumps(content))
+    if image:
+        (data_dir / "images").mkdir(exist_ok=True)
+        (data_dir / "images" / f"joke_{name}.png").write_bytes(b"png")
+    return folder
+
+
+def _client(monkeypatch, tmp_path, poll_interval=0):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    cache = web_app.SnapshotCache(data_dir, data_dir / "images", poll_interval)
+    monkeypatch.setattr(web_app, "snapshot_cache", cache)
+    return data_dir, cache, web_app.app.test_client()
+
+
+def test_index_renders_latest_folder(monkeypatch, tmp_path):
+    data_dir, _, client = _client(monkeypatch, tmp_path)
+    _write_day(data_dir, "20240101", {"fact": "old"})
+    _write_day(data_dir, "20240102", {"fact": "new"}, image=True)
+
+    page = client.get("/").get_data(as_text=True)
+
+    assert "new" in page and "old" not in page
+    digest = web_app._file_digest(data_dir / "images" / "joke_20240102.png")
+    assert f"/images/{digest}/joke_20240102.png" in page
+
+
+def test_snapshot_is_reused_until_files_change(monkeypatch, tmp_path):
+    data_dir, cache, _ = _client(monkeypatch, tmp_path)
+    folder = _write_day(data_dir, "20240101", {"fact": "one"})
+    calls = []
+    real_read = web_app._read_content
+    real_scan = web_app._latest_data_folder
+    monkeypatch.setattr(web_app, "_read_content", lambda f: calls.append("read") or real_read(f))
+    monkeypatch.setattr(web_app, "_latest_data_folder", lambda d: calls.append("scan") or real_scan(d))
+
+    first = cache.get()
+    assert cache.get() is first
+    assert calls == ["scan", "read"]
+
+    content = folder / "content.json"
+    content.write_text(json.dumps({"fact": "two"}))
+    stat = content.stat()
+    os.utime(content, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    second = cache.get()
+    assert second.data == {"fact": "two"}
+    assert second.version != first.version
+    assert calls == ["scan", "read", "read"]
+
+    _write_day(data_dir, "20240102", {"fact": "three"})
+    stat = data_dir.stat()
+    os.utime(data_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert cache.get().data == {"fact": "three"}
+    assert calls.count("scan") == 2
+
+
+def test_poll_interval_limits_checks(monkeypatch, tmp_path):
+    data_dir, cache, _ = _client(monkeypatch, tmp_path, poll_interval=60)
+    assert cache.get().data == {}
+
+    _write_day(data_dir, "20240101", {"fact": "late"})
+    assert cache.get().data == {}
+
+    cache._checked -= 61
+    assert cache.get().data == {"fact": "late"}
+
+
+def test_index_answers_304_until_content_changes(monkeypatch, tmp_path):
+    data_dir, _, client = _client(monkeypatch, tmp_path)
+    folder = _write_day(data_dir, "20240101", {"fact": "one"})
+
+    first = client.get("/")
+    etag = first.headers["ETag"]
+    assert first.headers["Last-Modified"]
+    assert "no-cache" in first.headers["Cache-Control"]
+
+    cached = client.get("/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+
+    content = folder / "content.json"
+    content.write_text(json.dumps({"fact": "two"}))
+    stat = content.stat()
+    os.utime(content, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    changed = client.get("/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_page_is_rendered_once_per_version(monkeypatch, tmp_path):
+    data_dir, _, client = _client(monkeypatch, tmp_path)
+    _write_day(data_dir, "20240101", {"fact": "one"})
+    renders = []
+    real_render = web_app.render_template_string
+    monkeypatch.setattr(web_app, "render_template_string", lambda *a, **k: renders.append(1) or real_render(*a, **k))
+
+    for _ in range(3):
+        assert client.get("/").status_code == 200
+
+    assert len(renders) == 1
+
+
+def test_hashed_image_urls_are_immutable(monkeypatch, tmp_path):
+    data_dir, _, client = _client(monkeypatch, tmp_path)
+    _write_day(data_dir, "20240101", {"fact": "one"}, image=True)
+    digest = web_app._file_digest(data_dir / "images" / "joke_20240101.png")
+
+    response = client.get(f"/images/{digest}/joke_20240101.png")
+    assert response.status_code == 200
+    assert response.data == b"png"
+    assert "immutable" in response.headers["Cache-Control"]
+    assert "max-age=31536000" in response.headers["Cache-Control"]
+
+    assert client.get("/images/0000000000000000/joke_20240101.png").status_code == 404
+    assert client.get("/images/joke_20240101.png").status_code == 200
+
+
+def test_api_content_latest_and_by_date(monkeypatch, tmp_path):
+    data_dir, _, client = _client(monkeypatch, tmp_path)
+    _write_day(data_dir, "20240101", {"fact": "old"}, image=True)
+    _write_day(data_dir, "20240102", {"fact": "new"})
+
+    latest = client.get("/api/content").get_json()
+    assert latest["date"] == "20240102"
+    assert latest["content"] == {"fact": "new"}
+    assert latest["image"] is None
+
+    older = client.get("/api/content/20240101").get_json()
+    digest = web_app._file_digest(data_dir / "images" / "joke_20240101.png")
+    assert older["content"] == {"fact": "old"}
+    assert older["image"] == f"/images/{digest}/joke_20240101.png"
+
+    assert client.get("/api/content/20231231").status_code == 404
+    assert client.get("/api/content/2024-01-01").status_code == 400
+
+
+def test_stream_pushes_one_event_per_published_day(monkeypatch, tmp_path):
+    data_dir, cache, client = _client(monkeypatch, tmp_path)
+    _write_day(data_dir, "20240101", {"fact": "one"})
+    watcher = web_app.ContentWatcher(cache, interval=3600)
+    monkeypatch.setattr(web_app, "content_watcher", watcher)
+    monkeypatch.setattr(web_app, "STREAM_KEEPALIVE", 0.01)
+
+    response = client.get("/api/stream", buffered=False)
+    assert response.mimetype == "text/event-stream"
+    chunks = iter(response.response)
+    assert next(chunks).startswith(b"retry:")
+    assert next(chunks) == b": keep-alive\n\n"
+
+    folder = data_dir / ".20240102.tmp"
+    folder.mkdir()
+    (folder / "content.json").write_text(json.dumps({"fact": "two"}))
+    folder.rename(data_dir / "20240102")
+    stat = data_dir.stat()
+    os.utime(data_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    watcher.check()
+    watcher.check()
+
+    events = [chunk for chunk in (next(chunks) for _ in range(3)) if not chunk.startswith(b":")]
+    assert len(events) == 1
+    assert b"event: content" in events[0]
+    assert b'"date": "20240102"' in events[0]
+    response.close()
+    watcher.stop()
+
+
+def test_page_and_api_offer_image_variants(monkeypatch, tmp_path):
+    data_dir, _, client = _client(monkeypatch, tmp_path)
+    _write_day(data_dir, "20240101", {"fact": "one"}, image=True)
+    (data_dir / "images" / "joke_20240101_256.webp").write_bytes(b"webp")
+
+    page = client.get("/").get_data(as_text=True)
+    digest = web_app._file_digest(data_dir / "images" / "joke_20240101_256.webp")
+    assert f'type="image/webp" srcset="/images/{digest}/joke_20240101_256.webp 256w"' in page
+
+    variants = client.get("/api/content").get_json()["variants"]
+    assert variants == [{"width": 256, "type": "image/webp", "url": f"/images/{digest}/joke_20240101_256.webp"}]
+    assert client.get(variants[0]["url"]).data == b"webp"
+
+
+def test_older_image_digests_are_hashed_once_per_version(monkeypatch, tmp_path):
+    data_dir, cache, _ = _client(monkeypatch, tmp_path)
+    _write_day(data_dir, "20240101", {"fact": "old"}, image=True)
+    _write_day(data_dir, "20240102", {"fact": "new"}, image=True)
+    hashed = []
+    real_digest = web_app._file_digest
+    monkeypatch.setattr(web_app, "_file_digest", lambda p: hashed.append(p.name) or real_digest(p))
+
+    first = cache.image_digest("joke_20240101.png")
+    assert cache.image_digest("joke_20240101.png") == first
+    assert hashed.count("joke_20240101.png") == 1
+
+    image = data_dir / "images" / "joke_20240101.png"
+    image.write_bytes(b"new png")
+    stat = image.stat()
+    os.utime(image, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert cache.image_digest("joke_20240101.png") != first
+    assert hashed.count("joke_20240101.png") == 2
+
+
+def test_digest_cache_evicts_least_recently_used(monkeypatch, tmp_path):
+    data_dir, cache, _ = _client(monkeypatch, tmp_path)
+    monkeypatch.setattr(web_app, "DIGEST_CACHE_SIZE", 2)
+    for name in ("20240101", "20240102", "20240103", "20240104"):
+        _write_day(data_dir, name, {"fact": name}, image=True)
+    hashed = []
+    real_digest = web_app._file_digest
+    monkeypatch.setattr(web_app, "_file_digest", lambda p: hashed.append(p.name) or real_digest(p))
+
+    cache.image_digest("joke_20240101.png")
+    cache.image_digest("joke_20240102.png")
+    cache.image_digest("joke_20240101.png")  # Hit: now the most recent
+    cache.image_digest("joke_20240103.png")  # Evicts 20240102
+    cache.image_digest("joke_20240101.png")
+
+    # 20240104 is the current snapshot's image, hashed when the snapshot loads
+    assert [n for n in hashed if n != "joke_20240104.png"] == \
+        ["joke_20240101.png", "joke_20240102.png", "joke_20240103.png"]